@@ -12,7 +12,11 @@ class Settings(BaseSettings):
     omdb_api_key: Optional[str] = None
     
     search_external_timeout: int = 10
+    # Сколько секунд поиск ждет OMDB, прежде чем вернуть только результаты из БД
+    search_latency_budget: float = Field(2.5, validation_alias="SEARCH_LATENCY_BUDGET")
     max_external_results: int = 5
+    # Период сверки user_stats с view_history в секундах, 0 - только одна сверка при старте
+    user_stats_repair_interval: int = Field(21600, validation_alias="USER_STATS_REPAIR_INTERVAL")
     
     class Config:
         env_file = ".env"
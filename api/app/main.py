@@ -1,5 +1,6 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+import asyncio
 import logging
 
 
@@ -9,6 +10,7 @@ from app.routers import (
 )
 
 from app.routers.bot_content import router as bot_content_router
+from app.config import settings
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -31,6 +33,51 @@ app.include_router(analytics_router, prefix="/api/v1")
 app.include_router(bot_content_router, prefix="/api/v1")
 
 
+@app.on_event("startup")
+async def startup_event():
+    """Индекс названий и связи жанров/людей строятся в фоне, чтобы не задерживать старт API"""
+    from app.database import AsyncSessionLocal
+    from app.services.content_service import ContentService
+
+    async def build_title_index():
+        try:
+            async with AsyncSessionLocal() as session:
+                await ContentService(session).load_title_index()
+        except Exception as e:
+            logger.error(f"Не удалось построить индекс названий: {e}")
+
+    async def backfill_content_links():
+        try:
+            async with AsyncSessionLocal() as session:
+                await ContentService(session).backfill_content_links()
+        except Exception as e:
+            logger.error(f"Не удалось заполнить жанры и людей: {e}")
+
+    app.state.title_index_task = asyncio.create_task(build_title_index())
+    app.state.content_links_task = asyncio.create_task(backfill_content_links())
+
+    app.state.user_stats_repair_task = asyncio.create_task(repair_user_stats())
+
+
+async def repair_user_stats():
+    """Сверка счетчиков user_stats с view_history при старте и затем периодически"""
+    from app.database import AsyncSessionLocal
+    from app.services.user_stats_service import UserStatsService
+
+    while True:
+        try:
+            async with AsyncSessionLocal() as session:
+                repaired = await UserStatsService(session).repair()
+            if repaired:
+                logger.info(f"Исправлены счетчики user_stats: {repaired}")
+        except Exception as e:
+            logger.error(f"Не удалось сверить user_stats: {e}")
+
+        if settings.user_stats_repair_interval <= 0:
+            return
+        await asyncio.sleep(settings.user_stats_repair_interval)
+
+
 @app.on_event("shutdown")
 async def shutdown_event():
     """Закрытие соединений при выключении"""
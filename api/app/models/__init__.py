@@ -2,10 +2,22 @@ from .user import User
 from .content import Content
 from .view_history import ViewHistory
 from .watchlist import Watchlist
+from .user_stats import UserStats
+from .view_history_daily import ViewHistoryDaily
+from .system_counter import SystemCounter
+from .genre import Genre, ContentGenre
+from .person import Person, ContentPerson
 
 __all__ = [
     "User",
     "Content",
     "ViewHistory",
     "Watchlist",
+    "UserStats",
+    "ViewHistoryDaily",
+    "SystemCounter",
+    "Genre",
+    "ContentGenre",
+    "Person",
+    "ContentPerson",
 ]
\ No newline at end of file
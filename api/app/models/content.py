@@ -1,10 +1,18 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, Float, Boolean, DateTime
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, Float, Boolean, DateTime, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
 
 class Content(Base):
     __tablename__ = "content"
+    # Триграммные индексы (pg_trgm) для нечеткого поиска и ILIKE по названию
+    __table_args__ = (
+        Index("idx_content_title_trgm", "title", postgresql_using="gin", postgresql_ops={"title": "gin_trgm_ops"}),
+        Index(
+            "idx_content_original_title_trgm", "original_title",
+            postgresql_using="gin", postgresql_ops={"original_title": "gin_trgm_ops"},
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(255), nullable=False, index=True)
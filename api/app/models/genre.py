@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, Index
+from app.database import Base
+
+class Genre(Base):
+    __tablename__ = "genre"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String(255), unique=True, nullable=False)
+
+
+class ContentGenre(Base):
+    """Связь контента с жанром, заполняется триггером trg_content_links из content.genre"""
+    __tablename__ = "content_genre"
+    __table_args__ = (
+        Index("idx_content_genre_genre", "genre_id", "content_id"),
+    )
+
+    content_id = Column(Integer, ForeignKey("content.id", ondelete="CASCADE"), primary_key=True)
+    genre_id = Column(Integer, ForeignKey("genre.id", ondelete="CASCADE"), primary_key=True)
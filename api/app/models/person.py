@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, SmallInteger, String, ForeignKey, Index
+from app.database import Base
+
+class Person(Base):
+    __tablename__ = "person"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String(255), unique=True, nullable=False)
+
+
+class ContentPerson(Base):
+    """Режиссер или актер контента, заполняется триггером trg_content_links из director/actors_cast"""
+    __tablename__ = "content_person"
+    __table_args__ = (
+        Index("idx_content_person_person", "person_id", "role", "content_id"),
+    )
+
+    content_id = Column(Integer, ForeignKey("content.id", ondelete="CASCADE"), primary_key=True)
+    person_id = Column(Integer, ForeignKey("person.id", ondelete="CASCADE"), primary_key=True)
+    role = Column(String(20), primary_key=True)  # director или actor
+    # Порядок в строке OMDB: актеры первого плана идут первыми
+    position = Column(SmallInteger, nullable=False, default=0)
@@ -0,0 +1,10 @@
+from sqlalchemy import Column, String, SmallInteger, BigInteger
+from app.database import Base
+
+class SystemCounter(Base):
+    """Часть счетчика строк таблицы, ведется триггерами trg_*_counter_*; значение - сумма частей"""
+    __tablename__ = "system_counters"
+
+    name = Column(String(50), primary_key=True)
+    shard = Column(SmallInteger, primary_key=True)
+    value = Column(BigInteger, nullable=False, default=0)
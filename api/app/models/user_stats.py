@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey
+from sqlalchemy.sql import func
+from app.database import Base
+
+class UserStats(Base):
+    """Сводная статистика пользователя, ведется триггером trg_view_history_user_stats"""
+    __tablename__ = "user_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    total_views = Column(Integer, nullable=False, default=0)
+    movies_views = Column(Integer, nullable=False, default=0)
+    series_views = Column(Integer, nullable=False, default=0)
+    rating_sum = Column(Float, nullable=False, default=0)
+    rating_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Text, DateTime, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, Text, DateTime, Boolean, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database import Base
@@ -6,6 +6,7 @@ from datetime import datetime
 
 class ViewHistory(Base):
     __tablename__ = "view_history"
+    __table_args__ = (UniqueConstraint("user_id", "content_id", "watched_at"),)
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -16,4 +17,11 @@ class ViewHistory(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     user = relationship("User")
     content = relationship("Content")
+
+
+# Для keyset-пагинации истории по (watched_at, created_at, id)
+Index(
+    "idx_view_history_user_recent",
+    ViewHistory.user_id, ViewHistory.watched_at.desc(), ViewHistory.created_at.desc(), ViewHistory.id.desc(),
+)
     
\ No newline at end of file
@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey
+from app.database import Base
+
+class ViewHistoryDaily(Base):
+    """Дневные агрегаты просмотров пользователя, ведутся триггером trg_view_history_daily"""
+    __tablename__ = "view_history_daily"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    content_type = Column(String(50), primary_key=True)
+    view_count = Column(Integer, nullable=False, default=0)
+    rating_sum = Column(Float, nullable=False, default=0)
+    rating_count = Column(Integer, nullable=False, default=0)
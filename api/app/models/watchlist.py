@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database import Base
@@ -14,4 +14,7 @@ class Watchlist(Base):
     notes = Column(Text, nullable=True)
     user = relationship("User")
     content = relationship("Content")
+
+
+Index("idx_watchlist_user_recent", Watchlist.user_id, Watchlist.added_at.desc(), Watchlist.id.desc())
     
\ No newline at end of file
@@ -4,6 +4,7 @@ from typing import Optional
 from datetime import datetime, timedelta
 from app.database import get_db
 from app.services.analytics_service import AnalyticsService
+from app.services.dashboard_service import DashboardService
 
 router = APIRouter(prefix="/analytics", tags=["analytics"])
 
@@ -26,9 +27,36 @@ async def get_user_timeline_analytics( user_id: int, period: str = Query("daily"
     timeline_data = await analytics_service.get_user_timeline_analytics(user_id, period)
     return timeline_data
 
+#все данные дашборда пользователя одним запросом
+@router.get("/user/{user_id}/dashboard")
+async def get_user_dashboard(user_id: int, year: Optional[int] = Query(None, ge=1900, le=2100),
+                             db: AsyncSession = Depends(get_db)
+):
+    dashboard_service = DashboardService(db)
+    return await dashboard_service.get_user_dashboard(user_id, year or datetime.now().year)
+
+#любимые жанры, режиссеры и актеры пользователя
+@router.get("/user/{user_id}/top-genres")
+async def get_user_top_genres(user_id: int, limit: int = Query(10, ge=1, le=50), db: AsyncSession = Depends(get_db)):
+    analytics_service = AnalyticsService(db)
+    return await analytics_service.get_user_top_genres(user_id, limit)
+
+@router.get("/user/{user_id}/top-directors")
+async def get_user_top_directors(user_id: int, limit: int = Query(10, ge=1, le=50), db: AsyncSession = Depends(get_db)):
+    analytics_service = AnalyticsService(db)
+    return await analytics_service.get_user_top_people(user_id, "director", limit)
+
+@router.get("/user/{user_id}/top-actors")
+async def get_user_top_actors(user_id: int, limit: int = Query(10, ge=1, le=50), db: AsyncSession = Depends(get_db)):
+    analytics_service = AnalyticsService(db)
+    return await analytics_service.get_user_top_people(user_id, "actor", limit)
+
 #общая инфа по системе
 @router.get("/system/overview")
-async def get_system_overview(db: AsyncSession = Depends(get_db)):
+async def get_system_overview(
+    approximate: bool = Query(False, description="Оценка по статистике планировщика вместо точных счетчиков"),
+    db: AsyncSession = Depends(get_db)
+):
     analytics_service = AnalyticsService(db)
-    overview = await analytics_service.get_system_overview()
+    overview = await analytics_service.get_system_overview(approximate)
     return overview
\ No newline at end of file
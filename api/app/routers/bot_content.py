@@ -1,8 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
+import json
 from app.database import get_db
+from app.schemas.view_history import ViewHistoryPage, ViewLogCommand, ViewLogResponse
+from app.schemas.watchlist import WatchlistPage
 from app.services.content_service import ContentService
+from app.services.idempotency import idempotency_store
+from app.services.user_service import UserService
+from app.services.view_history_service import ViewHistoryService
+from app.services.watchlist_service import WatchlistService
 
 router = APIRouter(prefix="/bot", tags=["bot"])
 #для поиска
@@ -19,4 +27,99 @@ async def bot_search_content(title: str, content_type: Optional[str] = None, db:
         )
     
     return result
-#логика поиска 1+4 в search_omdb_direct
\ No newline at end of file
+#логика поиска 1+4 в search_omdb_direct
+
+#потоковый поиск: результаты отдаются по одному в формате NDJSON
+@router.get("/search/stream")
+async def bot_search_content_stream(title: str, content_type: Optional[str] = None, db: AsyncSession = Depends(get_db)
+):
+    content_service = ContentService(db)
+
+    async def events():
+        async for event in content_service.search_stream(title, content_type):
+            yield json.dumps(event, ensure_ascii=False, default=str) + "\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+#карточка контента по imdb_id для восстановления результатов поиска из компактного состояния бота
+@router.get("/content/{imdb_id}")
+async def bot_content_card(imdb_id: str, db: AsyncSession = Depends(get_db)):
+    content_service = ContentService(db)
+    card = await content_service.get_card(imdb_id)
+    if not card:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"'{imdb_id}' не найден"
+        )
+    return card
+
+@router.get("/content/id/{content_id}")
+async def bot_content_card_by_id(content_id: int, db: AsyncSession = Depends(get_db)):
+    content_service = ContentService(db)
+    card = await content_service.get_card_by_id(content_id)
+    if not card:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Контент не найден"
+        )
+    return card
+
+#история пользователя по telegram_id страницами по курсору, total только на первой странице
+@router.get("/users/{telegram_id}/history", response_model=ViewHistoryPage)
+async def bot_user_history_page(telegram_id: int, cursor: Optional[str] = None, limit: int = Query(5, ge=1, le=50),
+                                db: AsyncSession = Depends(get_db)
+):
+    user = await UserService(db).get_user_by_telegram_id(telegram_id)
+    if not user:
+        return ViewHistoryPage(items=[], total=0)
+
+    history_service = ViewHistoryService(db)
+    try:
+        items, next_cursor = await history_service.get_user_view_history_page(user.id, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+    total = None if cursor else await history_service.count_user_views(user.id)
+    return ViewHistoryPage(items=items, next_cursor=next_cursor, total=total)
+
+@router.get("/users/{telegram_id}/watchlist", response_model=WatchlistPage)
+async def bot_user_watchlist_page(telegram_id: int, cursor: Optional[str] = None, limit: int = Query(5, ge=1, le=50),
+                                  db: AsyncSession = Depends(get_db)
+):
+    user = await UserService(db).get_user_by_telegram_id(telegram_id)
+    if not user:
+        return WatchlistPage(items=[], total=0)
+
+    watchlist_service = WatchlistService(db)
+    try:
+        items, next_cursor = await watchlist_service.get_user_watchlist_page(user.id, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+    total = None if cursor else await watchlist_service.count_user_items(user.id)
+    return WatchlistPage(items=items, next_cursor=next_cursor, total=total)
+
+#отметить просмотр одним запросом: пользователь, контент, история и удаление из watchlist
+@router.post("/views", response_model=ViewLogResponse, status_code=status.HTTP_201_CREATED)
+async def bot_log_view(command: ViewLogCommand,
+                       idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=128),
+                       db: AsyncSession = Depends(get_db)
+):
+    history_service = ViewHistoryService(db)
+
+    async def log():
+        return ViewLogResponse(**await history_service.log_view(command))
+
+    try:
+        return await idempotency_store.run("bot-views", idempotency_key, log)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(e)
+        )
\ No newline at end of file
@@ -3,8 +3,9 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 
 from app.database import get_db
-from app.schemas.content import ContentResponse, ContentCreate
+from app.schemas.content import ContentResponse, ContentCreate, ContentResolve, ContentBulkCreate, ContentBulkResponse
 from app.services.content_service import ContentService
+from app.services.title_index import title_index
 
 router = APIRouter(prefix="/content", tags=["content"])
 
@@ -20,6 +21,27 @@ async def get_content_by_imdb_id(imdb_id: str, db: AsyncSession = Depends(get_db
         )
     return content
 
+#нечеткий поиск по названию (pg_trgm), используется в ensure_content_exists
+@router.get("/search")
+async def search_content(
+    query: str = Query(..., min_length=1, max_length=255),
+    limit: int = Query(10, ge=1, le=50),
+    threshold: float = Query(0.3, ge=0.0, le=1.0),
+    db: AsyncSession = Depends(get_db),
+):
+    content_service = ContentService(db)
+    results = await content_service.search_by_title(query, limit, threshold)
+    return {"query": query, "total": len(results), "results": results}
+
+#автодополнение по индексу названий в памяти, используется для inline-подсказок бота
+@router.get("/autocomplete")
+async def autocomplete_content(
+    q: str = Query(..., min_length=1, max_length=255),
+    limit: int = Query(10, ge=1, le=50),
+):
+    results = title_index.search(q, limit)
+    return {"query": q, "ready": title_index.ready, "total": len(results), "results": results}
+
 #для добавлениея в бд контента при ensure_content_exists
 @router.post("/", response_model=ContentResponse, status_code=status.HTTP_201_CREATED)
 async def create_content(content_data: ContentCreate, db: AsyncSession = Depends(get_db)):
@@ -27,3 +49,21 @@ async def create_content(content_data: ContentCreate, db: AsyncSession = Depends
     content = await content_service.create_content(content_data)
     return content
 
+#найти или создать контент по карточке из поиска за один запрос, используется в ensure_content_exists
+@router.post("/resolve", response_model=ContentResponse)
+async def resolve_content(payload: ContentResolve, db: AsyncSession = Depends(get_db)):
+    content_service = ContentService(db)
+    content = await content_service.resolve_content(payload)
+    if not content:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Недостаточно данных для поиска или создания контента"
+        )
+    return content
+
+#пакетная загрузка каталога, upsert по imdb_id
+@router.post("/bulk", response_model=ContentBulkResponse)
+async def bulk_create_content(payload: ContentBulkCreate, db: AsyncSession = Depends(get_db)):
+    content_service = ContentService(db)
+    return await content_service.bulk_upsert_content(payload.items)
+
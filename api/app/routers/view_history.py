@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, status, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from typing import List, Optional
 from app.database import get_db
-from app.schemas.view_history import (ViewHistoryResponse, ViewHistoryCreate,ViewHistoryWithContent)
+from app.schemas.view_history import (ViewHistoryResponse, ViewHistoryCreate, ViewHistoryPage, ViewHistoryWithContent)
+from app.services.idempotency import idempotency_store
 from app.services.view_history_service import ViewHistoryService
 
 router = APIRouter(prefix="/view-history", tags=["view-history"])
@@ -16,12 +17,36 @@ async def get_user_view_history(user_id: int, skip: int = Query(0, ge=0), limit:
     history = await history_service.get_user_view_history_with_content(user_id, skip, limit)
     return history
 
+#история страницами по курсору: next_cursor из ответа передается в следующий запрос
+@router.get("/user/{user_id}/page", response_model=ViewHistoryPage)
+async def get_user_view_history_page(user_id: int, cursor: Optional[str] = None, limit: int = Query(50, ge=1, le=100),
+                                     with_total: bool = False, db: AsyncSession = Depends(get_db)
+):
+    history_service = ViewHistoryService(db)
+    try:
+        items, next_cursor = await history_service.get_user_view_history_page(user_id, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+    total = await history_service.count_user_views(user_id) if with_total else None
+    return ViewHistoryPage(items=items, next_cursor=next_cursor, total=total)
+
 #для внесения в список просмотренного
 @router.post("/", response_model=ViewHistoryResponse, status_code=status.HTTP_201_CREATED)
-async def create_view_history(history_data: ViewHistoryCreate, db: AsyncSession = Depends(get_db)):
+async def create_view_history(history_data: ViewHistoryCreate,
+                              idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=128),
+                              db: AsyncSession = Depends(get_db)
+):
     history_service = ViewHistoryService(db)
-    history = await history_service.create_view_history(history_data)
-    return history
+
+    async def create():
+        history = await history_service.create_view_history(history_data)
+        return ViewHistoryResponse.model_validate(history)
+
+    return await idempotency_store.run("view-history", idempotency_key, create)
 
 #получение статистики
 @router.get("/user/{user_id}/stats")
@@ -1,8 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from typing import List, Optional
 from app.database import get_db
-from app.schemas.watchlist import (WatchlistResponse, WatchlistCreate, WatchlistWithContent)
+from app.schemas.watchlist import (WatchlistResponse, WatchlistCreate, WatchlistPage, WatchlistWithContent)
 from app.services.watchlist_service import WatchlistService
 
 router = APIRouter(prefix="/watchlist", tags=["watchlist"])
@@ -13,6 +13,22 @@ async def get_user_watchlist(user_id: int, skip: int = Query(0, ge=0), limit: in
     watchlist = await watchlist_service.get_user_watchlist_with_content(user_id, skip, limit)
     return watchlist
 
+#вочлист страницами по курсору
+@router.get("/user/{user_id}/page", response_model=WatchlistPage)
+async def get_user_watchlist_page(user_id: int, cursor: Optional[str] = None, limit: int = Query(50, ge=1, le=100),
+                                  with_total: bool = False, db: AsyncSession = Depends(get_db)):
+    watchlist_service = WatchlistService(db)
+    try:
+        items, next_cursor = await watchlist_service.get_user_watchlist_page(user_id, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+    total = await watchlist_service.count_user_items(user_id) if with_total else None
+    return WatchlistPage(items=items, next_cursor=next_cursor, total=total)
+
 #добавляем запись в вочлист
 @router.post("/", response_model=WatchlistResponse, status_code=status.HTTP_201_CREATED) 
 async def add_to_watchlist(item_data: WatchlistCreate, db: AsyncSession = Depends(get_db)):
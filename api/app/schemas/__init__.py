@@ -1,12 +1,12 @@
 from .user import UserResponse, UserBase
-from .content import ContentResponse, ContentCreate
-from .view_history import ViewHistoryResponse, ViewHistoryCreate
-from .watchlist import WatchlistResponse, WatchlistCreate
+from .content import ContentResponse, ContentCreate, ContentResolve, ContentBulkCreate, ContentBulkResponse
+from .view_history import ViewHistoryResponse, ViewHistoryCreate, ViewHistoryPage, ViewLogCommand, ViewLogResponse
+from .watchlist import WatchlistResponse, WatchlistCreate, WatchlistPage
 
 
 __all__ = [
     "UserResponse", "UserBase", 
-    "ContentResponse", "ContentCreate",
-    "ViewHistoryResponse", "ViewHistoryCreate", 
-    "WatchlistResponse", "WatchlistCreate"
+    "ContentResponse", "ContentCreate", "ContentResolve", "ContentBulkCreate", "ContentBulkResponse",
+    "ViewHistoryResponse", "ViewHistoryCreate", "ViewHistoryPage", "ViewLogCommand", "ViewLogResponse",
+    "WatchlistResponse", "WatchlistCreate", "WatchlistPage"
 ]
\ No newline at end of file
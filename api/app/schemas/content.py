@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
 from typing import Optional, List
 
@@ -22,3 +22,30 @@ class ContentResponse(ContentCreate):
 
     class Config:
         from_attributes = True
+
+
+class ContentResolve(BaseModel):
+    """Карточка из результатов поиска бота: из БД (с id) или из OMDB"""
+    id: Optional[int] = None
+    title: Optional[str] = None
+    original_title: Optional[str] = None
+    description: Optional[str] = None
+    content_type: Optional[str] = None
+    release_year: Optional[int] = None
+    imdb_rating: Optional[float] = None
+    imdb_id: Optional[str] = None
+    poster_url: Optional[str] = None
+    genre: Optional[str] = None
+    director: Optional[str] = None
+    cast: Optional[str] = None
+
+
+class ContentBulkCreate(BaseModel):
+    items: List[ContentCreate] = Field(..., min_length=1, max_length=10000)
+
+
+class ContentBulkResponse(BaseModel):
+    total: int
+    inserted: int
+    updated: int
+    ids: List[int]
@@ -1,6 +1,8 @@
 from datetime import date, datetime
-from typing import Optional
-from pydantic import BaseModel, field_validator
+from typing import List, Optional
+from pydantic import BaseModel, Field, field_validator
+
+from app.schemas.content import ContentResolve
 
 def _validate_watched_at(value: Optional[datetime]) -> Optional[datetime]:
     if value is None:
@@ -44,3 +46,33 @@ class ViewHistoryResponse(ViewHistoryBase):
 
 class ViewHistoryWithContent(ViewHistoryResponse):
     content: Optional[dict] = None
+
+
+class ViewHistoryPage(BaseModel):
+    """Страница истории для курсорной пагинации; total считается только для первой страницы"""
+    items: List[ViewHistoryWithContent]
+    next_cursor: Optional[str] = None
+    total: Optional[int] = None
+
+
+class ViewLogCommand(BaseModel):
+    """Команда бота "отметить просмотр": пользователь, контент и запись истории за один запрос"""
+    telegram_id: str
+    username: Optional[str] = None
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    content_id: Optional[int] = None
+    content: Optional[ContentResolve] = None
+    rating: Optional[float] = Field(None, ge=1, le=10)
+    notes: Optional[str] = None
+    watched_at: Optional[datetime] = None
+    watchlist_id: Optional[int] = None
+
+    @field_validator("watched_at")
+    @classmethod
+    def validate_watched_at(cls, value: Optional[datetime]) -> Optional[datetime]:
+        return _validate_watched_at(value)
+
+
+class ViewLogResponse(ViewHistoryResponse):
+    removed_from_watchlist: bool = False
@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 class WatchlistCreate(BaseModel):
     user_id: int
@@ -16,4 +16,9 @@ class WatchlistResponse(WatchlistCreate):
         from_attributes = True
 
 class WatchlistWithContent(WatchlistResponse):
-    content: Optional[dict] = None
\ No newline at end of file
+    content: Optional[dict] = None
+
+class WatchlistPage(BaseModel):
+    items: List[WatchlistWithContent]
+    next_cursor: Optional[str] = None
+    total: Optional[int] = None
\ No newline at end of file
@@ -3,6 +3,8 @@ from .content_service import ContentService
 from .view_history_service import ViewHistoryService
 from .watchlist_service import WatchlistService
 from .analytics_service import AnalyticsService
+from .user_stats_service import UserStatsService
+from .dashboard_service import DashboardService
 
 
 __all__ = [
@@ -11,4 +13,6 @@ __all__ = [
     "ViewHistoryService",
     "WatchlistService",
     "AnalyticsService",
+    "UserStatsService",
+    "DashboardService",
 ]
\ No newline at end of file
@@ -1,113 +1,187 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, and_, text
-from typing import Dict, Any
+from typing import Dict, Any, List
 from datetime import datetime, timedelta
 import logging
 
-from app.models.user import User
 from app.models.content import Content
 from app.models.view_history import ViewHistory
+from app.models.system_counter import SystemCounter
+from app.models.genre import Genre, ContentGenre
+from app.models.person import Person, ContentPerson
 
 logger = logging.getLogger(__name__)
 
+# Период временной аналитики -> единица DATE_TRUNC и шаг корзины
+TIMELINE_UNITS = {"daily": "day", "weekly": "week", "monthly": "month", "yearly": "year"}
+
+# Поле обзора системы -> таблица, строки которой считаются
+SYSTEM_COUNTERS = {"total_users": "users", "total_content": "content", "total_views": "view_history"}
+
 class AnalyticsService:
     def __init__(self, db: AsyncSession):
         self.db = db
 
     async def get_user_analytics(self, user_id: int, start_date: datetime, end_date: datetime) -> Dict[str, Any]:
-        total_views_stmt = select(func.count()).where(
-            and_(
-                ViewHistory.user_id == user_id,
-                ViewHistory.watched_at.between(start_date, end_date)
-            )
-        )
-        total_views_result = await self.db.execute(total_views_stmt)
-        total_views = total_views_result.scalar() or 0
-
-        content_type_stmt = select(
-            Content.content_type,
-            func.count(ViewHistory.id)
-        ).join(
-            ViewHistory, Content.id == ViewHistory.content_id
+        """Просмотры, разбивка по типам и средняя оценка за период одним запросом с FILTER"""
+        stmt = select(
+            func.count(),
+            func.count().filter(Content.content_type == 'movie'),
+            func.count().filter(Content.content_type == 'series'),
+            func.avg(ViewHistory.rating),
+        ).select_from(ViewHistory).join(
+            Content, Content.id == ViewHistory.content_id
         ).where(
             and_(
                 ViewHistory.user_id == user_id,
                 ViewHistory.watched_at.between(start_date, end_date)
             )
-        ).group_by(Content.content_type)
-
-        content_type_result = await self.db.execute(content_type_stmt)
-        content_type_stats = dict(content_type_result.all())
-
-        avg_rating_stmt = select(func.avg(ViewHistory.rating)).where(
-            and_(
-                ViewHistory.user_id == user_id,
-                ViewHistory.rating.isnot(None),
-                ViewHistory.watched_at.between(start_date, end_date)
-            )
         )
-        avg_rating_result = await self.db.execute(avg_rating_stmt)
-        avg_rating = round(avg_rating_result.scalar() or 0, 2)
 
+        result = await self.db.execute(stmt)
+        total_views, movies_views, series_views, avg_rating = result.one()
 
         return {
-            "total_views": total_views,
-            "movies_views": content_type_stats.get('movie', 0),
-            "series_views": content_type_stats.get('series', 0),
-            "average_rating": avg_rating
+            "total_views": total_views or 0,
+            "movies_views": movies_views or 0,
+            "series_views": series_views or 0,
+            "average_rating": round(avg_rating or 0, 2)
         }
 
     async def get_user_timeline_analytics(self, user_id: int, period: str = "monthly") -> Dict[str, Any]:
-        """Получить временную аналитику пользователя"""
-        if period == "daily":
-            group_by = "DATE(watched_at)"
-        elif period == "weekly":
-            group_by = "DATE_TRUNC('week', watched_at)"
-        elif period == "yearly":
-            group_by = "DATE_TRUNC('year', watched_at)"
-        else: 
-            group_by = "DATE_TRUNC('month', watched_at)"
-
-        timeline_stmt = text(f"""
-            SELECT 
-                {group_by} as period,
-                COUNT(*) as view_count,
-                AVG(rating) as avg_rating
-            FROM view_history 
-            WHERE user_id = :user_id
-            GROUP BY {group_by}
-            ORDER BY period
+        """Получить временную аналитику пользователя.
+
+        Корзины строятся из дневных агрегатов view_history_daily, поэтому стоимость
+        зависит от числа активных дней, а не от числа просмотров. Пустые периоды
+        между первым и последним просмотром заполняются нулями.
+        """
+        unit = TIMELINE_UNITS.get(period, "month")
+
+        timeline_stmt = text("""
+            WITH buckets AS (
+                SELECT
+                    DATE_TRUNC(:unit, day::timestamp)::date AS period,
+                    SUM(view_count) AS view_count,
+                    SUM(rating_sum) AS rating_sum,
+                    SUM(rating_count) AS rating_count
+                FROM view_history_daily
+                WHERE user_id = :user_id
+                GROUP BY 1
+                HAVING SUM(view_count) > 0
+            ),
+            bounds AS (
+                SELECT MIN(period) AS first_period, MAX(period) AS last_period FROM buckets
+            )
+            SELECT
+                series.period::date AS period,
+                COALESCE(b.view_count, 0) AS view_count,
+                b.rating_sum / NULLIF(b.rating_count, 0) AS avg_rating
+            FROM bounds
+            CROSS JOIN generate_series(
+                bounds.first_period::timestamp, bounds.last_period::timestamp, CAST(CAST(:step AS text) AS interval)
+            ) AS series(period)
+            LEFT JOIN buckets b ON b.period = series.period::date
+            ORDER BY 1
         """)
 
-        result = await self.db.execute(timeline_stmt, {"user_id": user_id})
-        
+        result = await self.db.execute(
+            timeline_stmt, {"user_id": user_id, "unit": unit, "step": f"1 {unit}"}
+        )
+
         timeline_data = []
         for row in result:
             timeline_data.append({
-                "view_count": row[1]
+                "period": row.period.isoformat(),
+                "view_count": int(row.view_count),
+                "avg_rating": round(row.avg_rating, 2) if row.avg_rating is not None else None
             })
-        
+
         return {
             "period": period,
             "data": timeline_data
         }
 
-    async def get_system_overview(self) -> Dict[str, Any]:
-        total_users_stmt = select(func.count(User.id))
-        total_users_result = await self.db.execute(total_users_stmt)
-        total_users = total_users_result.scalar() or 0
-
-        # Общее количество контента
-        total_content_stmt = select(func.count(Content.id))
-        total_content_result = await self.db.execute(total_content_stmt)
-        total_content = total_content_result.scalar() or 0
-
-        total_views_stmt = select(func.count(ViewHistory.id))
-        total_views_result = await self.db.execute(total_views_stmt)
-        total_views = total_views_result.scalar() or 0
+    async def get_user_top_genres(self, user_id: int, limit: int = 10) -> Dict[str, Any]:
+        """Самые просматриваемые жанры пользователя.
+
+        История пользователя читается по индексу (user_id, content_id), жанры -
+        по первичному ключу content_genre, без разбора строк content.genre.
+        """
+        view_count = func.count().label("view_count")
+        stmt = select(
+            Genre.id, Genre.name, view_count, func.avg(ViewHistory.rating).label("avg_rating")
+        ).select_from(ViewHistory).join(
+            ContentGenre, ContentGenre.content_id == ViewHistory.content_id
+        ).join(
+            Genre, Genre.id == ContentGenre.genre_id
+        ).where(
+            ViewHistory.user_id == user_id
+        ).group_by(Genre.id).order_by(view_count.desc(), Genre.name).limit(limit)
+
+        result = await self.db.execute(stmt)
+        return {"data": self._top_rows(result)}
+
+    async def get_user_top_people(self, user_id: int, role: str, limit: int = 10) -> Dict[str, Any]:
+        """Самые просматриваемые режиссеры (role="director") или актеры (role="actor") пользователя"""
+        view_count = func.count().label("view_count")
+        stmt = select(
+            Person.id, Person.name, view_count, func.avg(ViewHistory.rating).label("avg_rating")
+        ).select_from(ViewHistory).join(
+            ContentPerson,
+            and_(ContentPerson.content_id == ViewHistory.content_id, ContentPerson.role == role)
+        ).join(
+            Person, Person.id == ContentPerson.person_id
+        ).where(
+            ViewHistory.user_id == user_id
+        ).group_by(Person.id).order_by(view_count.desc(), Person.name).limit(limit)
+
+        result = await self.db.execute(stmt)
+        return {"role": role, "data": self._top_rows(result)}
+
+    @staticmethod
+    def _top_rows(result) -> List[Dict[str, Any]]:
+        return [
+            {
+                "id": row.id,
+                "name": row.name,
+                "view_count": row.view_count,
+                "avg_rating": round(row.avg_rating, 2) if row.avg_rating is not None else None
+            }
+            for row in result
+        ]
+
+    async def get_system_overview(self, approximate: bool = False) -> Dict[str, Any]:
+        """Число пользователей, контента и просмотров без сканирования таблиц.
+
+        По умолчанию читаются счетчики system_counters, которые триггеры ведут
+        в той же транзакции, что и изменения. approximate=True берет оценку
+        планировщика из pg_class.reltuples: она отстает до следующего ANALYZE,
+        но не трогает даже таблицу счетчиков.
+        """
+        counts = await self._approximate_counts() if approximate else {}
+
+        missing = [table for table in SYSTEM_COUNTERS.values() if table not in counts]
+        if missing:
+            counters_stmt = select(
+                SystemCounter.name, func.sum(SystemCounter.value)
+            ).where(
+                SystemCounter.name.in_(missing)
+            ).group_by(SystemCounter.name)
+            counters_result = await self.db.execute(counters_stmt)
+            counts.update({name: int(value) for name, value in counters_result.all()})
 
         return {
-            "total_users": total_users,
-            "total_content": total_content,
-            "total_views": total_views
-        }
\ No newline at end of file
+            key: counts.get(table, 0)
+            for key, table in SYSTEM_COUNTERS.items()
+        }
+
+    async def _approximate_counts(self) -> Dict[str, int]:
+        """Оценка числа строк из статистики планировщика; таблицы без ANALYZE пропускаются"""
+        result = await self.db.execute(
+            text("""
+                SELECT relname, reltuples::bigint
+                FROM pg_class
+                WHERE oid = ANY(ARRAY[to_regclass('users'), to_regclass('content'), to_regclass('view_history')])
+            """)
+        )
+        return {name: int(value) for name, value in result.all() if value >= 0}
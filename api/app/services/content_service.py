@@ -1,9 +1,16 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, or_
-from typing import Optional, List, Dict, Any
+from sqlalchemy import select, func, or_, literal_column, text
+from sqlalchemy.dialects.postgresql import insert
+from typing import Optional, List, Dict, Any, AsyncIterator
+import asyncio
 import logging
+from contextlib import aclosing
+from app.config import settings
 from app.models.content import Content
-from app.schemas.content import ContentCreate
+from app.models.genre import ContentGenre
+from app.models.person import ContentPerson
+from app.schemas.content import ContentCreate, ContentResolve, ContentBulkResponse
+from app.services.title_index import title_index
 from app.services.worker_adapter import worker_adapter
 
 logger = logging.getLogger(__name__)
@@ -11,6 +18,8 @@ logger = logging.getLogger(__name__)
 class ContentService:
     def __init__(self, db: AsyncSession):
         self.db = db
+        # Контент, созданный без commit: попадает в индекс названий только после коммита вызывающего
+        self._pending_index: List[Content] = []
 
     async def get_content_by_id(self, content_id: int) -> Optional[Content]:
         result = await self.db.execute(
@@ -24,38 +33,220 @@ class ContentService:
         )
         return result.scalar_one_or_none()
 
-    async def create_content(self, content_data: ContentCreate) -> Content:
-        if content_data.imdb_id:
-            existing_content = await self.get_content_by_imdb_id(content_data.imdb_id)
-            if existing_content:
-                return existing_content
+    async def create_content(self, content_data: ContentCreate, commit: bool = True) -> Content:
+        """Создать контент или вернуть существующий с тем же imdb_id одним запросом"""
+        stmt = insert(Content).values(self._content_values(content_data))
+        # Пустое обновление нужно, чтобы RETURNING вернул и уже существующую строку
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Content.imdb_id],
+            set_={"imdb_id": stmt.excluded.imdb_id},
+        ).returning(Content, literal_column("xmax = 0").label("inserted"))
 
-        data = content_data.model_dump()
-        cast = data.pop("cast", None)
-        content = Content(**data)
-        if cast is not None:
-            content.actors_cast = cast
+        result = await self.db.execute(stmt, execution_options={"populate_existing": True})
+        content, inserted = result.one()
+        if inserted:
+            logger.info(f"Новый контент создан: {content.title}")
+            self._pending_index.append(content)
+        if commit:
+            await self.db.commit()
+            self.index_committed()
+        return content
+
+    def index_committed(self) -> None:
+        """Добавить в индекс названий контент, созданный с commit=False, после коммита транзакции.
+
+        При откате индекс не должен получить id, которого нет в таблице content.
+        """
+        for content in self._pending_index:
+            title_index.add(content.id, content.title, content.original_title, content.release_year, content.content_type)
+        self._pending_index.clear()
+
+    async def resolve_content(self, payload: ContentResolve, commit: bool = True) -> Optional[Content]:
+        """Найти контент по id, imdb_id или названию, а если его нет - создать"""
+        if payload.id:
+            content = await self.get_content_by_id(payload.id)
+            if content:
+                return content
+
+        title = payload.title or payload.original_title
+        if not title:
+            return None
+
+        if not payload.imdb_id:
+            content = await self._find_by_exact_title(title, payload.release_year)
+            if content:
+                return content
+
+        # С imdb_id вставка сама вернет уже существующую строку (ON CONFLICT)
+        data = payload.model_dump(exclude={"id"})
+        data["title"] = title
+        data["original_title"] = payload.original_title or title
+        data["content_type"] = payload.content_type or "movie"
+        return await self.create_content(ContentCreate(**data), commit=commit)
+
+    async def _find_by_exact_title(self, title: str, release_year: Optional[int] = None) -> Optional[Content]:
+        # ILIKE без шаблонов - сравнение без учета регистра, которое обслуживает триграммный индекс
+        pattern = title.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        stmt = select(Content).where(
+            or_(Content.title.ilike(pattern, escape="\\"), Content.original_title.ilike(pattern, escape="\\"))
+        )
+        if release_year:
+            stmt = stmt.where(or_(Content.release_year == release_year, Content.release_year.is_(None)))
+
+        result = await self.db.execute(stmt.order_by(Content.id).limit(1))
+        return result.scalar_one_or_none()
+
+    async def bulk_upsert_content(self, items: List[ContentCreate], batch_size: int = 1000) -> ContentBulkResponse:
+        """Пакетная загрузка каталога: один INSERT ... ON CONFLICT на каждые batch_size записей.
+
+        Для уже существующих imdb_id непустые поля обновляются новыми значениями.
+        """
+        rows = []
+        rows_by_imdb_id: Dict[str, Dict[str, Any]] = {}
+        for item in items:
+            values = self._content_values(item)
+            if values.get("imdb_id"):
+                # Повтор imdb_id в одном INSERT ... ON CONFLICT DO UPDATE недопустим:
+                # сливаем в одну строку, непустые поля последнего повтора побеждают
+                if values["imdb_id"] in rows_by_imdb_id:
+                    rows_by_imdb_id[values["imdb_id"]].update(
+                        {column: value for column, value in values.items() if value is not None}
+                    )
+                    continue
+                rows_by_imdb_id[values["imdb_id"]] = values
+            rows.append(values)
+
+        ids: List[int] = []
+        inserted_count = 0
+        new_rows = []
+        changed_rows = []
+        updatable = [column for column in rows[0] if column != "imdb_id"] if rows else []
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            # Поля индекса названий до обновления: измененные записи нужно переиндексировать
+            batch_imdb_ids = [row["imdb_id"] for row in batch if row.get("imdb_id")]
+            previous = {}
+            if batch_imdb_ids:
+                previous_result = await self.db.execute(
+                    select(
+                        Content.id, Content.title, Content.original_title, Content.release_year, Content.content_type
+                    ).where(Content.imdb_id.in_(batch_imdb_ids))
+                )
+                previous = {row.id: tuple(row)[1:] for row in previous_result.all()}
+
+            stmt = insert(Content).values(batch)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[Content.imdb_id],
+                set_={
+                    column: func.coalesce(getattr(stmt.excluded, column), getattr(Content, column))
+                    for column in updatable
+                },
+            ).returning(
+                Content.id, Content.title, Content.original_title, Content.release_year, Content.content_type,
+                literal_column("xmax = 0").label("inserted"),
+            )
+
+            result = await self.db.execute(stmt)
+            for row in result.all():
+                ids.append(row.id)
+                if row.inserted:
+                    inserted_count += 1
+                    new_rows.append(tuple(row)[:5])
+                elif previous.get(row.id) != tuple(row)[1:5]:
+                    changed_rows.append(tuple(row)[:5])
 
-        self.db.add(content)
         await self.db.commit()
-        await self.db.refresh(content)
-        logger.info(f"Новый контент создан: {content.title}")
-        return content
+        title_index.add_many(new_rows)
+        for row in changed_rows:
+            title_index.update(*row)
+        logger.info(f"Пакетная загрузка контента: {len(ids)} записей, новых {inserted_count}")
+
+        return ContentBulkResponse(
+            total=len(ids),
+            inserted=inserted_count,
+            updated=len(ids) - inserted_count,
+            ids=ids,
+        )
+
+    @staticmethod
+    def _content_values(content_data: ContentCreate) -> Dict[str, Any]:
+        data = content_data.model_dump()
+        data["actors_cast"] = data.pop("cast", None)
+        return data
+
+    async def load_title_index(self, batch_size: int = 10000) -> None:
+        """Заполнить индекс названий из таблицы content порциями, не блокируя event loop надолго"""
+        stmt = (
+            select(Content.id, Content.title, Content.original_title, Content.release_year, Content.content_type)
+            .order_by(func.char_length(Content.title), Content.id)
+            .execution_options(yield_per=batch_size)
+        )
+
+        result = await self.db.stream(stmt)
+        async for rows in result.partitions():
+            title_index.add_many(rows)
+            await asyncio.sleep(0)
+
+        title_index.ready = True
+        logger.info(f"Индекс названий построен: {title_index.stats()}")
+
+    async def backfill_content_links(self, batch_size: int = 500) -> int:
+        """Заполнить жанры и людей для контента, созданного до появления триггера trg_content_links.
+
+        Контент обходится по id порциями, каждая порция - отдельная транзакция.
+        Возвращает число обработанных записей.
+        """
+        has_links = or_(
+            select(ContentGenre.content_id).where(ContentGenre.content_id == Content.id).exists(),
+            select(ContentPerson.content_id).where(ContentPerson.content_id == Content.id).exists(),
+        )
+        has_source = or_(Content.genre.isnot(None), Content.director.isnot(None), Content.actors_cast.isnot(None))
+
+        last_id = 0
+        processed = 0
+        while True:
+            result = await self.db.execute(
+                select(Content.id)
+                .where(Content.id > last_id, has_source, ~has_links)
+                .order_by(Content.id)
+                .limit(batch_size)
+            )
+            ids = list(result.scalars().all())
+            if not ids:
+                break
+
+            await self.db.execute(
+                text("SELECT content_links_refresh(id) FROM unnest(CAST(:ids AS integer[])) AS id"),
+                {"ids": ids},
+            )
+            await self.db.commit()
+            last_id = ids[-1]
+            processed += len(ids)
+
+        if processed:
+            logger.info(f"Жанры и люди заполнены для {processed} записей контента")
+        return processed
 
     async def search_omdb_direct( self, title: str, content_type: str = None) -> Optional[List[Dict[str, Any]]]:
-            stmt = select(Content).where(Content.title.ilike(f"%{title}%"))
-            result = await self.db.execute(stmt)
-            content = result.scalars().first()
+            # Запрос к worker стартует сразу и идет параллельно с поиском в БД
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + settings.search_latency_budget
+            worker_task = asyncio.ensure_future(worker_adapter.search_omdb(title, content_type))
 
-            db_item = None
-            if content:
-                db_item = {
-                    **self._content_to_dict(content),
-                    "source": "database",
-                    "already_watched": False,
-                }
+            try:
+                db_item = await self._find_in_database(title)
+            except Exception:
+                worker_task.cancel()
+                raise
 
-            worker_result = await worker_adapter.search_omdb(title, content_type) or []
+            partial = False
+            try:
+                worker_result = await asyncio.wait_for(worker_task, max(deadline - loop.time(), 0)) or []
+            except asyncio.TimeoutError:
+                # Сам запрос к worker не отменяется (shield в WorkerAdapter) и дозаполнит кэши
+                logger.warning(f"OMDB не ответил за {settings.search_latency_budget} с для '{title}'")
+                partial = True
+                worker_result = []
             omdb_items = []
             seen_imdb_ids = set()
 
@@ -84,15 +275,159 @@ class ContentService:
                 return {
                     "source": "mixed" if db_item and omdb_items else (db_item and "database") or "omdb",
                     "data": combined,
+                    "partial": partial,
                     "message": "Найдены результаты поиска"
                 }
 
+            if partial:
+                return {
+                    "source": "not_found",
+                    "data": None,
+                    "partial": True,
+                    "message": f"OMDB не ответил вовремя, попробуйте найти '{title}' еще раз"
+                }
+
             return {
                 "source": "not_found",
                 "data": None,
+                "partial": False,
                 "message": f"'{title}' не найден в OMDB"
             }
 
+    async def search_stream(self, title: str, content_type: str = None) -> AsyncIterator[Dict[str, Any]]:
+        """Потоковый поиск: сначала запись из БД, затем результаты OMDB по мере готовности.
+
+        События: {"type": "result", "data": {...}} и итоговое
+        {"type": "done", "source": ..., "partial": ..., "message": ...}.
+        Поток worker ограничен тем же search_latency_budget, что и обычный поиск:
+        по истечении бюджета отдается то, что успело прийти, и partial=True.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.search_latency_budget
+        # Поток worker читается в отдельной задаче: ее можно отменить по бюджету,
+        # а aclosing закрывает HTTP-поток и соединение в той же задаче
+        events: asyncio.Queue = asyncio.Queue()
+
+        async def pump_worker_events():
+            try:
+                async with aclosing(worker_adapter.search_omdb_stream(title, content_type)) as stream:
+                    async for event in stream:
+                        await events.put(event)
+            finally:
+                events.put_nowait(None)
+
+        worker_task = asyncio.create_task(pump_worker_events())
+        try:
+            db_item = await self._find_in_database(title)
+            seen_imdb_ids = set()
+            sent = 0
+
+            if db_item:
+                if db_item.get("imdb_id"):
+                    seen_imdb_ids.add(db_item["imdb_id"])
+                sent += 1
+                yield {"type": "result", "data": db_item}
+
+            omdb_sent = 0
+            worker_error = None
+            partial = False
+            while sent < 5:
+                try:
+                    event = await asyncio.wait_for(events.get(), max(deadline - loop.time(), 0))
+                except asyncio.TimeoutError:
+                    logger.warning(f"OMDB не ответил за {settings.search_latency_budget} с для '{title}'")
+                    partial = True
+                    break
+                if event is None:
+                    break
+
+                if event.get("type") == "result":
+                    item = event.get("data") or {}
+                    imdb_id = item.get("imdb_id")
+                    if imdb_id and imdb_id in seen_imdb_ids:
+                        continue
+                    if imdb_id:
+                        seen_imdb_ids.add(imdb_id)
+
+                    sent += 1
+                    omdb_sent += 1
+                    yield {"type": "result", "data": {**item, "source": "omdb", "already_watched": False}}
+                elif event.get("type") == "error" or event.get("success") is False:
+                    worker_error = event.get("error")
+        finally:
+            worker_task.cancel()
+
+        if not sent:
+            logger.warning(f"Потоковый поиск '{title}' ничего не нашел: {worker_error}")
+            message = (
+                f"OMDB не ответил вовремя, попробуйте найти '{title}' еще раз"
+                if partial else f"'{title}' не найден в OMDB"
+            )
+            yield {"type": "done", "source": "not_found", "partial": partial, "message": message}
+            return
+
+        source = "mixed" if db_item and omdb_sent else ("database" if db_item else "omdb")
+        yield {"type": "done", "source": source, "partial": partial, "message": "Найдены результаты поиска"}
+
+    async def search_by_title(self, query: str, limit: int = 10, threshold: float = 0.3) -> List[Dict[str, Any]]:
+        """Нечеткий поиск по title/original_title через триграммный индекс, лучшие совпадения первыми"""
+        # Оператор % использует порог pg_trgm.similarity_threshold, задаем его на время транзакции
+        await self.db.execute(select(func.set_config("pg_trgm.similarity_threshold", str(threshold), True)))
+
+        score = func.greatest(
+            func.similarity(Content.title, query),
+            func.similarity(Content.original_title, query),
+        ).label("score")
+        stmt = (
+            select(Content, score)
+            .where(or_(Content.title.op("%")(query), Content.original_title.op("%")(query)))
+            .order_by(score.desc(), Content.id)
+            .limit(limit)
+        )
+        result = await self.db.execute(stmt)
+
+        return [
+            {**self._content_to_dict(content), "score": round(float(content_score or 0), 4)}
+            for content, content_score in result.all()
+        ]
+
+    async def get_card_by_id(self, content_id: int) -> Optional[Dict[str, Any]]:
+        content = await self.get_content_by_id(content_id)
+        if not content:
+            return None
+        return {**self._content_to_dict(content), "source": "database", "already_watched": False}
+
+    async def get_card(self, imdb_id: str) -> Optional[Dict[str, Any]]:
+        """Карточка в формате результатов поиска: из БД, а если там нет - из OMDB через worker"""
+        content = await self.get_content_by_imdb_id(imdb_id)
+        if content:
+            return {**self._content_to_dict(content), "source": "database", "already_watched": False}
+
+        details = await worker_adapter.get_details(imdb_id)
+        if details:
+            return {**details, "source": "omdb", "already_watched": False}
+        return None
+
+    async def _find_in_database(self, title: str) -> Optional[Dict[str, Any]]:
+        # ILIKE обслуживается триграммным индексом, из совпадений берем самое похожее
+        stmt = (
+            select(Content)
+            .where(Content.title.ilike(f"%{title}%"))
+            .order_by(func.similarity(Content.title, title).desc())
+            .limit(1)
+        )
+        result = await self.db.execute(stmt)
+        content = result.scalars().first()
+
+        if not content:
+            return None
+
+        return {
+            **self._content_to_dict(content),
+            "source": "database",
+            "already_watched": False,
+        }
+
     def _content_to_dict(self, content: Content) -> Dict[str, Any]:
             """Конвертировать Content в словарь"""
             if not content:
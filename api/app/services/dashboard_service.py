@@ -0,0 +1,170 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from datetime import date, datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import select, func, and_, Integer
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import AsyncSessionLocal
+from app.models.content import Content
+from app.models.user_stats import UserStats
+from app.models.view_history import ViewHistory
+from app.models.view_history_daily import ViewHistoryDaily
+from app.services.view_history_service import ViewHistoryService
+
+logger = logging.getLogger(__name__)
+
+RECENT_LIMIT = 10
+
+
+class DashboardCache:
+    """Собранные дашборды пользователей, LRU с ограничением по размеру.
+
+    Запись хранится вместе с версией - user_stats.updated_at, которую триггер
+    обновляет при каждом изменении истории пользователя. Пока версия в БД та же,
+    отдается сохраненный дашборд; версия общая для всех реплик API. В ключ входит
+    текущий день UTC: окно "за 30 дней" и ряд текущего года сдвигаются и без новых
+    просмотров.
+    """
+
+    def __init__(self, maxsize: int = 10000):
+        self.maxsize = maxsize
+        self._items: "OrderedDict[Tuple[int, int, date], Tuple[Any, Dict[str, Any]]]" = OrderedDict()
+
+    def get(self, key: Tuple[int, int, date], version: Any) -> Optional[Dict[str, Any]]:
+        item = self._items.get(key)
+        if item is None or item[0] != version:
+            return None
+
+        self._items.move_to_end(key)
+        return item[1]
+
+    def set(self, key: Tuple[int, int, date], version: Any, payload: Dict[str, Any]) -> None:
+        self._items[key] = (version, payload)
+        self._items.move_to_end(key)
+        while len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+
+
+dashboard_cache = DashboardCache()
+
+
+class DashboardService:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_user_dashboard(self, user_id: int, year: int) -> Dict[str, Any]:
+        """KPI, помесячный ряд за год, типы, гистограмма оценок и последние просмотры одним ответом.
+
+        Части считаются параллельно в отдельных сессиях; результат кэшируется
+        до следующего изменения истории пользователя, но не дольше конца текущего дня UTC.
+        """
+        version = await self.db.scalar(select(UserStats.updated_at).where(UserStats.user_id == user_id))
+        # Соединение сессии запроса возвращается в пул до расчета частей: иначе один
+        # запрос держит пять соединений и параллельные дашборды исчерпывают пул
+        await self.db.commit()
+
+        key = (user_id, year, datetime.now(timezone.utc).date())
+        cached = dashboard_cache.get(key, version)
+        if cached is not None:
+            return cached
+
+        kpis, monthly, histogram, recent = await asyncio.gather(
+            self._in_session(self._kpis, user_id),
+            self._in_session(self._monthly, user_id, year),
+            self._in_session(self._rating_histogram, user_id),
+            self._in_session(self._recent, user_id),
+        )
+
+        payload = {
+            "user_id": user_id,
+            "year": year,
+            "kpis": kpis,
+            "type_split": {"movie": kpis["movies_views"], "series": kpis["series_views"]},
+            "monthly": monthly,
+            "rating_histogram": histogram,
+            "recent": recent,
+        }
+        # Версия прочитана до расчета: запись, попавшая между ними, сбросит кэш при следующем запросе
+        dashboard_cache.set(key, version, payload)
+        return payload
+
+    @staticmethod
+    async def _in_session(query, *args):
+        # AsyncSession не допускает параллельных запросов, у каждой части своя сессия
+        async with AsyncSessionLocal() as session:
+            return await query(session, *args)
+
+    @staticmethod
+    async def _kpis(session: AsyncSession, user_id: int) -> Dict[str, Any]:
+        return await ViewHistoryService(session).get_user_stats(user_id)
+
+    @staticmethod
+    async def _monthly(session: AsyncSession, user_id: int, year: int) -> List[Dict[str, Any]]:
+        """12 месяцев года из дневных агрегатов, пустые месяцы с нулем"""
+        month = func.extract("month", ViewHistoryDaily.day).cast(Integer).label("month")
+        result = await session.execute(
+            select(
+                month,
+                func.sum(ViewHistoryDaily.view_count),
+                func.sum(ViewHistoryDaily.rating_sum),
+                func.sum(ViewHistoryDaily.rating_count),
+            ).where(
+                and_(
+                    ViewHistoryDaily.user_id == user_id,
+                    ViewHistoryDaily.day >= date(year, 1, 1),
+                    ViewHistoryDaily.day < date(year + 1, 1, 1)
+                )
+            ).group_by(month)
+        )
+        by_month = {row[0]: row[1:] for row in result.all()}
+
+        monthly = []
+        for number in range(1, 13):
+            view_count, rating_sum, rating_count = by_month.get(number, (0, 0, 0))
+            monthly.append({
+                "period": f"{year}-{number:02d}",
+                "view_count": int(view_count or 0),
+                "avg_rating": round(rating_sum / rating_count, 2) if rating_count else None
+            })
+        return monthly
+
+    @staticmethod
+    async def _rating_histogram(session: AsyncSession, user_id: int) -> List[Dict[str, Any]]:
+        """Число оценок по целым значениям 1-10"""
+        bucket = func.floor(ViewHistory.rating).cast(Integer).label("bucket")
+        result = await session.execute(
+            select(bucket, func.count()).where(
+                and_(ViewHistory.user_id == user_id, ViewHistory.rating.isnot(None))
+            ).group_by(bucket)
+        )
+        counts = dict(result.all())
+        return [{"rating": rating, "count": counts.get(rating, 0)} for rating in range(1, 11)]
+
+    @staticmethod
+    async def _recent(session: AsyncSession, user_id: int) -> List[Dict[str, Any]]:
+        """Последние просмотры: только поля для таблицы, по индексу idx_view_history_user_recent"""
+        result = await session.execute(
+            select(
+                ViewHistory.id, ViewHistory.watched_at, ViewHistory.rating,
+                Content.title, Content.content_type,
+            ).join(
+                Content, Content.id == ViewHistory.content_id
+            ).where(
+                ViewHistory.user_id == user_id
+            ).order_by(
+                ViewHistory.watched_at.desc(), ViewHistory.created_at.desc(), ViewHistory.id.desc()
+            ).limit(RECENT_LIMIT)
+        )
+        return [
+            {
+                "id": row.id,
+                "title": row.title,
+                "content_type": row.content_type,
+                "rating": row.rating,
+                "watched_at": row.watched_at
+            }
+            for row in result
+        ]
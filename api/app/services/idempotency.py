@@ -0,0 +1,72 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class IdempotencyStore:
+    """Ответы на запросы с заголовком Idempotency-Key, LRU с ограничением по размеру и TTL.
+
+    Повтор запроса с тем же ключом получает сохраненный ответ без повторной записи в БД.
+    Одновременные запросы с одним ключом выполняются по очереди: второй дождется
+    первого и получит его ответ.
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 24 * 3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._responses: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._locks: Dict[str, Tuple[asyncio.Lock, int]] = {}
+
+    def get(self, key: str) -> Optional[Any]:
+        item = self._responses.get(key)
+        if item is None:
+            return None
+
+        expires_at, response = item
+        if expires_at <= time.monotonic():
+            del self._responses[key]
+            return None
+
+        self._responses.move_to_end(key)
+        return response
+
+    def set(self, key: str, response: Any) -> None:
+        self._responses[key] = (time.monotonic() + self.ttl, response)
+        self._responses.move_to_end(key)
+        while len(self._responses) > self.maxsize:
+            self._responses.popitem(last=False)
+
+    async def run(self, scope: str, key: Optional[str], action: Callable[[], Awaitable[Any]]) -> Any:
+        if not key:
+            return await action()
+
+        full_key = f"{scope}:{key}"
+        cached = self.get(full_key)
+        if cached is not None:
+            logger.info(f"Повтор запроса с Idempotency-Key {full_key}, отдаем сохраненный ответ")
+            return cached
+
+        lock, users = self._locks.get(full_key, (asyncio.Lock(), 0))
+        self._locks[full_key] = (lock, users + 1)
+        try:
+            async with lock:
+                cached = self.get(full_key)
+                if cached is not None:
+                    return cached
+
+                response = await action()
+                self.set(full_key, response)
+                return response
+        finally:
+            lock, users = self._locks[full_key]
+            if users <= 1:
+                del self._locks[full_key]
+            else:
+                self._locks[full_key] = (lock, users - 1)
+
+
+idempotency_store = IdempotencyStore()
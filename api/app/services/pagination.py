@@ -0,0 +1,39 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, List
+
+
+def encode_cursor(values: List[Any]) -> str:
+    """Непрозрачный курсор: значения ключа сортировки последней записи страницы"""
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(token: str, size: int) -> List[Any]:
+    """Разобрать курсор из size значений; строки в ISO-формате превращаются в datetime.
+
+    ValueError, если курсор поврежден или создан для другого списка.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Некорректный курсор") from e
+
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Некорректный курсор")
+
+    decoded = []
+    for value in values:
+        # В курсор попадают только даты и целые id: остальное - подделка, которая упала бы в SQL
+        if value is not None and (isinstance(value, bool) or not isinstance(value, (int, str))):
+            raise ValueError("Некорректный курсор")
+        if isinstance(value, str):
+            try:
+                value = datetime.fromisoformat(value)
+            except ValueError as e:
+                raise ValueError("Некорректный курсор") from e
+        decoded.append(value)
+    return decoded
@@ -0,0 +1,228 @@
+import heapq
+import logging
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_NON_WORD = re.compile(r"[\W_]+")
+_CONTENT_TYPES = ("movie", "series")
+
+
+def normalize_title(text: Optional[str]) -> str:
+    """Нижний регистр, ё -> е, все кроме букв и цифр заменяется пробелом"""
+    if not text:
+        return ""
+    return " ".join(_NON_WORD.sub(" ", text.casefold().replace("ё", "е")).split())
+
+
+def _word_grams(word: str) -> List[str]:
+    """Триграммы слова с маркером начала (" ab", "abc", ...).
+
+    Для слова из одной буквы вместо триграмм используется биграмма " a".
+    """
+    padded = " " + word
+    if len(padded) < 3:
+        return [padded]
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+def _contains(postings: array, position: int, lo: int, hi: int) -> bool:
+    i = bisect_left(postings, position, lo, hi)
+    return i < hi and postings[i] == position
+
+
+class TitleIndex:
+    """Триграммный инвертированный индекс названий в памяти процесса.
+
+    Записи хранятся в параллельных массивах, списки вхождений (postings) -
+    array("I") с позициями записей по возрастанию, поэтому на одно вхождение
+    уходит 4 байта. Индекс только дополняется: записи добавляются при старте
+    из таблицы content и при создании нового контента. Измененный контент
+    (update) добавляется заново, а прежние записи с тем же id скрываются при поиске.
+    Поиск работает как автодополнение: каждое слово запроса должно быть
+    началом какого-то слова в title или original_title. Проверяется не больше
+    max_candidates совпадений в порядке позиций, поэтому при начальной загрузке
+    записи подаются от коротких названий к длинным - первыми находятся лучшие.
+    """
+
+    def __init__(self, max_candidates: int = 50):
+        self.max_candidates = max_candidates
+        self.ready = False
+
+        self._postings: Dict[str, array] = {}
+        self._ids = array("i")
+        self._years = array("H")
+        self._kinds = bytearray()
+        self._titles: List[str] = []
+        self._original_titles: List[Optional[str]] = []
+        # Актуальная позиция только для контента, который менялся после добавления (-1 - скрыт)
+        self._current: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def add(
+        self,
+        content_id: int,
+        title: str,
+        original_title: Optional[str] = None,
+        release_year: Optional[int] = None,
+        content_type: Optional[str] = None,
+    ) -> None:
+        if original_title == title:
+            original_title = None
+
+        grams = set()
+        for text in (title, original_title):
+            for word in normalize_title(text).split():
+                grams.update(_word_grams(word))
+                grams.add(" " + word[0])
+        if not grams:
+            return
+
+        position = len(self._ids)
+        self._ids.append(content_id)
+        self._years.append(release_year if release_year and 0 < release_year < 65536 else 0)
+        self._kinds.append(_CONTENT_TYPES.index(content_type) if content_type in _CONTENT_TYPES else 0)
+        self._titles.append(title)
+        self._original_titles.append(original_title)
+
+        for gram in grams:
+            postings = self._postings.get(gram)
+            if postings is None:
+                postings = self._postings[gram] = array("I")
+            postings.append(position)
+
+    def add_many(self, rows: Iterable[Tuple[int, str, Optional[str], Optional[int], Optional[str]]]) -> None:
+        for row in rows:
+            self.add(*row)
+
+    def update(
+        self,
+        content_id: int,
+        title: str,
+        original_title: Optional[str] = None,
+        release_year: Optional[int] = None,
+        content_type: Optional[str] = None,
+    ) -> None:
+        """Заменить запись контента, у которого изменилось название, год или тип"""
+        position = len(self._ids)
+        self.add(content_id, title, original_title, release_year, content_type)
+        self._current[content_id] = position if len(self._ids) > position else -1
+
+    def _is_current(self, position: int) -> bool:
+        current = self._current.get(self._ids[position])
+        return current is None or current == position
+
+    def search(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        normalized_query = normalize_title(query)
+        tokens = normalized_query.split()
+        if not tokens:
+            return []
+
+        # Для каждого слова берем два самых редких списка: пересекать все дороже,
+        # чем проверить лишних кандидатов в _match_rank
+        postings = []
+        for token in tokens:
+            token_postings = []
+            for gram in set(_word_grams(token)):
+                gram_postings = self._postings.get(gram)
+                if not gram_postings:
+                    return []
+                token_postings.append(gram_postings)
+            token_postings.sort(key=len)
+            postings.extend(token_postings[:2])
+        postings.sort(key=len)
+
+        matches = []
+        for position in self._intersect(postings):
+            if not self._is_current(position):
+                continue
+            rank = self._match_rank(position, tokens, normalized_query)
+            if rank is None:
+                continue
+            matches.append((rank, len(self._titles[position]), position))
+            if len(matches) >= self.max_candidates:
+                break
+
+        results = []
+        seen_ids = set()
+        for _, _, position in heapq.nsmallest(limit * 2, matches):
+            content_id = self._ids[position]
+            if content_id in seen_ids:
+                continue
+            seen_ids.add(content_id)
+            results.append(self._entry(position))
+            if len(results) >= limit:
+                break
+
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "entries": len(self._ids),
+            "updated": len(self._current),
+            "grams": len(self._postings),
+            "postings_bytes": sum(p.itemsize * len(p) for p in self._postings.values()),
+        }
+
+    @staticmethod
+    def _intersect(postings: List[array], window: int = 512) -> Iterable[int]:
+        """Пересечение отсортированных списков окнами по самому короткому.
+
+        Для каждого окна из остальных списков берется срез того же диапазона
+        позиций, пересечение считается на множествах. Окна растут вдвое, чтобы
+        редкие пересечения не перебирались мелкими шагами. Позиции выдаются по возрастанию.
+        """
+        smallest, rest = postings[0], postings[1:]
+        start = 0
+        while start < len(smallest):
+            chunk = smallest[start:start + window]
+            start += window
+            # Совпадения редкие - следующее окно вдвое больше
+            window *= 2
+            low, high = chunk[0], chunk[-1]
+
+            common = set(chunk)
+            for other in rest:
+                lo, hi = bisect_left(other, low), bisect_right(other, high)
+                if hi - lo > 16 * len(common):
+                    # Длинный срез дешевле не копировать, а проверить позиции двоичным поиском
+                    common = {p for p in common if _contains(other, p, lo, hi)}
+                else:
+                    common.intersection_update(other[lo:hi])
+                if not common:
+                    break
+
+            yield from sorted(common)
+
+    def _match_rank(self, position: int, tokens: List[str], normalized_query: str) -> Optional[int]:
+        """0 - название начинается с запроса, 1 - все слова совпали по началу, None - нет"""
+        best = None
+        for text in (self._titles[position], self._original_titles[position]):
+            normalized = normalize_title(text)
+            if not normalized:
+                continue
+            if normalized.startswith(normalized_query):
+                return 0
+
+            words = normalized.split()
+            if all(any(word.startswith(token) for word in words) for token in tokens):
+                best = 1
+        return best
+
+    def _entry(self, position: int) -> Dict[str, Any]:
+        return {
+            "id": self._ids[position],
+            "title": self._titles[position],
+            "original_title": self._original_titles[position] or self._titles[position],
+            "release_year": self._years[position] or None,
+            "content_type": _CONTENT_TYPES[self._kinds[position]],
+        }
+
+
+title_index = TitleIndex()
@@ -1,5 +1,6 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, func, update
+from sqlalchemy.dialects.postgresql import insert
 from typing import List, Optional
 import logging
 from app.models.user import User
@@ -42,3 +43,36 @@ class UserService:
         logger.info(f"Пользовтель создан:id ={db_user.id}")
         return db_user
 
+    async def upsert_user(self, user: UserBase, commit: bool = True) -> User:
+        """Найти пользователя по telegram_id или создать его одним запросом, обновив имя"""
+        telegram_id = str(user.telegram_id)
+        if user.username:
+            # username уникален, а в Telegram он может перейти к другому аккаунту:
+            # у прежнего владельца он уже неактуален, иначе вставка упадет на UNIQUE
+            await self.db.execute(
+                update(User)
+                .where(User.username == user.username, User.telegram_id != telegram_id)
+                .values(username=None)
+            )
+
+        stmt = insert(User).values(
+            telegram_id=telegram_id,
+            username=user.username,
+            first_name=user.first_name,
+            last_name=user.last_name,
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[User.telegram_id],
+            set_={
+                "username": func.coalesce(stmt.excluded.username, User.username),
+                "first_name": func.coalesce(stmt.excluded.first_name, User.first_name),
+                "last_name": func.coalesce(stmt.excluded.last_name, User.last_name),
+            },
+        ).returning(User)
+
+        result = await self.db.execute(stmt, execution_options={"populate_existing": True})
+        db_user = result.scalar_one()
+        if commit:
+            await self.db.commit()
+        return db_user
+
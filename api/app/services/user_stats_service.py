@@ -0,0 +1,83 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, text
+from typing import Optional, List
+import logging
+
+from app.models.user import User
+from app.models.user_stats import UserStats
+
+logger = logging.getLogger(__name__)
+
+# Пересчет статистики для пачки пользователей по view_history, пишет только расхождения
+_REPAIR_SQL = text("""
+    WITH actual AS (
+        SELECT
+            u.id AS user_id,
+            COUNT(vh.id) AS total_views,
+            COUNT(vh.id) FILTER (WHERE c.content_type = 'movie') AS movies_views,
+            COUNT(vh.id) FILTER (WHERE c.content_type = 'series') AS series_views,
+            COALESCE(SUM(vh.rating), 0) AS rating_sum,
+            COUNT(vh.rating) AS rating_count
+        FROM users u
+        LEFT JOIN view_history vh ON vh.user_id = u.id
+        LEFT JOIN content c ON c.id = vh.content_id
+        WHERE u.id = ANY(:user_ids)
+        GROUP BY u.id
+    )
+    INSERT INTO user_stats AS s (user_id, total_views, movies_views, series_views, rating_sum, rating_count)
+    SELECT user_id, total_views, movies_views, series_views, rating_sum, rating_count FROM actual
+    ON CONFLICT (user_id) DO UPDATE SET
+        total_views = EXCLUDED.total_views,
+        movies_views = EXCLUDED.movies_views,
+        series_views = EXCLUDED.series_views,
+        rating_sum = EXCLUDED.rating_sum,
+        rating_count = EXCLUDED.rating_count,
+        updated_at = CURRENT_TIMESTAMP
+    WHERE (s.total_views, s.movies_views, s.series_views, s.rating_count)
+              IS DISTINCT FROM (EXCLUDED.total_views, EXCLUDED.movies_views, EXCLUDED.series_views, EXCLUDED.rating_count)
+       OR abs(s.rating_sum - EXCLUDED.rating_sum) > 1e-6
+    RETURNING s.user_id
+""")
+
+_LOCK_SQL = text("""
+    INSERT INTO user_stats (user_id)
+    SELECT id FROM users WHERE id = ANY(:user_ids)
+    ON CONFLICT (user_id) DO NOTHING
+""")
+
+
+class UserStatsService:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get(self, user_id: int) -> Optional[UserStats]:
+        result = await self.db.execute(select(UserStats).where(UserStats.user_id == user_id))
+        return result.scalar_one_or_none()
+
+    async def repair(self, user_ids: Optional[List[int]] = None, batch_size: int = 500) -> int:
+        """Сверить user_stats с view_history и исправить расхождения, вернуть число исправленных строк.
+
+        Пользователи обрабатываются пачками, каждая в своей транзакции. Строки
+        статистики пачки сначала блокируются, а пересчет идет отдельным запросом
+        с новым снимком: просмотры, записанные параллельно, либо уже видны
+        пересчету, либо их триггер дождется блокировки и применится поверх.
+        """
+        if user_ids is None:
+            result = await self.db.execute(select(User.id).order_by(User.id))
+            user_ids = list(result.scalars().all())
+            await self.db.commit()
+
+        repaired = 0
+        for start in range(0, len(user_ids), batch_size):
+            batch = user_ids[start:start + batch_size]
+            await self.db.execute(_LOCK_SQL, {"user_ids": batch})
+            await self.db.execute(
+                select(UserStats.user_id).where(UserStats.user_id.in_(batch)).with_for_update()
+            )
+            result = await self.db.execute(_REPAIR_SQL, {"user_ids": batch})
+            repaired += len(result.all())
+            await self.db.commit()
+
+        if repaired:
+            logger.warning(f"Исправлена статистика {repaired} пользователей")
+        return repaired
@@ -1,13 +1,20 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, desc, and_
-from sqlalchemy.exc import IntegrityError
-from typing import Optional, List, Dict, Any
+from sqlalchemy import select, func, desc, and_, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from typing import Optional, List, Dict, Any, Tuple
 from datetime import datetime, timedelta
 import logging
 
 from app.models.view_history import ViewHistory
 from app.models.content import Content
-from app.schemas.view_history import ViewHistoryCreate
+from app.models.user_stats import UserStats
+from app.schemas.content import ContentResolve
+from app.schemas.user import UserBase
+from app.schemas.view_history import ViewHistoryCreate, ViewLogCommand
+from app.services.content_service import ContentService
+from app.services.pagination import decode_cursor, encode_cursor
+from app.services.user_service import UserService
+from app.services.watchlist_service import WatchlistService
 
 logger = logging.getLogger(__name__)
 
@@ -21,47 +28,71 @@ class ViewHistoryService:
         )
         return result.scalar_one_or_none()
 
-    async def create_view_history(self, history_data: ViewHistoryCreate) -> ViewHistory:
-        history = ViewHistory(**history_data.model_dump())
-        self.db.add(history)
-        try:
+    async def create_view_history(self, history_data: ViewHistoryCreate, commit: bool = True) -> ViewHistory:
+        """Создать запись просмотра, а для того же (user_id, content_id, watched_at) обновить оценку и заметки"""
+        values = history_data.model_dump(exclude_none=True)
+        stmt = insert(ViewHistory).values(**values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ViewHistory.user_id, ViewHistory.content_id, ViewHistory.watched_at],
+            set_={
+                "rating": func.coalesce(stmt.excluded.rating, ViewHistory.rating),
+                "notes": func.coalesce(stmt.excluded.notes, ViewHistory.notes),
+            },
+        ).returning(ViewHistory)
+
+        result = await self.db.execute(stmt, execution_options={"populate_existing": True})
+        history = result.scalar_one()
+        if commit:
             await self.db.commit()
-            await self.db.refresh(history)
-            logger.info(f"Создана запись просмотра для  {history_data.user_id}")
-            return history
-        except IntegrityError as exc:
-            await self.db.rollback()
-
-            if "unique_view_record" in str(getattr(exc, "orig", exc)).lower():
-                existing_stmt = select(ViewHistory).where(
-                    and_(
-                        ViewHistory.user_id == history_data.user_id,
-                        ViewHistory.content_id == history_data.content_id,
-                        ViewHistory.watched_at == history_data.watched_at,
-                    )
-                )
-                existing_result = await self.db.execute(existing_stmt)
-                existing = existing_result.scalar_one_or_none()
-
-                if existing:
-                    update_data = history_data.model_dump(
-                        exclude_none=True,
-                        exclude={"user_id", "content_id"},
-                    )
-
-                    for field, value in update_data.items():
-                        setattr(existing, field, value)
-
-                    await self.db.commit()
-                    await self.db.refresh(existing)
-                    logger.info(
-                        "Обновлена запись просмотра для пользователя %s и контента %s",
-                        history_data.user_id,
-                        history_data.content_id,
-                    )
-                    return existing
-
-            raise
+        logger.info(f"Сохранена запись просмотра для  {history_data.user_id}")
+        return history
+
+    async def log_view(self, command: ViewLogCommand) -> Dict[str, Any]:
+        """Отметить просмотр одной транзакцией: пользователь, контент, история и удаление из watchlist"""
+        user = await UserService(self.db).upsert_user(
+            UserBase(
+                telegram_id=command.telegram_id,
+                username=command.username,
+                first_name=command.first_name,
+                last_name=command.last_name,
+            ),
+            commit=False,
+        )
+
+        payload = command.content or ContentResolve()
+        if command.content_id:
+            payload = payload.model_copy(update={"id": command.content_id})
+
+        content_service = ContentService(self.db)
+        content = await content_service.resolve_content(payload, commit=False)
+        if not content:
+            raise ValueError("Не удалось определить контент для записи просмотра")
+
+        history = await self.create_view_history(
+            ViewHistoryCreate(
+                user_id=user.id,
+                content_id=content.id,
+                rating=command.rating,
+                notes=command.notes,
+                watched_at=command.watched_at,
+            ),
+            commit=False,
+        )
+
+        removed = False
+        if command.watchlist_id:
+            removed = await WatchlistService(self.db).remove_user_item(user.id, command.watchlist_id, commit=False)
+
+        await self.db.commit()
+        content_service.index_committed()
+        logger.info(f"Отмечен просмотр контента {content.id} пользователем {user.id}")
+
+        return {
+            **{column.key: getattr(history, column.key) for column in ViewHistory.__table__.columns},
+            "content_title": content.title,
+            "content_type": content.content_type,
+            "removed_from_watchlist": removed,
+        }
 
     async def get_user_view_history_with_content(
         self, 
@@ -81,62 +112,107 @@ class ViewHistoryService:
             .limit(limit)
         )
 
-        history_with_content = []
-        for history, content in result:
-            content_dict = {
-                column.key: getattr(content, column.key)
-                for column in Content.__table__.columns
-            }
-
-            history_dict = {
-                **{column.key: getattr(history, column.key) for column in ViewHistory.__table__.columns},
-                "id": history.id,
-                "created_at": history.created_at,
-                "content_title": content.title,
-                "content_type": content.content_type,
-                "content": content_dict,
-            }
-            history_with_content.append(history_dict)
-
-        return history_with_content
+        return [self._with_content(history, content) for history, content in result]
+
+    async def get_user_view_history_page(
+        self,
+        user_id: int,
+        cursor: Optional[str] = None,
+        limit: int = 10,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Страница истории по курсору (keyset): стоимость не зависит от глубины страницы.
+
+        Порядок (watched_at, created_at, id) по убыванию; курсор - ключ последней
+        записи предыдущей страницы. ValueError при некорректном курсоре.
+        """
+        sort_key = (ViewHistory.watched_at, ViewHistory.created_at, ViewHistory.id)
+        stmt = (
+            select(ViewHistory, Content)
+            .join(Content, ViewHistory.content_id == Content.id)
+            .where(ViewHistory.user_id == user_id)
+            .order_by(*(desc(column) for column in sort_key))
+            .limit(limit + 1)
+        )
+        if cursor:
+            stmt = stmt.where(tuple_(*sort_key) < tuple_(*decode_cursor(cursor, len(sort_key))))
 
-    async def get_user_stats(self, user_id: int) -> Dict[str, Any]:
-        total_views_stmt = select(func.count()).where(ViewHistory.user_id == user_id)
-        total_views_result = await self.db.execute(total_views_stmt)
-        total_views = total_views_result.scalar() or 0
+        rows = (await self.db.execute(stmt)).all()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1][0]
+            next_cursor = encode_cursor([last.watched_at, last.created_at, last.id])
 
-        movies_views_stmt = select(func.count()).select_from(ViewHistory).join(Content).where(
-            and_(ViewHistory.user_id == user_id, Content.content_type == 'movie')
-        )
-        movies_views_result = await self.db.execute(movies_views_stmt)
-        movies_views = movies_views_result.scalar() or 0
+        return [self._with_content(history, content) for history, content in rows], next_cursor
 
-        series_views_stmt = select(func.count()).select_from(ViewHistory).join(Content).where(
-            and_(ViewHistory.user_id == user_id, Content.content_type == 'series')
+    async def count_user_views(self, user_id: int) -> int:
+        result = await self.db.execute(
+            select(func.count()).select_from(ViewHistory).where(ViewHistory.user_id == user_id)
         )
-        series_views_result = await self.db.execute(series_views_stmt)
-        series_views = series_views_result.scalar() or 0
+        return result.scalar() or 0
 
-        avg_rating_stmt = select(func.avg(ViewHistory.rating)).where(
-            and_(ViewHistory.user_id == user_id, ViewHistory.rating.isnot(None))
-        )
-        avg_rating_result = await self.db.execute(avg_rating_stmt)
-        avg_rating = round(avg_rating_result.scalar() or 0, 2)
+    @staticmethod
+    def _with_content(history: ViewHistory, content: Content) -> Dict[str, Any]:
+        content_dict = {
+            column.key: getattr(content, column.key)
+            for column in Content.__table__.columns
+        }
+
+        return {
+            **{column.key: getattr(history, column.key) for column in ViewHistory.__table__.columns},
+            "id": history.id,
+            "created_at": history.created_at,
+            "content_title": content.title,
+            "content_type": content.content_type,
+            "content": content_dict,
+        }
 
+    async def get_user_stats(self, user_id: int) -> Dict[str, Any]:
+        """Итоги из user_stats (ведется триггером) и просмотры за 30 дней по индексу, один запрос"""
         thirty_days_ago = datetime.now() - timedelta(days=30)
-        recent_views_stmt = select(func.count()).where(
-            and_(
-                ViewHistory.user_id == user_id,
-                ViewHistory.watched_at >= thirty_days_ago
+        recent_views = (
+            select(func.count())
+            .where(and_(ViewHistory.user_id == user_id, ViewHistory.watched_at >= thirty_days_ago))
+            .scalar_subquery()
+        )
+        result = await self.db.execute(
+            select(UserStats, recent_views.label("recent_views")).where(UserStats.user_id == user_id)
+        )
+        row = result.first()
+        if row is None:
+            # Статистика еще не заполнена (например, до первого прогона repair) - считаем напрямую
+            return await self._aggregate_user_stats(user_id, thirty_days_ago)
+
+        stats, recent = row
+        average_rating = stats.rating_sum / stats.rating_count if stats.rating_count else 0
+        return {
+            "total_views": stats.total_views,
+            "movies_views": stats.movies_views,
+            "series_views": stats.series_views,
+            "average_rating": round(average_rating, 2),
+            "recent_views_30_days": recent or 0
+        }
+
+    async def _aggregate_user_stats(self, user_id: int, since: datetime) -> Dict[str, Any]:
+        """Та же статистика одним проходом по истории пользователя через COUNT(*) FILTER"""
+        result = await self.db.execute(
+            select(
+                func.count(),
+                func.count().filter(Content.content_type == 'movie'),
+                func.count().filter(Content.content_type == 'series'),
+                func.avg(ViewHistory.rating),
+                func.count().filter(ViewHistory.watched_at >= since),
             )
+            .select_from(ViewHistory)
+            .join(Content, ViewHistory.content_id == Content.id)
+            .where(ViewHistory.user_id == user_id)
         )
-        recent_views_result = await self.db.execute(recent_views_stmt)
-        recent_views = recent_views_result.scalar() or 0
+        total_views, movies_views, series_views, avg_rating, recent_views = result.one()
 
         return {
-            "total_views": total_views,
-            "movies_views": movies_views,
-            "series_views": series_views,
-            "average_rating": avg_rating,
-            "recent_views_30_days": recent_views
+            "total_views": total_views or 0,
+            "movies_views": movies_views or 0,
+            "series_views": series_views or 0,
+            "average_rating": round(avg_rating or 0, 2),
+            "recent_views_30_days": recent_views or 0
         }
@@ -1,11 +1,12 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, desc, and_
-from typing import Optional, List, Dict, Any
+from sqlalchemy import select, desc, and_, delete, func, tuple_
+from typing import Optional, List, Dict, Any, Tuple
 import logging
 
 from app.models.watchlist import Watchlist
 from app.models.content import Content
 from app.schemas.watchlist import WatchlistCreate
+from app.services.pagination import decode_cursor, encode_cursor
 
 logger = logging.getLogger(__name__)
 
@@ -48,6 +49,17 @@ class WatchlistService:
         logger.info(f"Удалено из watchlist: {watchlist_id}")
         return True
 
+    async def remove_user_item(self, user_id: int, watchlist_id: int, commit: bool = True) -> bool:
+        """Удалить запись watchlist, только если она принадлежит пользователю"""
+        result = await self.db.execute(
+            delete(Watchlist).where(
+                and_(Watchlist.id == watchlist_id, Watchlist.user_id == user_id)
+            )
+        )
+        if commit:
+            await self.db.commit()
+        return result.rowcount > 0
+
     async def clear_user_watchlist(self, user_id: int) -> None:
         result = await self.db.execute(
             select(Watchlist).where(Watchlist.user_id == user_id)
@@ -74,21 +86,53 @@ class WatchlistService:
             .limit(limit)
         )
 
-        watchlist_with_content = []
-        for watchlist, content in result:
-            content_dict = {
-                column.key: getattr(content, column.key)
-                for column in Content.__table__.columns
-            }
-
-            watchlist_dict = {
-                **{column.key: getattr(watchlist, column.key) for column in Watchlist.__table__.columns},
-                "id": watchlist.id,
-                "added_at": watchlist.added_at,
-                "content_title": content.title,
-                "content_type": content.content_type,
-                "content": content_dict,
-            }
-            watchlist_with_content.append(watchlist_dict)
-
-        return watchlist_with_content
+        return [self._with_content(watchlist, content) for watchlist, content in result]
+
+    async def get_user_watchlist_page(
+        self,
+        user_id: int,
+        cursor: Optional[str] = None,
+        limit: int = 10,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Страница watchlist по курсору, порядок (added_at, id) по убыванию"""
+        sort_key = (Watchlist.added_at, Watchlist.id)
+        stmt = (
+            select(Watchlist, Content)
+            .join(Content, Watchlist.content_id == Content.id)
+            .where(Watchlist.user_id == user_id)
+            .order_by(*(desc(column) for column in sort_key))
+            .limit(limit + 1)
+        )
+        if cursor:
+            stmt = stmt.where(tuple_(*sort_key) < tuple_(*decode_cursor(cursor, len(sort_key))))
+
+        rows = (await self.db.execute(stmt)).all()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1][0]
+            next_cursor = encode_cursor([last.added_at, last.id])
+
+        return [self._with_content(watchlist, content) for watchlist, content in rows], next_cursor
+
+    async def count_user_items(self, user_id: int) -> int:
+        result = await self.db.execute(
+            select(func.count()).select_from(Watchlist).where(Watchlist.user_id == user_id)
+        )
+        return result.scalar() or 0
+
+    @staticmethod
+    def _with_content(watchlist: Watchlist, content: Content) -> Dict[str, Any]:
+        content_dict = {
+            column.key: getattr(content, column.key)
+            for column in Content.__table__.columns
+        }
+
+        return {
+            **{column.key: getattr(watchlist, column.key) for column in Watchlist.__table__.columns},
+            "id": watchlist.id,
+            "added_at": watchlist.added_at,
+            "content_title": content.title,
+            "content_type": content.content_type,
+            "content": content_dict,
+        }
@@ -1,7 +1,9 @@
+import asyncio
 import httpx
+import json
 import logging
 import os
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, AsyncIterator
 
 logger = logging.getLogger(__name__)
 
@@ -9,8 +11,22 @@ class WorkerAdapter:
     def __init__(self):
         self.worker_url = os.getenv("WORKER_URL", "http://worker:8001")
         self.client = httpx.AsyncClient(timeout=30.0)
+        # Одинаковые поиски, которые уже выполняются, ждут общий запрос к worker
+        self._in_flight: Dict[str, asyncio.Task] = {}
     
     async def search_omdb(self, title: str, content_type: str = None) -> Optional[List[Dict[str, Any]]]:
+        key = f"{' '.join(title.lower().split())}|{content_type or ''}"
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._search_omdb(title, content_type))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            logger.info(f"WorkerAdapter присоединился к текущему поиску: {title}")
+
+        return await asyncio.shield(task)
+
+    async def _search_omdb(self, title: str, content_type: str = None) -> Optional[List[Dict[str, Any]]]:
         try:
             logger.info(f"🔍 WorkerAdapter ищет: {title}")
             payload = {
@@ -37,6 +53,61 @@ class WorkerAdapter:
             logger.error(f"Ошибка WorkerAdapter: {e}")
             return None
     
+    async def get_details(self, imdb_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            response = await self.client.get(f"{self.worker_url}/details/{imdb_id}")
+            if response.status_code == 200:
+                result = response.json()
+                if result.get("success") and result.get("data"):
+                    return result["data"][0]
+                logger.warning(f"WorkerAdapter не нашел детали {imdb_id}: {result.get('error')}")
+                return None
+
+            logger.error(f"WorkerAdapter details error: {response.status_code}")
+            return None
+        except Exception as e:
+            logger.error(f"Ошибка WorkerAdapter details: {e}")
+            return None
+
+    async def search_omdb_stream(self, title: str, content_type: str = None) -> AsyncIterator[Dict[str, Any]]:
+        """Поиск с потоковой отдачей: результаты приходят по одному по мере готовности"""
+        payload = {"title": title, "content_type": content_type}
+        async for event in self._stream_lines(f"{self.worker_url}/search/stream", payload):
+            yield event
+
+    async def search_omdb_batch(
+        self, items: List[Dict[str, Any]], priority: str = "background"
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Пакетный поиск: отдает результаты по мере того, как worker их присылает.
+
+        Каждый элемент содержит index исходного запроса, success и data/error.
+        """
+        payload = {"items": items, "priority": priority}
+        async for event in self._stream_lines(f"{self.worker_url}/search/batch", payload):
+            yield event
+
+    async def _stream_lines(self, url: str, payload: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        try:
+            async with self.client.stream(
+                "POST",
+                url,
+                json=payload,
+                timeout=httpx.Timeout(30.0, read=None),
+            ) as response:
+                if response.status_code != 200:
+                    logger.error(f"WorkerAdapter stream error: {response.status_code}")
+                    return
+
+                async for line in response.aiter_lines():
+                    if not line.strip():
+                        continue
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        logger.error(f"WorkerAdapter получил некорректную строку: {line[:200]}")
+        except httpx.HTTPError as e:
+            logger.error(f"Ошибка WorkerAdapter stream: {e}")
+
     async def close(self):
         await self.client.aclose()
 
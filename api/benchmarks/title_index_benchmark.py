@@ -0,0 +1,103 @@
+"""Бенчмарк TitleIndex: время построения и задержка запросов.
+
+Запуск из каталога api: python benchmarks/title_index_benchmark.py --titles 1000000
+"""
+import argparse
+import importlib.util
+import os
+import random
+import statistics
+import resource
+import time
+
+MODULE_PATH = os.path.join(os.path.dirname(__file__), "..", "app", "services", "title_index.py")
+
+WORDS = [
+    "the", "dark", "night", "return", "of", "king", "lost", "city", "star", "war", "love", "story",
+    "last", "man", "earth", "house", "dragon", "ghost", "shell", "matrix", "blade", "runner", "green",
+    "mile", "silent", "hill", "black", "mirror", "iron", "river", "secret", "garden", "winter", "soldier",
+    "мастер", "маргарита", "брат", "ирония", "судьбы", "война", "мир", "тихий", "дон", "белое", "солнце",
+]
+
+
+def load_title_index_class():
+    spec = importlib.util.spec_from_file_location("title_index", MODULE_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.TitleIndex
+
+
+def build_vocabulary(rng: random.Random, size: int = 50000):
+    """Частые слова плюс длинный хвост выдуманных, как в реальном каталоге"""
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    rare = ["".join(rng.choice(letters) for _ in range(rng.randint(3, 9))) for _ in range(size)]
+    return WORDS, rare
+
+
+def pick_word(vocabulary, rng: random.Random) -> str:
+    common, rare = vocabulary
+    return rng.choice(common) if rng.random() < 0.4 else rng.choice(rare)
+
+
+def generate_rows(count: int, vocabulary, rng: random.Random):
+    for content_id in range(1, count + 1):
+        title = " ".join(pick_word(vocabulary, rng) for _ in range(rng.randint(1, 5))).title()
+        title = f"{title} {rng.randint(1, 99)}" if rng.random() < 0.2 else title
+        yield content_id, title, None, rng.randint(1920, 2025), rng.choice(("movie", "series"))
+
+
+def normalize_words(title: str):
+    return title.lower().split()
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--titles", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    vocabulary = build_vocabulary(rng)
+    TitleIndex = load_title_index_class()
+    index = TitleIndex()
+
+    # Как и ContentService.load_title_index, подаем записи от коротких названий к длинным
+    rows = sorted(generate_rows(args.titles, vocabulary, rng), key=lambda row: len(row[1]))
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    index.add_many(rows)
+    build_seconds = time.perf_counter() - started
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    queries = []
+    for _ in range(args.queries):
+        words = normalize_words(rng.choice(rows)[1])[:rng.randint(1, 2)]
+        words[-1] = words[-1][:rng.randint(1, len(words[-1]))]
+        queries.append(" ".join(words))
+
+    latencies = []
+    for query in queries:
+        started = time.perf_counter()
+        index.search(query, limit=10)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    stats = index.stats()
+    print(f"titles:        {len(index)}")
+    print(f"grams:         {stats['grams']}")
+    print(f"postings:      {stats['postings_bytes'] / 2**20:.1f} MiB")
+    print(f"index rss:     {(rss_after - rss_before) / 1024:.1f} MiB")
+    print(f"build time:    {build_seconds:.2f} s")
+    print(f"query p50:     {percentile(latencies, 0.50):.3f} ms")
+    print(f"query p95:     {percentile(latencies, 0.95):.3f} ms")
+    print(f"query p99:     {percentile(latencies, 0.99):.3f} ms")
+    print(f"query mean:    {statistics.mean(latencies):.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import asyncio
+
+from app.services import idempotency
+from app.services.idempotency import IdempotencyStore
+
+
+async def test_repeated_key_returns_saved_response():
+    store = IdempotencyStore()
+    calls = 0
+
+    async def action():
+        nonlocal calls
+        calls += 1
+        return {"id": calls}
+
+    assert await store.run("view", "key-1", action) == {"id": 1}
+    assert await store.run("view", "key-1", action) == {"id": 1}
+    assert await store.run("watchlist", "key-1", action) == {"id": 2}
+    assert calls == 2
+
+
+async def test_without_key_action_always_runs():
+    store = IdempotencyStore()
+    calls = 0
+
+    async def action():
+        nonlocal calls
+        calls += 1
+        return calls
+
+    assert await store.run("view", None, action) == 1
+    assert await store.run("view", "", action) == 2
+
+
+async def test_concurrent_requests_with_one_key_run_once():
+    store = IdempotencyStore()
+    calls = 0
+    release = asyncio.Event()
+
+    async def action():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return {"id": calls}
+
+    requests = [asyncio.create_task(store.run("view", "key-1", action)) for _ in range(3)]
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await asyncio.gather(*requests) == [{"id": 1}] * 3
+    assert calls == 1
+    assert store._locks == {}
+
+
+async def test_failed_action_is_not_saved():
+    store = IdempotencyStore()
+    attempts = 0
+
+    async def action():
+        nonlocal attempts
+        attempts += 1
+        if attempts == 1:
+            raise ValueError("ошибка записи")
+        return "ok"
+
+    try:
+        await store.run("view", "key-1", action)
+    except ValueError:
+        pass
+    assert await store.run("view", "key-1", action) == "ok"
+    assert store._locks == {}
+
+
+def test_ttl_and_size_limit(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(idempotency.time, "monotonic", lambda: now[0])
+    store = IdempotencyStore(maxsize=2, ttl=60)
+
+    store.set("a", 1)
+    store.set("b", 2)
+    store.get("a")
+    store.set("c", 3)
+    assert store.get("b") is None
+    assert store.get("a") == 1
+
+    now[0] += 61
+    assert store.get("a") is None
@@ -0,0 +1,42 @@
+import base64
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+from app.services.pagination import decode_cursor, encode_cursor
+
+
+def raw_cursor(payload) -> str:
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).rstrip(b"=").decode()
+
+
+def test_round_trip():
+    watched_at = datetime(2024, 5, 1, 20, 30, tzinfo=timezone.utc)
+    created_at = datetime(2024, 5, 1, 21, 0, 15, 123456)
+    token = encode_cursor([watched_at, created_at, 42])
+
+    assert "=" not in token
+    assert decode_cursor(token, 3) == [watched_at, created_at, 42]
+
+
+def test_round_trip_with_null_sort_value():
+    token = encode_cursor([None, 7])
+    assert decode_cursor(token, 2) == [None, 7]
+
+
+@pytest.mark.parametrize("token", [
+    "",
+    "not a cursor!",
+    encode_cursor([1, 2])[:-3],
+    raw_cursor({"id": 1}),
+    raw_cursor([1, 2, 3]),
+    raw_cursor(["yesterday", 1]),
+    raw_cursor([[1], 1]),
+    raw_cursor([{"id": 1}, 1]),
+    raw_cursor([True, 1]),
+    raw_cursor([1.5, 1]),
+])
+def test_tampered_cursor_is_rejected(token):
+    with pytest.raises(ValueError):
+        decode_cursor(token, 2)
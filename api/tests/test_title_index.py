@@ -0,0 +1,83 @@
+from app.services.title_index import TitleIndex, normalize_title
+
+
+def ids(results):
+    return [item["id"] for item in results]
+
+
+def make_index() -> TitleIndex:
+    index = TitleIndex()
+    index.add_many([
+        (1, "The Matrix", None, 1999, "movie"),
+        (2, "The Matrix Reloaded", None, 2003, "movie"),
+        (3, "Ирония судьбы", "Ironiya sudby", 1975, "movie"),
+        (4, "Ёлки", None, 2010, "movie"),
+        (5, "Breaking Bad", None, 2008, "series"),
+    ])
+    return index
+
+
+def test_normalize_title():
+    assert normalize_title("  Ёлки-палки!  ") == "елки палки"
+    assert normalize_title(None) == ""
+
+
+def test_word_prefix_matching():
+    index = make_index()
+
+    assert ids(index.search("matr")) == [1, 2]
+    assert ids(index.search("mat rel")) == [2]
+    assert ids(index.search("reloaded")) == [2]
+    assert index.search("atrix") == []
+    assert index.search("") == []
+
+
+def test_title_prefix_ranks_first():
+    index = make_index()
+    index.add(6, "Inside The Matrix", None, 2020, "movie")
+
+    assert ids(index.search("the matrix"))[:2] == [1, 2]
+    assert 6 in ids(index.search("matrix"))
+
+
+def test_original_title_and_yo_normalization():
+    index = make_index()
+
+    assert ids(index.search("ironiya")) == [3]
+    assert ids(index.search("елки")) == [4]
+    assert index.search("breaking")[0] == {
+        "id": 5,
+        "title": "Breaking Bad",
+        "original_title": "Breaking Bad",
+        "release_year": 2008,
+        "content_type": "series",
+    }
+
+
+def test_update_hides_previous_entry():
+    index = make_index()
+    index.update(1, "Matrix Resurrections", None, 2021, "movie")
+
+    assert ids(index.search("the matrix")) == [2]
+    result = index.search("resurrections")
+    assert ids(result) == [1]
+    assert result[0]["release_year"] == 2021
+    assert index.stats()["updated"] == 1
+
+
+def test_update_to_unindexable_title_hides_content():
+    index = make_index()
+    index.update(5, "!!!")
+
+    assert index.search("breaking") == []
+
+
+def test_limit_and_duplicate_ids():
+    index = TitleIndex()
+    for number in range(20):
+        index.add(number, f"Star Wars {number}")
+    index.add(0, "Star Wars 0")
+
+    results = index.search("star", limit=5)
+    assert len(results) == 5
+    assert len(set(ids(results))) == 5
@@ -1,3 +1,5 @@
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
 CREATE TABLE IF NOT EXISTS users (
     id SERIAL PRIMARY KEY,
     telegram_id VARCHAR(50) UNIQUE NOT NULL, 
@@ -30,6 +32,8 @@ CREATE TABLE IF NOT EXISTS content (
 );
 
 CREATE INDEX IF NOT EXISTS idx_content_content_type ON content(content_type);
+CREATE INDEX IF NOT EXISTS idx_content_title_trgm ON content USING gin (title gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_content_original_title_trgm ON content USING gin (original_title gin_trgm_ops);
 
 
 CREATE TABLE IF NOT EXISTS view_history (
@@ -49,6 +53,8 @@ CREATE TABLE IF NOT EXISTS view_history (
 CREATE INDEX IF NOT EXISTS idx_view_history_user_id ON view_history(user_id);
 CREATE INDEX IF NOT EXISTS idx_view_history_watched_at ON view_history(watched_at);
 CREATE INDEX IF NOT EXISTS idx_view_history_user_content ON view_history(user_id, content_id);
+-- Keyset-пагинация истории пользователя: WHERE user_id = ? AND (watched_at, created_at, id) < (...)
+CREATE INDEX IF NOT EXISTS idx_view_history_user_recent ON view_history(user_id, watched_at DESC, created_at DESC, id DESC);
 
 CREATE TABLE IF NOT EXISTS watchlist (
     id SERIAL PRIMARY KEY,
@@ -63,9 +69,338 @@ CREATE TABLE IF NOT EXISTS watchlist (
 CREATE INDEX IF NOT EXISTS idx_watchlist_user_id ON watchlist(user_id);
 CREATE INDEX IF NOT EXISTS idx_watchlist_user_content ON watchlist(user_id, content_id);
 CREATE INDEX IF NOT EXISTS idx_watchlist_added_at ON watchlist(added_at);
+CREATE INDEX IF NOT EXISTS idx_watchlist_user_recent ON watchlist(user_id, added_at DESC, id DESC);
+
+-- Сводная статистика пользователя, обновляется триггером на каждую запись истории
+CREATE TABLE IF NOT EXISTS user_stats (
+    user_id INTEGER PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+    total_views INTEGER NOT NULL DEFAULT 0,
+    movies_views INTEGER NOT NULL DEFAULT 0,
+    series_views INTEGER NOT NULL DEFAULT 0,
+    rating_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+    rating_count INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE OR REPLACE FUNCTION user_stats_apply(p_user_id INTEGER, p_content_id INTEGER, p_rating DOUBLE PRECISION, p_sign INTEGER)
+RETURNS void AS $$
+DECLARE
+    v_type VARCHAR(50);
+    v_movie INTEGER;
+    v_series INTEGER;
+BEGIN
+    -- Если контент удален каскадно, тип неизвестен: разницу исправит repair-задача
+    SELECT content_type INTO v_type FROM content WHERE id = p_content_id;
+    v_movie := COALESCE((v_type = 'movie')::int, 0);
+    v_series := COALESCE((v_type = 'series')::int, 0);
+
+    IF p_sign < 0 THEN
+        -- Только UPDATE: при каскадном удалении пользователя строки статистики уже нет
+        UPDATE user_stats SET
+            total_views = total_views - 1,
+            movies_views = movies_views - v_movie,
+            series_views = series_views - v_series,
+            rating_sum = rating_sum - COALESCE(p_rating, 0),
+            rating_count = rating_count - (p_rating IS NOT NULL)::int,
+            updated_at = CURRENT_TIMESTAMP
+        WHERE user_id = p_user_id;
+        RETURN;
+    END IF;
+
+    INSERT INTO user_stats AS s (user_id, total_views, movies_views, series_views, rating_sum, rating_count)
+    VALUES (
+        p_user_id, 1, v_movie, v_series,
+        COALESCE(p_rating, 0), (p_rating IS NOT NULL)::int
+    )
+    ON CONFLICT (user_id) DO UPDATE SET
+        total_views = s.total_views + 1,
+        movies_views = s.movies_views + EXCLUDED.movies_views,
+        series_views = s.series_views + EXCLUDED.series_views,
+        rating_sum = s.rating_sum + EXCLUDED.rating_sum,
+        rating_count = s.rating_count + EXCLUDED.rating_count,
+        updated_at = CURRENT_TIMESTAMP;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION view_history_user_stats_trigger()
+RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM user_stats_apply(OLD.user_id, OLD.content_id, OLD.rating, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM user_stats_apply(NEW.user_id, NEW.content_id, NEW.rating, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- watched_at не меняет итоги, но обновляет updated_at: по нему API сбрасывает кэш дашборда
+CREATE OR REPLACE TRIGGER trg_view_history_user_stats
+    AFTER INSERT OR DELETE OR UPDATE OF user_id, content_id, watched_at, rating ON view_history
+    FOR EACH ROW EXECUTE FUNCTION view_history_user_stats_trigger();
+
+-- Первичное заполнение для базы, в которой история уже есть
+INSERT INTO user_stats (user_id, total_views, movies_views, series_views, rating_sum, rating_count)
+SELECT
+    vh.user_id,
+    COUNT(*),
+    COUNT(*) FILTER (WHERE c.content_type = 'movie'),
+    COUNT(*) FILTER (WHERE c.content_type = 'series'),
+    COALESCE(SUM(vh.rating), 0),
+    COUNT(vh.rating)
+FROM view_history vh
+JOIN content c ON c.id = vh.content_id
+WHERE NOT EXISTS (SELECT 1 FROM user_stats)
+GROUP BY vh.user_id
+ON CONFLICT DO NOTHING;
+
+-- Дневные агрегаты просмотров для временной аналитики, обновляются триггером.
+-- День считается по UTC; тип контента хранится, чтобы графики можно было разбить по типам
+CREATE TABLE IF NOT EXISTS view_history_daily (
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    day DATE NOT NULL,
+    content_type VARCHAR(50) NOT NULL,
+    view_count INTEGER NOT NULL DEFAULT 0,
+    rating_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+    rating_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, day, content_type)
+);
+
+CREATE OR REPLACE FUNCTION view_history_daily_apply(
+    p_user_id INTEGER, p_content_id INTEGER, p_watched_at TIMESTAMP WITH TIME ZONE,
+    p_rating DOUBLE PRECISION, p_sign INTEGER
+)
+RETURNS void AS $$
+DECLARE
+    v_day DATE := (COALESCE(p_watched_at, CURRENT_TIMESTAMP) AT TIME ZONE 'UTC')::date;
+    v_type VARCHAR(50);
+BEGIN
+    SELECT content_type INTO v_type FROM content WHERE id = p_content_id;
+
+    IF p_sign < 0 THEN
+        -- При каскадном удалении контента тип уже не найти: списываем с самой
+        -- крупной корзины этого дня, чтобы итог по дню остался верным
+        IF v_type IS NULL THEN
+            SELECT content_type INTO v_type FROM view_history_daily
+            WHERE user_id = p_user_id AND day = v_day
+            ORDER BY view_count DESC
+            LIMIT 1;
+        END IF;
+
+        UPDATE view_history_daily SET
+            view_count = view_count - 1,
+            rating_sum = rating_sum - COALESCE(p_rating, 0),
+            rating_count = rating_count - (p_rating IS NOT NULL)::int
+        WHERE user_id = p_user_id AND day = v_day AND content_type = v_type;
+        RETURN;
+    END IF;
+
+    INSERT INTO view_history_daily AS d (user_id, day, content_type, view_count, rating_sum, rating_count)
+    VALUES (
+        p_user_id, v_day, COALESCE(v_type, 'unknown'), 1,
+        COALESCE(p_rating, 0), (p_rating IS NOT NULL)::int
+    )
+    ON CONFLICT (user_id, day, content_type) DO UPDATE SET
+        view_count = d.view_count + 1,
+        rating_sum = d.rating_sum + EXCLUDED.rating_sum,
+        rating_count = d.rating_count + EXCLUDED.rating_count;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION view_history_daily_trigger()
+RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM view_history_daily_apply(OLD.user_id, OLD.content_id, COALESCE(OLD.watched_at, OLD.created_at), OLD.rating, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM view_history_daily_apply(NEW.user_id, NEW.content_id, COALESCE(NEW.watched_at, NEW.created_at), NEW.rating, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER trg_view_history_daily
+    AFTER INSERT OR DELETE OR UPDATE OF user_id, content_id, watched_at, rating ON view_history
+    FOR EACH ROW EXECUTE FUNCTION view_history_daily_trigger();
+
+-- Первичное заполнение для базы, в которой история уже есть
+INSERT INTO view_history_daily (user_id, day, content_type, view_count, rating_sum, rating_count)
+SELECT
+    vh.user_id,
+    (COALESCE(vh.watched_at, vh.created_at) AT TIME ZONE 'UTC')::date,
+    c.content_type,
+    COUNT(*),
+    COALESCE(SUM(vh.rating), 0),
+    COUNT(vh.rating)
+FROM view_history vh
+JOIN content c ON c.id = vh.content_id
+WHERE NOT EXISTS (SELECT 1 FROM view_history_daily)
+GROUP BY 1, 2, 3
+ON CONFLICT DO NOTHING;
+
+-- Счетчики строк для обзора системы. Каждый счетчик разбит на 16 частей по
+-- процессу-владельцу соединения, чтобы параллельные вставки не ждали одну строку;
+-- значение счетчика - сумма частей
+CREATE TABLE IF NOT EXISTS system_counters (
+    name VARCHAR(50) NOT NULL,
+    shard SMALLINT NOT NULL,
+    value BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (name, shard)
+);
+
+CREATE OR REPLACE FUNCTION system_counters_add(p_name VARCHAR, p_delta BIGINT)
+RETURNS void AS $$
+BEGIN
+    IF p_delta = 0 THEN
+        RETURN;
+    END IF;
+
+    INSERT INTO system_counters AS c (name, shard, value)
+    VALUES (p_name, pg_backend_pid() % 16, p_delta)
+    ON CONFLICT (name, shard) DO UPDATE SET value = c.value + EXCLUDED.value;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Триггеры уровня оператора: один пакетный INSERT или DELETE - одно обновление счетчика
+CREATE OR REPLACE FUNCTION system_counters_inserted()
+RETURNS trigger AS $$
+BEGIN
+    PERFORM system_counters_add(TG_TABLE_NAME, (SELECT COUNT(*) FROM new_rows));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION system_counters_deleted()
+RETURNS trigger AS $$
+BEGIN
+    PERFORM system_counters_add(TG_TABLE_NAME, -(SELECT COUNT(*) FROM old_rows));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION system_counters_truncated()
+RETURNS trigger AS $$
+BEGIN
+    DELETE FROM system_counters WHERE name = TG_TABLE_NAME;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+DECLARE
+    t TEXT;
+BEGIN
+    FOREACH t IN ARRAY ARRAY['users', 'content', 'view_history'] LOOP
+        EXECUTE format(
+            'CREATE OR REPLACE TRIGGER trg_%1$s_counter_insert AFTER INSERT ON %1$I '
+            'REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION system_counters_inserted()', t);
+        EXECUTE format(
+            'CREATE OR REPLACE TRIGGER trg_%1$s_counter_delete AFTER DELETE ON %1$I '
+            'REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION system_counters_deleted()', t);
+        EXECUTE format(
+            'CREATE OR REPLACE TRIGGER trg_%1$s_counter_truncate AFTER TRUNCATE ON %1$I '
+            'FOR EACH STATEMENT EXECUTE FUNCTION system_counters_truncated()', t);
+
+        -- Первичное заполнение для базы, в которой уже есть данные
+        IF NOT EXISTS (SELECT 1 FROM system_counters WHERE name = t) THEN
+            EXECUTE format('INSERT INTO system_counters (name, shard, value) SELECT %L, 0, COUNT(*) FROM %I', t, t);
+        END IF;
+    END LOOP;
+END $$;
+
+-- Нормализованные жанры и люди из строк OMDB ("Drama, Crime").
+-- Связи пересобираются триггером при вставке контента и изменении genre/director/actors_cast
+CREATE TABLE IF NOT EXISTS genre (
+    id SERIAL PRIMARY KEY,
+    name VARCHAR(255) UNIQUE NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS person (
+    id SERIAL PRIMARY KEY,
+    name VARCHAR(255) UNIQUE NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS content_genre (
+    content_id INTEGER NOT NULL REFERENCES content(id) ON DELETE CASCADE,
+    genre_id INTEGER NOT NULL REFERENCES genre(id) ON DELETE CASCADE,
+    PRIMARY KEY (content_id, genre_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_content_genre_genre ON content_genre(genre_id, content_id);
+
+CREATE TABLE IF NOT EXISTS content_person (
+    content_id INTEGER NOT NULL REFERENCES content(id) ON DELETE CASCADE,
+    person_id INTEGER NOT NULL REFERENCES person(id) ON DELETE CASCADE,
+    role VARCHAR(20) NOT NULL CHECK (role IN ('director', 'actor')),
+    position SMALLINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (content_id, role, person_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_content_person_person ON content_person(person_id, role, content_id);
+
+-- Элементы строки через запятую в исходном порядке, без пустых значений и "N/A"
+CREATE OR REPLACE FUNCTION split_names(p_value TEXT)
+RETURNS TABLE (name VARCHAR, position INTEGER) AS $$
+    SELECT DISTINCT ON (LEFT(BTRIM(item), 255)) LEFT(BTRIM(item), 255)::varchar, ord::int
+    FROM regexp_split_to_table(p_value, ',') WITH ORDINALITY AS t(item, ord)
+    WHERE BTRIM(item) NOT IN ('', 'N/A')
+    ORDER BY LEFT(BTRIM(item), 255), ord;
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION content_links_refresh(p_content_id INTEGER)
+RETURNS void AS $$
+DECLARE
+    v_genre TEXT;
+    v_director TEXT;
+    v_cast TEXT;
+BEGIN
+    SELECT genre, director, actors_cast INTO v_genre, v_director, v_cast
+    FROM content WHERE id = p_content_id;
+
+    DELETE FROM content_genre WHERE content_id = p_content_id;
+    DELETE FROM content_person WHERE content_id = p_content_id;
+
+    INSERT INTO genre (name) SELECT s.name FROM split_names(v_genre) s ON CONFLICT (name) DO NOTHING;
+    INSERT INTO content_genre (content_id, genre_id)
+    SELECT p_content_id, g.id FROM split_names(v_genre) s JOIN genre g ON g.name = s.name;
+
+    INSERT INTO person (name)
+    SELECT s.name FROM split_names(v_director) s
+    UNION
+    SELECT s.name FROM split_names(v_cast) s
+    ON CONFLICT (name) DO NOTHING;
+
+    INSERT INTO content_person (content_id, person_id, role, position)
+    SELECT p_content_id, p.id, 'director', s.position FROM split_names(v_director) s JOIN person p ON p.name = s.name
+    UNION ALL
+    SELECT p_content_id, p.id, 'actor', s.position FROM split_names(v_cast) s JOIN person p ON p.name = s.name;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION content_links_trigger()
+RETURNS trigger AS $$
+BEGIN
+    -- Пакетный upsert переписывает все поля: пересобираем связи, только если строки изменились
+    IF TG_OP = 'UPDATE'
+        AND NEW.genre IS NOT DISTINCT FROM OLD.genre
+        AND NEW.director IS NOT DISTINCT FROM OLD.director
+        AND NEW.actors_cast IS NOT DISTINCT FROM OLD.actors_cast THEN
+        RETURN NULL;
+    END IF;
+
+    PERFORM content_links_refresh(NEW.id);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER trg_content_links
+    AFTER INSERT OR UPDATE OF genre, director, actors_cast ON content
+    FOR EACH ROW EXECUTE FUNCTION content_links_trigger();
 
 DO $$
 BEGIN
     RAISE NOTICE 'База данных успешно инициализирована';
-    RAISE NOTICE 'Создано таблиц: 4 (users, content, view_history, watchlist)';
+    RAISE NOTICE 'Создано таблиц: 11 (users, content, view_history, watchlist, user_stats, view_history_daily, system_counters, genre, person, content_genre, content_person)';
 END $$;
@@ -1,9 +1,43 @@
+from typing import Optional
+
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     TELEGRAM_BOT_TOKEN: str
     API_URL: str = "http://api:8000"
     API_PREFIX: str = "/api/v1"  
+    USER_CACHE_SIZE: int = 10000
+    USER_CACHE_TTL: int = 600
+    USER_CACHE_NEGATIVE_TTL: int = 30
+    # memory - локальное хранилище одного процесса, redis - общее для нескольких реплик
+    FSM_STORAGE: str = "memory"
+    REDIS_URL: str = "redis://redis:6379/0"
+    FSM_STATE_TTL: int = 86400
+    CONTENT_CACHE_SIZE: int = 5000
+    CONTENT_CACHE_TTL: int = 3600
+    RECORD_CACHE_SIZE: int = 2000
+    RECORD_CACHE_TTL: int = 300
+    RECORD_PAGE_SIZE: int = 5
+    # polling - один long-poll цикл, webhook - прием через HTTP, можно запускать несколько реплик
+    BOT_MODE: str = "polling"
+    WEBHOOK_BASE_URL: str = ""
+    WEBHOOK_PATH: str = "/telegram/webhook"
+    WEBHOOK_SECRET: str = ""
+    WEBHOOK_HOST: str = "0.0.0.0"
+    WEBHOOK_PORT: int = 8080
+    WEBHOOK_WORKERS: int = 32
+    WEBHOOK_QUEUE_SIZE: int = 100
+    WEBHOOK_QUEUE_TIMEOUT: float = 2.0
+    WEBHOOK_MAX_CONNECTIONS: int = 40
+    # file_id постеров: повторные отправки не скачивают картинку заново
+    POSTER_CACHE_STORE: str = "sqlite"
+    POSTER_CACHE_PATH: str = "cache/poster_cache.sqlite3"
+    POSTER_CACHE_SIZE: int = 10000
+    POSTER_CACHE_MAX_ROWS: int = 100000
+    POSTER_CACHE_TTL: int = 30 * 86400
+    POSTER_FAILURE_TTL: int = 3600
+    # Служебный чат для предзагрузки постеров следующей страницы, без него предзагрузки нет
+    POSTER_CACHE_CHAT_ID: Optional[int] = None
     class Config:
         env_file = ".env"
 
@@ -7,10 +7,13 @@ from aiogram.fsm.context import FSMContext
 
 from app.keyboards.main_menu import get_main_menu_keyboard
 from app.keyboards.search_keyboards import get_search_results_keyboard
+from app.services.content_cache import content_cache
 from app.services.history_service import HistoryService
 from app.services.watchlist_service import WatchlistService
 from app.states.search_state import SearchState
-from app.utils.message_helpers import send_content_card, update_content_card
+from app.utils.message_helpers import (
+    prefetch_neighbour_posters, refresh_card_text, send_content_card, update_content_card
+)
 from app.utils.text_templates import get_search_results_message
 from app.services.content_service import ContentService
 
@@ -18,6 +21,15 @@ router = Router()
 logger = logging.getLogger(__name__)
 
 
+async def load_search_results(state: FSMContext) -> list:
+    """Результаты поиска по ссылкам из состояния: сами карточки в FSM не хранятся.
+
+    Список позиционный: недоступная карточка остается на своем месте как None.
+    """
+    data = await state.get_data()
+    return await content_cache.resolve_many(data.get("search_refs", []))
+
+
 @router.message(Command("search"))
 @router.message(F.text == "🔍 Поиск")
 async def cmd_search(message: types.Message, state: FSMContext):
@@ -28,6 +40,32 @@ async def cmd_search(message: types.Message, state: FSMContext):
     )
 
 
+@router.inline_query()
+async def inline_title_suggestions(inline_query: types.InlineQuery):
+    """Подсказки названий по мере ввода, выбранный вариант отправляется в чат как поисковый запрос"""
+    query = inline_query.query.strip()
+    if not query:
+        await inline_query.answer([], cache_time=1)
+        return
+
+    suggestions = await ContentService().autocomplete(query, limit=10)
+
+    articles = []
+    for item in suggestions:
+        title = item.get("title") or ""
+        details = [str(value) for value in (item.get("release_year"), item.get("original_title")) if value and value != title]
+        articles.append(
+            types.InlineQueryResultArticle(
+                id=str(item["id"]),
+                title=title,
+                description=" · ".join(details) or None,
+                input_message_content=types.InputTextMessageContent(message_text=title, parse_mode=None),
+            )
+        )
+
+    await inline_query.answer(articles, cache_time=30, is_personal=False)
+
+
 @router.message(SearchState.waiting_for_query)
 async def process_search_query(message: types.Message, state: FSMContext):
     query = message.text.strip()
@@ -37,33 +75,70 @@ async def process_search_query(message: types.Message, state: FSMContext):
 
     try:
         content_service = ContentService()
-        raw_result = await content_service.search_content(query)
 
+        # Первая карточка показывается сразу, остальные результаты дописываются по мере прихода
         results = []
+        card = None
         error_message = None
 
-        if isinstance(raw_result, list):
-            results = raw_result
-        elif isinstance(raw_result, dict):
-            source = raw_result.get("source")
-            if source in {"database", "omdb", "mixed"}:
-                data = raw_result.get("data")
-                if isinstance(data, list):
-                    results = data
-                elif data:
-                    results = [data]
+        async for event in content_service.search_content_stream(query):
+            event_type = event.get("type")
+
+            if event_type == "result" and event.get("data"):
+                results.append(event["data"])
+
+                if card is None:
+                    await state.update_data(
+                        search_refs=content_cache.put_many(results),
+                        current_page=0,
+                        search_query=query,
+                        total_results=len(results),
+                    )
+                    await state.set_state(SearchState.waiting_for_selection)
+
+                    try:
+                        await search_message.delete()
+                    except Exception:
+                        pass
+
+                    card = await send_content_card(
+                        message,
+                        get_search_results_message(results, 0),
+                        keyboard=get_search_results_keyboard(results, 0),
+                        poster_url=results[0].get("poster_url"),
+                    )
                 else:
-                    error_message = raw_result.get("message")
-            elif source in {"not_found", "error"}:
-                error_message = raw_result.get("message")
-            elif raw_result.get("success") is False:
-                error_message = raw_result.get("error") or raw_result.get("detail")
-            else:
-                data = raw_result.get("data")
-                if isinstance(data, list):
-                    results = data
-                elif data:
-                    results = [data]
+                    # Пользователь мог уйти из результатов (выбрал фильм или начал новый поиск)
+                    if await state.get_state() != SearchState.waiting_for_selection:
+                        break
+
+                    data = await state.get_data()
+                    current_page = data.get("current_page", 0)
+                    await state.update_data(
+                        search_refs=content_cache.put_many(results), total_results=len(results)
+                    )
+                    await refresh_card_text(
+                        card,
+                        get_search_results_message(results, current_page),
+                        keyboard=get_search_results_keyboard(results, current_page),
+                    )
+                    prefetch_neighbour_posters(message.bot, results, current_page)
+
+                if len(results) >= 5:
+                    break
+
+            elif event_type == "done":
+                if event.get("source") == "not_found":
+                    error_message = event.get("message")
+                break
+
+            elif event_type == "error":
+                error_message = event.get("error") or event.get("detail")
+                break
+
+        if card is not None:
+            logger.info(f"Поиск завершен, найдено {len(results)} результатов")
+            return
 
         if error_message:
             await search_message.edit_text(
@@ -72,39 +147,11 @@ async def process_search_query(message: types.Message, state: FSMContext):
             await state.clear()
             return
 
-        if not results:
-            await search_message.edit_text(
-                "Ничего не найдено. Попробуйте другой запрос.",
-                reply_markup=get_main_menu_keyboard(),
-            )
-            await state.clear()
-            return
-        
-        results = results[:5]
-
-        await state.update_data(
-            search_results=results,
-            current_page=0,
-            search_query=query,
-            total_results=len(results),
-        )
-
-        text = get_search_results_message(results, 0)
-        keyboard = get_search_results_keyboard(results, 0)
-
-        try:
-            await search_message.delete()
-        except Exception:
-            pass
-
-        await send_content_card(
-            message,
-            text,
-            keyboard=keyboard,
-            poster_url=results[0].get("poster_url"),
+        await search_message.edit_text(
+            "Ничего не найдено. Попробуйте другой запрос.",
+            reply_markup=get_main_menu_keyboard(),
         )
-        await state.set_state(SearchState.waiting_for_selection)
-        logger.info(f"Поиск завершен, найдено {len(results)} результатов")
+        await state.clear()
 
     except Exception as e:
         logger.error(f"Ошибка при поиске: {e}")
@@ -117,10 +164,9 @@ async def process_search_query(message: types.Message, state: FSMContext):
 
 @router.callback_query(F.data.startswith("search_page_"))
 async def change_search_page(callback: types.CallbackQuery, state: FSMContext):
-    data = await state.get_data()
-    results = data.get("search_results", [])
+    results = await load_search_results(state)
 
-    if not results:
+    if not any(results):
         await callback.answer("Результаты не найдены", show_alert=True)
         return
 
@@ -131,18 +177,18 @@ async def change_search_page(callback: types.CallbackQuery, state: FSMContext):
     text = get_search_results_message(results, current_page)
     keyboard = get_search_results_keyboard(results, current_page)
 
-    poster_url = results[current_page].get("poster_url")
+    poster_url = (results[current_page] or {}).get("poster_url")
     await update_content_card(
         callback.message, text, keyboard=keyboard, poster_url=poster_url
     )
+    prefetch_neighbour_posters(callback.bot, results, current_page)
     await state.update_data(current_page=current_page)
     await callback.answer()
 
 
 @router.callback_query(F.data.startswith("search_add_"))
 async def start_add_to_history(callback: types.CallbackQuery, state: FSMContext):
-    data = await state.get_data()
-    results = data.get("search_results", [])
+    results = await load_search_results(state)
 
     if not results:
         await callback.answer("Результаты поиска недоступны", show_alert=True)
@@ -159,6 +205,9 @@ async def start_add_to_history(callback: types.CallbackQuery, state: FSMContext)
         return
 
     selected = results[index]
+    if not selected:
+        await callback.answer("Карточка недоступна, повторите поиск", show_alert=True)
+        return
     if selected.get("already_watched"):
         await callback.answer("Фильм уже просмотрен", show_alert=True)
         return
@@ -166,7 +215,7 @@ async def start_add_to_history(callback: types.CallbackQuery, state: FSMContext)
     title = selected.get("title") or "фильм"
 
     
-    await state.update_data(selected_content=selected)
+    await state.update_data(selected_ref=content_cache.put(selected))
     await callback.message.answer( f"Оставьте отзыв о фильме «{title}» (или отправьте '-' чтобы пропустить):",
         reply_markup=types.ReplyKeyboardRemove(),)
     
@@ -214,7 +263,8 @@ async def collect_watched_date(message: types.Message, state: FSMContext):
         await message.answer("Дата просмотра не может быть в будущем.")
         return
 
-    await state.update_data(watched_at=watched_at)
+    # В Redis состояние хранится как JSON, поэтому дата - строкой
+    await state.update_data(watched_at=watched_at.isoformat())
     await message.answer(
         "Ваша оценка от 1 до 10:",
         reply_markup=types.ReplyKeyboardRemove(),
@@ -233,8 +283,8 @@ async def collect_rating(message: types.Message, state: FSMContext):
         return
 
     data = await state.get_data()
-    selected = data.get("selected_content")
-    watched_at = data.get("watched_at")
+    selected = await content_cache.resolve(data.get("selected_ref"))
+    watched_at = datetime.fromisoformat(data["watched_at"]) if data.get("watched_at") else None
     review = data.get("review")
 
     if not selected:
@@ -244,17 +294,9 @@ async def collect_rating(message: types.Message, state: FSMContext):
 
     history_service = HistoryService()
 
-    content = await history_service.ensure_content_exists(selected)
-    if not content or not content.get("id"):
-        await message.answer(
-            "Не удалось подготовить фильм для сохранения. Попробуйте позже или сделайте новый поиск."
-        )
-        await state.clear()
-        return
-
-    saved = await history_service.add_view_history(
+    saved = await history_service.log_view(
         telegram_id=message.from_user.id,
-        content_id=content["id"],
+        content=selected,
         rating=rating,
         notes=review,
         watched_at=watched_at,
@@ -265,7 +307,7 @@ async def collect_rating(message: types.Message, state: FSMContext):
         },
     )
 
-    title = content.get("title") or selected.get("title") or "Фильм"
+    title = (saved or {}).get("content_title") or selected.get("title") or "Фильм"
 
     if saved and saved.get("id"):
         await message.answer(
@@ -321,8 +363,7 @@ async def return_to_menu(callback: types.CallbackQuery, state: FSMContext):
 
 @router.callback_query(F.data.startswith("search_watchlist_"))
 async def add_to_watchlist(callback: types.CallbackQuery, state: FSMContext):
-    data = await state.get_data()
-    results = data.get("search_results", [])
+    results = await load_search_results(state)
 
     if not results:
         await callback.answer("Результаты недоступны", show_alert=True)
@@ -339,6 +380,9 @@ async def add_to_watchlist(callback: types.CallbackQuery, state: FSMContext):
         return
 
     selected = results[index]
+    if not selected:
+        await callback.answer("Карточка недоступна, повторите поиск", show_alert=True)
+        return
     if selected.get("already_watched"):
         await callback.answer("Фильм уже просмотрен", show_alert=True)
         return
@@ -5,34 +5,28 @@ import logging
 
 from app.keyboards.main_menu import get_main_menu_keyboard
 from app.utils.text_templates import get_start_message
-from app.services.api_client import api_client
+from app.services.user_service import UserService
 
 router = Router()
 logger = logging.getLogger(__name__)
 
 async def register_user_in_api(telegram_user: types.User) -> bool:
     try:
-        user_data = {
-            "telegram_id": str(telegram_user.id),
-            "username": telegram_user.username,
-            "first_name": telegram_user.first_name,
-            "last_name": telegram_user.last_name,
-        }
-        
-        logger.info(f"Регистрируем пользователя: {user_data}")
-        response = await api_client.post("/api/v1/users/", data=user_data) 
-        if response:
-            logger.info(f"Пользователь зарегистрирован: {response.get('id')}")
+        logger.info(f"Регистрируем пользователя: {telegram_user.id}")
+        # Заодно заполняет кэш пользователей, дальше бот не ходит в API за user_id
+        user = await UserService().get_or_create_user(
+            telegram_id=telegram_user.id,
+            username=telegram_user.username,
+            first_name=telegram_user.first_name,
+            last_name=telegram_user.last_name,
+        )
+        if user:
+            logger.info(f"Пользователь зарегистрирован: {user.get('id')}")
             return True
-        else:
-            check_response = await api_client.get(f"/api/v1/users/telegram/{telegram_user.id}")
-            if check_response:
-                logger.info(f"Пользователь уже существует: {telegram_user.id}")
-                return True
-            else:
-                logger.error(f"Не удалось зарегистрировать пользователя {telegram_user.id}")
-                return False
-                
+
+        logger.error(f"Не удалось зарегистрировать пользователя {telegram_user.id}")
+        return False
+
     except Exception as e:
         logger.error(f"Ошибка при регистрации пользователя: {e}")
         return False
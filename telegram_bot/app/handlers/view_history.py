@@ -4,10 +4,10 @@ from aiogram.fsm.context import FSMContext
 
 from app.keyboards.history_keyboards import get_history_results_keyboard
 from app.keyboards.main_menu import get_main_menu_keyboard
-from app.services.history_service import HistoryService
+from app.services.record_pager import history_pager
 from app.states.history_state import HistoryState
 
-from app.utils.message_helpers import send_content_card, update_content_card
+from app.utils.message_helpers import prefetch_posters, send_content_card, update_content_card
 from app.utils.text_templates import get_history_results_message
 
 router = Router()
@@ -17,25 +17,17 @@ router = Router()
 async def cmd_history(message: types.Message, state: FSMContext):
     await state.clear()
 
-    history_service = HistoryService()
-    history = await history_service.get_user_history(
-        telegram_id=message.from_user.id,
-        limit=50,
-        profile={
-            "username": message.from_user.username,
-            "first_name": message.from_user.first_name,
-            "last_name": message.from_user.last_name,
-        },
-    )
+    telegram_id = message.from_user.id
+    record, pager_state = await history_pager.open(telegram_id)
 
-    if not isinstance(history, list):
+    if pager_state is None:
         await message.answer(
             "Не удалось загрузить историю. Попробуйте позже или повторите запрос.",
             reply_markup=get_main_menu_keyboard(),
         )
         return
 
-    if not history:
+    if not record:
         await message.answer(
             "Ваша история просмотров пуста.\n"
             "Добавьте первый просмотренный фильм или сериал!",
@@ -43,28 +35,27 @@ async def cmd_history(message: types.Message, state: FSMContext):
         )
         return
 
-    await state.update_data(history_records=history, history_page=0)
+    # Записи остаются в кэше бота, в состоянии только номер записи и курсоры пачек
+    total = pager_state["total"]
+    await state.update_data(history_page=0, history_pager=pager_state)
     await state.set_state(HistoryState.viewing)
 
-    text = get_history_results_message(history, 0)
-    keyboard = get_history_results_keyboard(history, 0)
-    poster_url = (history[0].get("content") or {}).get("poster_url")
+    text = get_history_results_message(record, 0, total)
+    keyboard = get_history_results_keyboard(total, 0)
+    poster_url = (record.get("content") or {}).get("poster_url")
 
     await send_content_card(
         message, text, keyboard=keyboard, poster_url=poster_url
     )
+    prefetch_posters(message.bot, [history_pager.peek(telegram_id, pager_state, 1)])
 
 
 @router.callback_query(F.data.startswith("history_page_"))
 async def paginate_history(callback: types.CallbackQuery, state: FSMContext):
     data = await state.get_data()
-    history = data.get("history_records", [])
+    pager_state = data.get("history_pager")
 
-    if not isinstance(history, list):
-        await callback.answer("История недоступна", show_alert=True)
-        return
-
-    if not history:
+    if not pager_state or not pager_state.get("total"):
         await callback.answer("История недоступна", show_alert=True)
         return
 
@@ -74,21 +65,30 @@ async def paginate_history(callback: types.CallbackQuery, state: FSMContext):
         await callback.answer("Некорректная страница", show_alert=True)
         return
 
-    safe_page = max(0, min(page, len(history) - 1))
+    telegram_id = callback.from_user.id
+    total = pager_state["total"]
+    safe_page = max(0, min(page, total - 1))
+    record = await history_pager.get(telegram_id, pager_state, safe_page)
+
+    if not record:
+        await callback.answer("История недоступна", show_alert=True)
+        return
 
-    text = get_history_results_message(history, safe_page)
-    keyboard = get_history_results_keyboard(history, safe_page)
-    poster_url = (history[safe_page].get("content") or {}).get("poster_url")
+    text = get_history_results_message(record, safe_page, total)
+    keyboard = get_history_results_keyboard(total, safe_page)
+    poster_url = (record.get("content") or {}).get("poster_url")
 
     await update_content_card(
         callback.message, text, keyboard=keyboard, poster_url=poster_url
     )
-    await state.update_data(history_page=safe_page)
+    prefetch_posters(
+        callback.bot,
+        [history_pager.peek(telegram_id, pager_state, index) for index in (safe_page + 1, safe_page - 1)],
+    )
+    await state.update_data(history_page=safe_page, history_pager=pager_state)
     await callback.answer()
 
 
 @router.callback_query(F.data == "history_page_current")
 async def history_page_current(callback: types.CallbackQuery):
     await callback.answer()
-
-
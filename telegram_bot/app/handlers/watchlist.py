@@ -6,10 +6,12 @@ from aiogram.fsm.context import FSMContext
 
 from app.keyboards.watchlist_keyboards import get_watchlist_results_keyboard
 from app.keyboards.main_menu import get_main_menu_keyboard
+from app.services.content_cache import content_cache
 from app.services.history_service import HistoryService
+from app.services.record_pager import watchlist_pager
 from app.services.watchlist_service import WatchlistService
 from app.states.watchlist_state import WatchlistState
-from app.utils.message_helpers import send_content_card, update_content_card
+from app.utils.message_helpers import prefetch_posters, send_content_card, update_content_card
 from app.utils.text_templates import get_watchlist_message
 
 router = Router()
@@ -21,13 +23,10 @@ async def cmd_watchlist(message: types.Message, state: FSMContext):
     """Показать список желаемого с пагинацией"""
     await state.clear()
 
+    telegram_id = message.from_user.id
+    item, pager_state = await watchlist_pager.open(telegram_id)
 
-    watchlist_service = WatchlistService()
-    watchlist = await watchlist_service.get_user_watchlist(
-        telegram_id=message.from_user.id
-    )
-
-    if not watchlist:
+    if not item:
         await message.answer(
             "Ваш список желаемого пуст.\n"
             "Добавьте первый фильм или сериал, который хотите посмотреть!",
@@ -35,41 +34,60 @@ async def cmd_watchlist(message: types.Message, state: FSMContext):
         )
         return
 
-    await state.update_data(watchlist_results=watchlist, watchlist_page=0)
+    # Записи остаются в кэше бота, в состоянии только номер записи и курсоры пачек
+    total = pager_state["total"]
+    await state.update_data(watchlist_page=0, watchlist_pager=pager_state)
 
-    text = get_watchlist_message(watchlist, 0)
-    keyboard = get_watchlist_results_keyboard(watchlist, 0)
-    poster_url = (watchlist[0].get("content") or {}).get("poster_url")
+    text = get_watchlist_message(item, 0, total)
+    keyboard = get_watchlist_results_keyboard(total, 0)
+    poster_url = (item.get("content") or {}).get("poster_url")
 
     await send_content_card(
         message, text, keyboard=keyboard, poster_url=poster_url
     )
+    prefetch_posters(message.bot, [watchlist_pager.peek(telegram_id, pager_state, 1)])
     await state.set_state(WatchlistState.viewing)
 
 
-@router.callback_query(WatchlistState.viewing, F.data.startswith("watchlist_page_"))
-async def change_watchlist_page(callback: types.CallbackQuery, state: FSMContext):
+async def load_watchlist_item(callback: types.CallbackQuery, state: FSMContext, page: int):
+    """Запись watchlist по номеру и обновленное состояние пагинатора"""
     data = await state.get_data()
-    results = data.get("watchlist_results", [])
-    if not results:
-        await callback.answer("Список пуст", show_alert=True)
-        return
+    pager_state = data.get("watchlist_pager")
+    if not pager_state or not pager_state.get("total"):
+        return None, None
+
+    item = await watchlist_pager.get(callback.from_user.id, pager_state, page)
+    return item, pager_state
 
+
+@router.callback_query(WatchlistState.viewing, F.data.startswith("watchlist_page_"))
+async def change_watchlist_page(callback: types.CallbackQuery, state: FSMContext):
     try:
         page = int(callback.data.split("_")[2])
     except (ValueError, IndexError):
         await callback.answer("Некорректная страница", show_alert=True)
         return
 
-    safe_page = max(0, min(page, len(results) - 1))
-    text = get_watchlist_message(results, safe_page)
-    keyboard = get_watchlist_results_keyboard(results, safe_page)
-    poster_url = (results[safe_page].get("content") or {}).get("poster_url")
+    data = await state.get_data()
+    total = (data.get("watchlist_pager") or {}).get("total", 0)
+    safe_page = max(0, min(page, total - 1))
+    item, pager_state = await load_watchlist_item(callback, state, safe_page)
+    if not item:
+        await callback.answer("Список пуст", show_alert=True)
+        return
+
+    text = get_watchlist_message(item, safe_page, total)
+    keyboard = get_watchlist_results_keyboard(total, safe_page)
+    poster_url = (item.get("content") or {}).get("poster_url")
 
     await update_content_card(
         callback.message, text, keyboard=keyboard, poster_url=poster_url
     )
-    await state.update_data(watchlist_page=safe_page)
+    prefetch_posters(
+        callback.bot,
+        [watchlist_pager.peek(callback.from_user.id, pager_state, index) for index in (safe_page + 1, safe_page - 1)],
+    )
+    await state.update_data(watchlist_page=safe_page, watchlist_pager=pager_state)
     await callback.answer()
 
 
@@ -96,28 +114,24 @@ async def clear_watchlist(callback: types.CallbackQuery, state: FSMContext):
 
 @router.callback_query(WatchlistState.viewing, F.data.startswith("watchlist_add_"))
 async def start_add_from_watchlist(callback: types.CallbackQuery, state: FSMContext):
-    data = await state.get_data()
-    results = data.get("watchlist_results", [])
-    if not results:
-        await callback.answer("Список пуст", show_alert=True)
-        return
-
     try:
         page = int(callback.data.split("_")[2])
     except (ValueError, IndexError):
         await callback.answer("Некорректный выбор", show_alert=True)
         return
 
-    if page < 0 or page >= len(results):
+    selected, pager_state = await load_watchlist_item(callback, state, page)
+    if not selected:
         await callback.answer("Элемент вне диапазона", show_alert=True)
         return
 
-    selected = results[page]
+    content = selected.get("content") or {}
     await state.update_data(
-        selected_watchlist_item=selected
+        selected_watchlist_id=selected.get("id"),
+        selected_ref=content_cache.put(content),
+        watchlist_pager=pager_state,
     )
 
-    content = selected.get("content") or {}
     title = content.get("title") or selected.get("content_title") or "фильм"
 
 
@@ -170,7 +184,7 @@ async def watchlist_watched_date(message: types.Message, state: FSMContext):
         await message.answer("Дата просмотра не может быть в будущем.")
         return
 
-    await state.update_data(watched_at=watched_at)
+    await state.update_data(watched_at=watched_at.isoformat())
     await message.answer("Ваша оценка от 1 до 10:", reply_markup=types.ReplyKeyboardRemove())
     await state.set_state(WatchlistState.waiting_for_rating)
 
@@ -186,23 +200,13 @@ async def watchlist_rating(message: types.Message, state: FSMContext):
         return
 
     data = await state.get_data()
-    selected = data.get("selected_watchlist_item") or {}
-    watched_at = data.get("watched_at")
+    watchlist_id = data.get("selected_watchlist_id")
+    watched_at = datetime.fromisoformat(data["watched_at"]) if data.get("watched_at") else None
     review = data.get("review")
 
-    content = (selected.get("content") or {})
-    content_id = content.get("id")
-    watchlist_id = selected.get("id")
+    content = await content_cache.resolve(data.get("selected_ref")) or {}
 
-    history_service = HistoryService()
-    watchlist_service = WatchlistService()
-    
-    ensured = await history_service.ensure_content_exists(content)
-    if ensured:
-        content = ensured
-        content_id = content.get("id")
-
-    if not content_id or not watchlist_id:
+    if not (content.get("id") or content.get("imdb_id") or content.get("title")) or not watchlist_id:
         await message.answer(
             "Не удалось определить фильм. Попробуйте снова через список желаемого.",
             reply_markup=get_main_menu_keyboard(),
@@ -210,9 +214,11 @@ async def watchlist_rating(message: types.Message, state: FSMContext):
         await state.clear()
         return
 
-    saved = await history_service.add_view_history(
+    history_service = HistoryService()
+
+    saved = await history_service.log_view(
         telegram_id=message.from_user.id,
-        content_id=content_id,
+        content=content,
         rating=rating,
         notes=review,
         watched_at=watched_at,
@@ -221,39 +227,18 @@ async def watchlist_rating(message: types.Message, state: FSMContext):
             "first_name": message.from_user.first_name,
             "last_name": message.from_user.last_name,
         },
+        watchlist_id=watchlist_id,
     )
 
-    if (not saved or not saved.get("id")) and selected:
-        refreshed_content = await history_service.ensure_content_exists(
-            content or selected
-        )
-
-        if refreshed_content and refreshed_content.get("id"):
-            content = refreshed_content
-            content_id = content.get("id")
-            saved = await history_service.add_view_history(
-                telegram_id=message.from_user.id,
-                content_id=content_id,
-                rating=rating,
-                notes=review,
-                watched_at=watched_at,
-                user_profile={
-                    "username": message.from_user.username,
-                    "first_name": message.from_user.first_name,
-                    "last_name": message.from_user.last_name,
-                },
-            )
-
-    title = content.get("title") or "Фильм"
+    title = (saved or {}).get("content_title") or content.get("title") or "Фильм"
 
     if saved and saved.get("id"):
-        await watchlist_service.remove_from_watchlist(watchlist_id)
         await message.answer(
             f"{title} добавлен в историю!\n"
             f"Ваша оценка: {rating}/10\n"
             f"Дата: {watched_at.strftime('%d.%m.%Y') if isinstance(watched_at, datetime) else 'не указана'}"
             + (f"\nОтзыв: {review}" if review else "")
-            + "\n\nФильм удален из списка желаемого.",
+            + ("\n\nФильм удален из списка желаемого." if saved.get("removed_from_watchlist") else ""),
             reply_markup=get_main_menu_keyboard(),
         )
     else:
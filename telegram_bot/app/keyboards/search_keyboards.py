@@ -15,16 +15,18 @@ def get_search_results_keyboard(results: list, current_page: int) -> InlineKeybo
 
     safe_page = max(0, min(current_page, len(results) - 1))
 
-    builder.row(
-        InlineKeyboardButton(
-            text="➕ Добавить в просмотренное",
-            callback_data=f"search_add_{safe_page}",
-        ),
-        InlineKeyboardButton(
-            text="📝 Добавить в watchlist",
-            callback_data=f"search_watchlist_{safe_page}",
-        ),
-    )
+    # Для недоступной карточки (None) действия не показываются, только навигация
+    if results[safe_page]:
+        builder.row(
+            InlineKeyboardButton(
+                text="➕ Добавить в просмотренное",
+                callback_data=f"search_add_{safe_page}",
+            ),
+            InlineKeyboardButton(
+                text="📝 Добавить в watchlist",
+                callback_data=f"search_watchlist_{safe_page}",
+            ),
+        )
 
     navigation_buttons = []
     if safe_page > 0:
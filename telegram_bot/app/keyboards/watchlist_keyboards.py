@@ -2,15 +2,15 @@ from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
 
-def get_watchlist_results_keyboard(results: list, current_page: int) -> InlineKeyboardMarkup:
+def get_watchlist_results_keyboard(total: int, current_page: int) -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
 
-    if not results:
+    if not total:
         builder.button(text="🏠 Меню", callback_data="return_to_menu")
         builder.adjust(1)
         return builder.as_markup()
 
-    safe_page = max(0, min(current_page, len(results) - 1))
+    safe_page = max(0, min(current_page, total - 1))
 
     builder.row(
         InlineKeyboardButton(
@@ -31,7 +31,7 @@ def get_watchlist_results_keyboard(results: list, current_page: int) -> InlineKe
                 text="⬅️ Назад", callback_data=f"watchlist_page_{safe_page-1}"
             )
         )
-    if safe_page < len(results) - 1:
+    if safe_page < total - 1:
         navigation_buttons.append(
             InlineKeyboardButton(
                 text="Вперед ➡️", callback_data=f"watchlist_page_{safe_page+1}"
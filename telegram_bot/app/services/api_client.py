@@ -1,7 +1,8 @@
 # telegram_bot/app/services/api_client.py
 import httpx
+import json
 import logging
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, AsyncIterator
 import os
 
 logger = logging.getLogger(__name__)
@@ -11,35 +12,73 @@ class APIClient:
         self.base_url = os.getenv("API_URL", "http://api:8000")
         self.client = httpx.AsyncClient(base_url=self.base_url, timeout=60.0)
 
-    async def request(self, method: str, endpoint: str, **kwargs) -> Optional[Dict[str, Any]]:
+    async def request(self, method: str, endpoint: str, retries: int = 0, **kwargs) -> Optional[Dict[str, Any]]:
+        """retries > 0 только для запросов с Idempotency-Key, которые безопасно повторить"""
+        attempt = 0
+        while True:
+            try:
+                response = await self.client.request(method, endpoint, **kwargs)
+                if response.is_success:
+                    if response.status_code == 204:
+                        return {"success": True}
+                    return response.json()
+
+                try:
+                    error_body = response.json()
+                except Exception:
+                    error_body = {"detail": response.text}
+
+                return {
+                    "success": False,
+                    "status_code": response.status_code,
+                    **(error_body if isinstance(error_body, dict) else {"error": str(error_body)}),
+                }
+            except httpx.TransportError as e:
+                if attempt < retries:
+                    attempt += 1
+                    logger.warning(f"API request failed, retry {attempt}/{retries}: {e}")
+                    continue
+                logger.error(f"API request failed: {e}")
+                return {"success": False, "error": str(e)}
+            except httpx.HTTPError as e:
+                logger.error(f"API request failed: {e}")
+                return {"success": False, "error": str(e)}
+            except Exception as e:
+                logger.error(f"Unexpected error in API request: {e}")
+                return {"success": False, "error": str(e)}
+
+    async def stream(self, method: str, endpoint: str, **kwargs) -> AsyncIterator[Dict[str, Any]]:
+        """Читает NDJSON-ответ построчно, ошибки отдаются событием type=error"""
         try:
-            response = await self.client.request(method, endpoint, **kwargs)
-            if response.is_success:
-                if response.status_code == 204:
-                    return {"success": True}
-                return response.json()
+            async with self.client.stream(method, endpoint, **kwargs) as response:
+                if not response.is_success:
+                    yield {"type": "error", "status_code": response.status_code}
+                    return
 
-            try:
-                error_body = response.json()
-            except Exception:
-                error_body = {"detail": response.text}
-
-            return {
-                "success": False,
-                "status_code": response.status_code,
-                **(error_body if isinstance(error_body, dict) else {"error": str(error_body)}),
-            }
+                async for line in response.aiter_lines():
+                    if line.strip():
+                        yield json.loads(line)
         except httpx.HTTPError as e:
-            logger.error(f"API request failed: {e}")
-            return {"success": False, "error": str(e)}
-        except Exception as e:
-            logger.error(f"Unexpected error in API request: {e}")
-            return {"success": False, "error": str(e)}
+            logger.error(f"API stream failed: {e}")
+            yield {"type": "error", "error": str(e)}
+        except ValueError as e:
+            logger.error(f"Invalid line in API stream: {e}")
+            yield {"type": "error", "error": str(e)}
 
     async def get(self, endpoint: str, params: Optional[Dict] = None) -> Optional[Dict[str, Any]]:
         return await self.request("GET", endpoint, params=params)
 
-    async def post(self, endpoint: str, data: Optional[Dict] = None) -> Optional[Dict[str, Any]]:
+    async def post(
+        self,
+        endpoint: str,
+        data: Optional[Dict] = None,
+        idempotency_key: Optional[str] = None,
+        retries: int = 2,
+    ) -> Optional[Dict[str, Any]]:
+        if idempotency_key:
+            return await self.request(
+                "POST", endpoint, retries=retries, json=data, headers={"Idempotency-Key": idempotency_key}
+            )
         return await self.request("POST", endpoint, json=data)
 
     async def put(self, endpoint: str, data: Optional[Dict] = None) -> Optional[Dict[str, Any]]:
@@ -0,0 +1,79 @@
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.services.api_client import api_client
+from app.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class ContentCache:
+    """Карточки контента по компактной ссылке: "imdb:<imdb_id>" или "id:<content_id>".
+
+    В FSM хранятся только ссылки, сами карточки живут в ограниченном LRU
+    процесса. Если карточки нет (вытеснена или состояние создано другой
+    репликой бота), она загружается из API.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.cards: TTLCache[Dict[str, Any]] = TTLCache(maxsize, ttl)
+        self.api_client = api_client
+
+    @staticmethod
+    def ref_for(item: Dict[str, Any]) -> Optional[str]:
+        if item.get("imdb_id"):
+            return f"imdb:{item['imdb_id']}"
+        if item.get("id") and item.get("source") != "omdb":
+            return f"id:{item['id']}"
+        return None
+
+    def put(self, item: Dict[str, Any]) -> Optional[str]:
+        ref = self.ref_for(item)
+        if ref:
+            self.cards.set(ref, item)
+        return ref
+
+    def put_many(self, items: List[Dict[str, Any]]) -> List[Optional[str]]:
+        """Ссылки в том же порядке, что и items; None там, где у карточки нет ссылки.
+
+        Номер карточки в callback_data и в состоянии - позиция в этом списке,
+        поэтому пропуски сохраняются, а не выбрасываются.
+        """
+        return [self.put(item) for item in items]
+
+    async def resolve(self, ref: Optional[str]) -> Optional[Dict[str, Any]]:
+        if not ref:
+            return None
+
+        hit, card = self.cards.get(ref)
+        if hit:
+            return card
+
+        kind, _, value = ref.partition(":")
+        if kind == "imdb":
+            card = await self.api_client.get(f"/api/v1/bot/content/{value}")
+        elif kind == "id":
+            card = await self.api_client.get(f"/api/v1/bot/content/id/{value}")
+        else:
+            return None
+
+        if not isinstance(card, dict) or card.get("success") is False:
+            logger.warning(f"Не удалось восстановить карточку {ref}")
+            return None
+
+        self.cards.set(ref, card)
+        return card
+
+    async def resolve_many(self, refs: List[Optional[str]]) -> List[Optional[Dict[str, Any]]]:
+        """Карточки по позициям refs; None на месте карточки, которую не удалось восстановить"""
+        return list(await asyncio.gather(*(self.resolve(ref) for ref in refs)))
+
+
+content_cache = ContentCache(maxsize=settings.CONTENT_CACHE_SIZE, ttl=settings.CONTENT_CACHE_TTL)
+
+# Пачки истории и watchlist, загруженные по курсору: в FSM остаются только номер записи и курсоры
+record_cache: TTLCache[Tuple[List[Dict[str, Any]], Optional[str]]] = TTLCache(
+    settings.RECORD_CACHE_SIZE, settings.RECORD_CACHE_TTL
+)
@@ -1,6 +1,6 @@
 # telegram_bot/app/services/content_service.py
 import logging
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, AsyncIterator
 from app.services.api_client import api_client
 
 logger = logging.getLogger(__name__)
@@ -21,6 +21,22 @@ class ContentService:
 
         return response
     
+    async def search_content_stream(self, title: str, content_type: str = None) -> AsyncIterator[Dict[str, Any]]:
+        params = {"title": title}
+        if content_type:
+            params["content_type"] = content_type
+
+        async for event in self.api_client.stream("GET", "/api/v1/bot/search/stream", params=params):
+            yield event
+    
+    async def autocomplete(self, query: str, limit: int = 10) -> list:
+        response = await self.api_client.get(
+            "/api/v1/content/autocomplete", params={"q": query, "limit": limit}
+        )
+        if isinstance(response, dict):
+            return response.get("results") or []
+        return []
+    
     async def add_from_omdb(self, title: str, content_type: str = "movie") -> Optional[Dict[str, Any]]:
         data = {
             "title": title,
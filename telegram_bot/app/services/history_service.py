@@ -1,6 +1,8 @@
 from typing import Optional, Dict, Any, List
 from datetime import datetime
+import uuid
 from app.services.api_client import api_client
+from app.services.record_pager import history_pager, watchlist_pager
 from app.services.user_service import UserService
 
 class HistoryService:
@@ -47,46 +49,63 @@ class HistoryService:
         return await self.api_client.get(f"/api/v1/view-history/{record_id}")
 
     async def ensure_content_exists(self, result: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        imdb_id = result.get("imdb_id")
+        if not (result.get("title") or result.get("original_title") or result.get("id")):
+            return None
 
-        if imdb_id:
-            existing = await self.api_client.get(f"/api/v1/content/imdb/{imdb_id}")
-            if isinstance(existing, dict) and existing.get("id"):
-                return existing
+        content = await self.api_client.post("/api/v1/content/resolve", data=self._content_payload(result))
+        if isinstance(content, dict) and content.get("id"):
+            return content
 
-        title = result.get("title") or result.get("original_title")
-        if not title:
-            return None
+        return None
+
+    async def log_view(
+        self,
+        telegram_id: int,
+        content: Dict[str, Any],
+        rating: Optional[float] = None,
+        notes: Optional[str] = None,
+        watched_at: Optional[datetime] = None,
+        user_profile: Optional[Dict[str, Any]] = None,
+        watchlist_id: Optional[int] = None,
+    ) -> Optional[Dict[str, Any]]:
+        profile = user_profile or {}
+        command = {
+            "telegram_id": str(telegram_id),
+            "username": profile.get("username"),
+            "first_name": profile.get("first_name"),
+            "last_name": profile.get("last_name"),
+            "content": self._content_payload(content),
+            "rating": rating,
+            "notes": notes,
+            "watched_at": watched_at.isoformat() if isinstance(watched_at, datetime) else watched_at,
+            "watchlist_id": watchlist_id,
+        }
 
-        search_resp = await self.api_client.get(
-            "/api/v1/content/search",
-            params={"query": title, "limit": 1},
+        # Один ключ на действие пользователя: повтор после таймаута не создаст вторую запись
+        saved = await self.api_client.post(
+            "/api/v1/bot/views", data=command, idempotency_key=str(uuid.uuid4())
         )
-        if isinstance(search_resp, dict) and search_resp.get("results"):
-            first = search_resp["results"][0]
-            if first and first.get("id"):
-                return first
-
-        payload = {
-            "title": title,
-            "original_title": result.get("original_title") or title,
+        history_pager.forget(telegram_id)
+        watchlist_pager.forget(telegram_id)
+        return saved
+
+    @staticmethod
+    def _content_payload(result: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "id": result.get("id") if result.get("source") != "omdb" else None,
+            "title": result.get("title"),
+            "original_title": result.get("original_title"),
             "description": result.get("description"),
-            "content_type": result.get("content_type") or "movie",
+            "content_type": result.get("content_type"),
             "release_year": result.get("release_year"),
             "imdb_rating": result.get("imdb_rating"),
-            "imdb_id": imdb_id,
+            "imdb_id": result.get("imdb_id"),
             "poster_url": result.get("poster_url"),
             "genre": result.get("genre"),
             "director": result.get("director"),
-            "cast": result.get("cast"),
+            "cast": result.get("cast") or result.get("actors_cast"),
         }
 
-        created = await self.api_client.post("/api/v1/content/", data=payload)
-        if isinstance(created, dict) and created.get("id"):
-            return created
-
-        return None
-
     async def add_view_history(
         self,
         telegram_id: int,
@@ -115,7 +134,9 @@ class HistoryService:
             "watched_at": watched_at.isoformat() if isinstance(watched_at, datetime) else watched_at,
         }
 
-        created = await self.api_client.post("/api/v1/view-history/", data=history_data)
+        created = await self.api_client.post(
+            "/api/v1/view-history/", data=history_data, idempotency_key=str(uuid.uuid4())
+        )
 
         if isinstance(created, dict) and created.get("id"):
             return created
@@ -0,0 +1,250 @@
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
+
+from app.config import settings
+from app.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Ошибки Telegram, которые относятся к самой картинке: url не скачался или file_id недействителен
+_MEDIA_ERROR_MARKERS = (
+    "wrong file identifier",
+    "wrong remote file identifier",
+    "failed to get http url content",
+    "wrong type of the web page content",
+    "webpage_media_empty",
+    "webpage_curl_failed",
+    "image_process_failed",
+    "photo_invalid_dimensions",
+    "file_reference",
+)
+
+
+def is_media_error(error: Exception) -> bool:
+    """Telegram отклонил сам постер, а не подпись, разметку, частоту запросов или сеть"""
+    if not isinstance(error, TelegramBadRequest):
+        return False
+    text = (error.message or "").lower()
+    return any(marker in text for marker in _MEDIA_ERROR_MARKERS)
+
+
+class SQLitePosterStore:
+    """file_id постеров на диске, переживает перезапуск бота.
+
+    Размер ограничен max_rows: раз в prune_every записей удаляются те, которые
+    дольше всех не использовались.
+    """
+
+    def __init__(self, path: str, max_rows: int, prune_every: int = 100):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.max_rows = max_rows
+        self.prune_every = prune_every
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS poster_file_ids (
+                url TEXT PRIMARY KEY,
+                file_id TEXT NOT NULL,
+                used_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_poster_used_at ON poster_file_ids (used_at)")
+        self._conn.commit()
+
+    def _get(self, url: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT file_id FROM poster_file_ids WHERE url = ?", (url,)).fetchone()
+            if row:
+                self._conn.execute("UPDATE poster_file_ids SET used_at = ? WHERE url = ?", (time.time(), url))
+                self._conn.commit()
+        return row[0] if row else None
+
+    def _set(self, url: str, file_id: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO poster_file_ids (url, file_id, used_at) VALUES (?, ?, ?)",
+                (url, file_id, time.time()),
+            )
+            self._writes += 1
+            if self._writes % self.prune_every == 0:
+                self._prune()
+            self._conn.commit()
+
+    def _prune(self) -> None:
+        self._conn.execute(
+            """
+            DELETE FROM poster_file_ids WHERE url IN (
+                SELECT url FROM poster_file_ids ORDER BY used_at DESC LIMIT -1 OFFSET ?
+            )
+            """,
+            (self.max_rows,),
+        )
+
+    def _delete(self, url: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM poster_file_ids WHERE url = ?", (url,))
+            self._conn.commit()
+
+    async def get(self, url: str) -> Optional[str]:
+        return await asyncio.to_thread(self._get, url)
+
+    async def set(self, url: str, file_id: str) -> None:
+        await asyncio.to_thread(self._set, url, file_id)
+
+    async def delete(self, url: str) -> None:
+        await asyncio.to_thread(self._delete, url)
+
+
+class RedisPosterStore:
+    """file_id постеров в Redis, общие для всех реплик бота; размер ограничен TTL ключей"""
+
+    def __init__(self, url: str, ttl: int):
+        from redis.asyncio import Redis
+
+        self.ttl = ttl
+        self.redis = Redis.from_url(url, decode_responses=True)
+
+    @staticmethod
+    def _key(url: str) -> str:
+        return "poster:" + hashlib.sha1(url.encode()).hexdigest()
+
+    async def get(self, url: str) -> Optional[str]:
+        # GETEX продлевает жизнь популярным постерам
+        return await self.redis.getex(self._key(url), ex=self.ttl)
+
+    async def set(self, url: str, file_id: str) -> None:
+        await self.redis.set(self._key(url), file_id, ex=self.ttl)
+
+    async def delete(self, url: str) -> None:
+        await self.redis.delete(self._key(url))
+
+
+class PosterCache:
+    """Соответствие poster_url -> file_id, который Telegram вернул после первой отправки.
+
+    Повторная отправка по file_id не заставляет Telegram заново скачивать картинку
+    с OMDB. Первый уровень - LRU в памяти, второй - постоянное хранилище.
+    URL, по которым Telegram не смог получить картинку, запоминаются на
+    failure_ttl секунд, чтобы сразу показывать карточку без постера.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, failure_ttl: float, store=None, prefetch_chat_id: Optional[int] = None):
+        self.memory: TTLCache[Optional[str]] = TTLCache(maxsize, ttl)
+        self.failure_ttl = failure_ttl
+        self.store = store
+        self.prefetch_chat_id = prefetch_chat_id
+        self._prefetching: Dict[str, asyncio.Task] = {}
+
+    async def get(self, url: str) -> Optional[str]:
+        """file_id для url; None - отправлять по url"""
+        hit, file_id = self.memory.get(url)
+        if hit:
+            return file_id
+
+        if self.store is not None:
+            try:
+                file_id = await self.store.get(url)
+            except Exception as e:
+                logger.error(f"Ошибка чтения кэша постеров: {e}")
+                file_id = None
+            if file_id:
+                self.memory.set(url, file_id)
+                return file_id
+
+        return None
+
+    def is_failed(self, url: str) -> bool:
+        hit, file_id = self.memory.get(url)
+        return hit and file_id is None
+
+    async def remember(self, url: str, file_id: str) -> None:
+        self.memory.set(url, file_id)
+        if self.store is not None:
+            try:
+                await self.store.set(url, file_id)
+            except Exception as e:
+                logger.error(f"Ошибка записи кэша постеров: {e}")
+
+    async def forget(self, url: str) -> None:
+        self.memory.invalidate(url)
+        if self.store is not None:
+            try:
+                await self.store.delete(url)
+            except Exception as e:
+                logger.error(f"Ошибка удаления из кэша постеров: {e}")
+
+    def mark_failed(self, url: str) -> None:
+        self.memory.set(url, None, ttl=self.failure_ttl)
+
+    def prefetch(self, bot: Bot, url: Optional[str]) -> None:
+        """Заранее получить file_id постера следующей страницы.
+
+        Картинка отправляется в служебный чат POSTER_CACHE_CHAT_ID и сразу
+        удаляется. Без служебного чата предзагрузка не выполняется.
+        """
+        if not url or not self.prefetch_chat_id or url in self._prefetching:
+            return
+
+        hit, _ = self.memory.get(url)
+        if hit:
+            return
+
+        task = asyncio.create_task(self._prefetch(bot, url))
+        self._prefetching[url] = task
+        task.add_done_callback(lambda _: self._prefetching.pop(url, None))
+
+    async def _prefetch(self, bot: Bot, url: str) -> None:
+        if await self.get(url):
+            return
+
+        try:
+            sent = await bot.send_photo(self.prefetch_chat_id, url, disable_notification=True)
+        except Exception as e:
+            logger.warning(f"Не удалось загрузить постер {url}: {e}")
+            # Flood control, сеть или недоступный служебный чат не повод скрывать постер от всех
+            if is_media_error(e):
+                self.mark_failed(url)
+            return
+
+        if sent.photo:
+            await self.remember(url, sent.photo[-1].file_id)
+        try:
+            await sent.delete()
+        except Exception:
+            pass
+
+
+def create_poster_store():
+    """Постоянное хранилище по настройке POSTER_CACHE_STORE: redis, sqlite или пусто (только память)"""
+    if settings.POSTER_CACHE_STORE == "redis":
+        return RedisPosterStore(settings.REDIS_URL, ttl=settings.POSTER_CACHE_TTL)
+    if settings.POSTER_CACHE_STORE == "sqlite":
+        return SQLitePosterStore(settings.POSTER_CACHE_PATH, max_rows=settings.POSTER_CACHE_MAX_ROWS)
+    if settings.POSTER_CACHE_STORE:
+        raise ValueError(f"Неизвестное POSTER_CACHE_STORE: {settings.POSTER_CACHE_STORE}")
+    return None
+
+
+poster_cache = PosterCache(
+    maxsize=settings.POSTER_CACHE_SIZE,
+    ttl=settings.POSTER_CACHE_TTL,
+    failure_ttl=settings.POSTER_FAILURE_TTL,
+    store=create_poster_store(),
+    prefetch_chat_id=settings.POSTER_CACHE_CHAT_ID,
+)
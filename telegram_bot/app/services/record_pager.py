@@ -0,0 +1,133 @@
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.services.api_client import api_client
+from app.services.content_cache import record_cache
+
+logger = logging.getLogger(__name__)
+
+
+class RecordPager:
+    """Ленивый просмотр истории или watchlist по одной записи на карточку.
+
+    Записи загружаются из API пачками по chunk_size через курсор. В FSM лежит
+    только состояние пагинатора: total и курсоры уже открытых пачек
+    ({"cursors": [None, "...", ...], "total": 42}). Сами пачки хранятся в
+    record_cache; рядом с текущей записью держится окно ± 1 пачка, соседняя
+    пачка подгружается в фоне, когда пользователь подходит к ее границе.
+    """
+
+    def __init__(self, kind: str, chunk_size: int):
+        self.kind = kind
+        self.chunk_size = chunk_size
+        self.api_client = api_client
+        self._loading: Dict[Tuple[int, Optional[str]], asyncio.Task] = {}
+
+    def _endpoint(self, telegram_id: int) -> str:
+        return f"/api/v1/bot/users/{telegram_id}/{self.kind}"
+
+    def _key(self, telegram_id: int, cursor: Optional[str]) -> Tuple[str, int, Optional[str]]:
+        # Пачка определяется курсором, а не номером: новые записи не сдвигают уже загруженные
+        return (self.kind, telegram_id, cursor)
+
+    async def open(self, telegram_id: int) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """Первая запись и новое состояние пагинатора; (None, None) при ошибке API"""
+        self.forget(telegram_id)
+        pager_state: Dict[str, Any] = {"cursors": [None], "total": 0}
+        items = await self._load_chunk(telegram_id, pager_state, 0)
+        if items is None:
+            return None, None
+        return (items[0] if items else None), pager_state
+
+    async def get(self, telegram_id: int, pager_state: Dict[str, Any], index: int) -> Optional[Dict[str, Any]]:
+        """Запись с номером index; pager_state дополняется курсором следующей пачки"""
+        if index < 0 or index >= pager_state.get("total", 0):
+            return None
+
+        chunk, offset = divmod(index, self.chunk_size)
+        items = await self._load_chunk(telegram_id, pager_state, chunk)
+        record = items[offset] if items and offset < len(items) else None
+
+        # Окно ± 1 пачка: соседнюю загружаем заранее, пока пользователь смотрит край текущей
+        if offset == self.chunk_size - 1:
+            self._prefetch(telegram_id, pager_state, chunk + 1)
+        elif offset == 0 and chunk > 0:
+            self._prefetch(telegram_id, pager_state, chunk - 1)
+        return record
+
+    def peek(self, telegram_id: int, pager_state: Dict[str, Any], index: int) -> Optional[Dict[str, Any]]:
+        """Запись из уже загруженных пачек без обращения к API"""
+        if index < 0 or index >= pager_state.get("total", 0):
+            return None
+
+        chunk, offset = divmod(index, self.chunk_size)
+        cursors = pager_state.get("cursors", [])
+        if chunk >= len(cursors):
+            return None
+
+        hit, cached = record_cache.get(self._key(telegram_id, cursors[chunk]))
+        if not hit:
+            return None
+        items, _ = cached
+        return items[offset] if offset < len(items) else None
+
+    def forget(self, telegram_id: int) -> None:
+        record_cache.invalidate_prefix((self.kind, telegram_id))
+
+    async def _load_chunk(
+        self, telegram_id: int, pager_state: Dict[str, Any], chunk: int
+    ) -> Optional[List[Dict[str, Any]]]:
+        cursors = pager_state["cursors"]
+        if chunk >= len(cursors):
+            return []
+
+        cursor = cursors[chunk]
+        hit, cached = record_cache.get(self._key(telegram_id, cursor))
+        if hit:
+            items, next_cursor = cached
+        else:
+            task = self._loading.get((telegram_id, cursor))
+            page = await (task if task else self._fetch(telegram_id, cursor))
+            if page is None:
+                return None
+            items, next_cursor, total = page
+            if total is not None:
+                pager_state["total"] = total
+
+        if next_cursor and len(cursors) == chunk + 1:
+            cursors.append(next_cursor)
+        return items
+
+    async def _fetch(self, telegram_id: int, cursor: Optional[str]):
+        params = {"limit": self.chunk_size}
+        if cursor:
+            params["cursor"] = cursor
+
+        page = await self.api_client.get(self._endpoint(telegram_id), params=params)
+        if not isinstance(page, dict) or page.get("success") is False or "items" not in page:
+            logger.warning(f"Не удалось загрузить {self.kind} пользователя {telegram_id}: {page}")
+            return None
+
+        items, next_cursor = page["items"], page.get("next_cursor")
+        record_cache.set(self._key(telegram_id, cursor), (items, next_cursor))
+        return items, next_cursor, page.get("total")
+
+    def _prefetch(self, telegram_id: int, pager_state: Dict[str, Any], chunk: int) -> None:
+        cursors = pager_state["cursors"]
+        if chunk < 0 or chunk >= len(cursors):
+            return
+
+        cursor = cursors[chunk]
+        hit, _ = record_cache.get(self._key(telegram_id, cursor))
+        if hit or (telegram_id, cursor) in self._loading:
+            return
+
+        task = asyncio.create_task(self._fetch(telegram_id, cursor))
+        self._loading[(telegram_id, cursor)] = task
+        task.add_done_callback(lambda _: self._loading.pop((telegram_id, cursor), None))
+
+
+history_pager = RecordPager("history", chunk_size=settings.RECORD_PAGE_SIZE)
+watchlist_pager = RecordPager("watchlist", chunk_size=settings.RECORD_PAGE_SIZE)
@@ -1,15 +1,68 @@
-from typing import Optional
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+
+from app.config import settings
 from app.services.api_client import api_client
+from app.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class UserCache(TTLCache[Optional[Dict[str, Any]]]):
+    """telegram_id -> запись пользователя из API, LRU с TTL.
+
+    Отрицательные записи (API отказал в создании пользователя) живут
+    negative_ttl секунд, чтобы повторные нажатия не долбили API. Ошибки сети
+    не кэшируются. Одновременные промахи по одному telegram_id ждут общий запрос.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, negative_ttl: float):
+        super().__init__(maxsize, ttl)
+        self.negative_ttl = negative_ttl
+        self._in_flight: Dict[str, asyncio.Task] = {}
+
+    def set(self, telegram_id: str, user: Optional[Dict[str, Any]], ttl: Optional[float] = None) -> None:
+        super().set(telegram_id, user, ttl if ttl is not None else (None if user else self.negative_ttl))
+
+    async def load(self, telegram_id: str, factory) -> Optional[Dict[str, Any]]:
+        task = self._in_flight.get(telegram_id)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._in_flight[telegram_id] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(telegram_id, None))
+
+        return await asyncio.shield(task)
+
+
+user_cache = UserCache(
+    maxsize=settings.USER_CACHE_SIZE,
+    ttl=settings.USER_CACHE_TTL,
+    negative_ttl=settings.USER_CACHE_NEGATIVE_TTL,
+)
+
 
 class UserService:
     def __init__(self):
         self.api_client = api_client
+        self.cache = user_cache
 
     async def get_or_create_user(self, telegram_id: int, username: Optional[str] = None,
                                first_name: Optional[str] = None, last_name: Optional[str] = None):
+        key = str(telegram_id)
+        hit, user = self.cache.get(key)
+        if hit:
+            return user
+
+        return await self.cache.load(
+            key, lambda: self._fetch_or_create(key, username, first_name, last_name)
+        )
 
+    async def _fetch_or_create(self, telegram_id: str, username: Optional[str],
+                               first_name: Optional[str], last_name: Optional[str]):
         user_data = await self.api_client.get(f"/api/v1/users/telegram/{telegram_id}")
         if isinstance(user_data, dict) and user_data.get("id"):
+            self.cache.set(telegram_id, user_data)
             return user_data
 
         new_user = {
@@ -22,12 +75,21 @@ class UserService:
         created = await self.api_client.post("/api/v1/users/", data=new_user)
 
         if isinstance(created, dict) and created.get("id"):
+            self.cache.set(telegram_id, created)
             return created
 
+        # Ответ API (4xx/5xx) запоминаем ненадолго, сетевую ошибку - нет
+        if isinstance(created, dict) and created.get("status_code"):
+            logger.warning(f"Не удалось создать пользователя {telegram_id}: {created.get('detail')}")
+            self.cache.set(telegram_id, None)
+
         return None
 
     async def get_user(self, user_id: int):
         return await self.api_client.get(f"/api/v1/users/{user_id}")
 
     async def update_user(self, user_id: int, user_data: dict):
-        return await self.api_client.put(f"/api/v1/users/{user_id}", data=user_data)
\ No newline at end of file
+        updated = await self.api_client.put(f"/api/v1/users/{user_id}", data=user_data)
+        if isinstance(updated, dict) and updated.get("telegram_id"):
+            self.cache.invalidate(str(updated["telegram_id"]))
+        return updated
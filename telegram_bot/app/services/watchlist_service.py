@@ -1,6 +1,7 @@
 from typing import Optional, Dict, Any, List
 
 from app.services.api_client import api_client
+from app.services.record_pager import watchlist_pager
 from app.services.user_service import UserService
 
 
@@ -34,6 +35,7 @@ class WatchlistService:
             "notes": notes,
         }
 
+        watchlist_pager.forget(telegram_id)
         return await self.api_client.post("/api/v1/watchlist/", data=watchlist_data)
 
     async def remove_from_watchlist(self, item_id: int) -> bool:
@@ -45,4 +47,5 @@ class WatchlistService:
             return False
 
         await self.api_client.delete(f"/api/v1/watchlist/user/{user['id']}")
+        watchlist_pager.forget(telegram_id)
         return True
@@ -0,0 +1,48 @@
+import time
+from collections import OrderedDict
+from typing import Any, Generic, Hashable, Optional, Tuple, TypeVar
+
+V = TypeVar("V")
+
+
+class TTLCache(Generic[V]):
+    """LRU с ограничением по размеру и временем жизни записей.
+
+    get возвращает пару (hit, value), чтобы можно было хранить и None
+    (отрицательные записи).
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, Tuple[float, V]]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Tuple[bool, Optional[V]]:
+        item = self._data.get(key)
+        if item is None:
+            return False, None
+
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return False, None
+
+        self._data.move_to_end(key)
+        return True, value
+
+    def set(self, key: Hashable, value: V, ttl: Optional[float] = None) -> None:
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def invalidate_prefix(self, prefix: tuple) -> None:
+        """Удалить все записи с ключом-кортежем, начинающимся с prefix"""
+        for key in [key for key in self._data if isinstance(key, tuple) and key[:len(prefix)] == prefix]:
+            del self._data[key]
+
+    def __len__(self) -> int:
+        return len(self._data)
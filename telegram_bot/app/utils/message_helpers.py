@@ -1,8 +1,10 @@
-from typing import Optional
+from typing import Any, Dict, List, Optional
 
-from aiogram import types
+from aiogram import Bot, types
 from aiogram.types import InputMediaPhoto
 
+from app.services.poster_cache import is_media_error, poster_cache
+
 
 def _safe_delete_message(message: types.Message) -> None:
     try:
@@ -13,6 +15,29 @@ def _safe_delete_message(message: types.Message) -> None:
         pass
 
 
+async def _poster_media(poster_url: str) -> str:
+    """file_id из кэша, если постер уже отправлялся, иначе сам url"""
+    return await poster_cache.get(poster_url) or poster_url
+
+
+async def _remember_poster(poster_url: str, sent) -> None:
+    if isinstance(sent, types.Message) and sent.photo:
+        await poster_cache.remember(poster_url, sent.photo[-1].file_id)
+
+
+async def _poster_failed(poster_url: str, media: str, error: Exception) -> None:
+    # Кэш трогаем только при ошибке самой картинки: длинная подпись, ошибка разметки,
+    # "message is not modified", flood control или сеть ничего не говорят о постере
+    if not is_media_error(error):
+        return
+
+    # Устаревший file_id забываем, недоступный url не пробуем повторно до failure_ttl
+    if media != poster_url:
+        await poster_cache.forget(poster_url)
+    else:
+        poster_cache.mark_failed(poster_url)
+
+
 async def send_content_card(
     message: types.Message,
     text: str,
@@ -20,16 +45,19 @@ async def send_content_card(
     poster_url: Optional[str] = None,
     parse_mode: str = "HTML",
 ) -> types.Message:
-    if poster_url:
+    if poster_url and not poster_cache.is_failed(poster_url):
+        media = await _poster_media(poster_url)
         try:
-            return await message.answer_photo(
-                poster_url,
+            sent = await message.answer_photo(
+                media,
                 caption=text,
                 reply_markup=keyboard,
                 parse_mode=parse_mode,
             )
-        except Exception:
-            pass
+            await _remember_poster(poster_url, sent)
+            return sent
+        except Exception as e:
+            await _poster_failed(poster_url, media, e)
 
     return await message.answer(text, reply_markup=keyboard, parse_mode=parse_mode)
 
@@ -41,43 +69,67 @@ async def update_content_card(
     poster_url: Optional[str] = None,
     parse_mode: str = "HTML",
 ) -> types.Message:
-    if poster_url:
+    if poster_url and not poster_cache.is_failed(poster_url):
+        media = await _poster_media(poster_url)
         if message.content_type != "photo":
             try:
                 sent = await message.answer_photo(
-                    poster_url,
+                    media,
                     caption=text,
                     reply_markup=keyboard,
                     parse_mode=parse_mode,
                 )
+                await _remember_poster(poster_url, sent)
                 _safe_delete_message(message)
                 return sent
-            except Exception:
-                pass
+            except Exception as e:
+                await _poster_failed(poster_url, media, e)
         else:
             try:
-                media = InputMediaPhoto(
-                    media=poster_url, caption=text, parse_mode=parse_mode
+                edited = await message.edit_media(
+                    InputMediaPhoto(media=media, caption=text, parse_mode=parse_mode),
+                    reply_markup=keyboard,
                 )
-                await message.edit_media(media, reply_markup=keyboard)
+                await _remember_poster(poster_url, edited)
                 return message
-            except Exception:
-                try:
-                    await message.edit_caption(
-                        text, reply_markup=keyboard, parse_mode=parse_mode
-                    )
-                    return message
-                except Exception:
-                    pass
+            except Exception as e:
+                await _poster_failed(poster_url, media, e)
 
     try:
-        await message.edit_text(text, reply_markup=keyboard, parse_mode=parse_mode)
-        return message
-    except Exception:
-        try:
+        if message.content_type == "photo":
             await message.edit_caption(
-                text, reply_markup=keyboard, parse_mode=parse_mode
+                caption=text, reply_markup=keyboard, parse_mode=parse_mode
             )
-            return message
-        except Exception:
-            return message
+        else:
+            await message.edit_text(text, reply_markup=keyboard, parse_mode=parse_mode)
+    except Exception:
+        pass
+    return message
+
+
+def prefetch_posters(bot: Bot, items: List[Optional[Dict[str, Any]]]) -> None:
+    """Фоном получить file_id постеров записей, которые пользователь, вероятно, откроет следующими"""
+    for item in items:
+        if item:
+            poster_cache.prefetch(bot, item.get("poster_url") or (item.get("content") or {}).get("poster_url"))
+
+
+def prefetch_neighbour_posters(bot: Bot, items: List[Dict[str, Any]], page: int) -> None:
+    """Постеры соседних страниц, пока пользователь смотрит текущую"""
+    prefetch_posters(bot, [items[index] for index in (page + 1, page - 1) if 0 <= index < len(items)])
+
+
+async def refresh_card_text(
+    message: types.Message,
+    text: str,
+    keyboard: Optional[types.InlineKeyboardMarkup] = None,
+    parse_mode: str = "HTML",
+) -> None:
+    """Обновить только текст и клавиатуру карточки, не перезагружая постер"""
+    try:
+        if message.content_type == "photo":
+            await message.edit_caption(caption=text, reply_markup=keyboard, parse_mode=parse_mode)
+        else:
+            await message.edit_text(text, reply_markup=keyboard, parse_mode=parse_mode)
+    except Exception:
+        pass
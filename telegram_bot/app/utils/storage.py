@@ -0,0 +1,31 @@
+import logging
+
+from aiogram.fsm.storage.base import BaseStorage
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def create_fsm_storage() -> BaseStorage:
+    """Хранилище FSM по настройке FSM_STORAGE.
+
+    redis - общее состояние для нескольких реплик бота, memory - локальная
+    замена для разработки и тестов. В состоянии лежат только компактные ссылки,
+    поэтому оба варианта сериализуемы в JSON.
+    """
+    if settings.FSM_STORAGE == "redis":
+        from aiogram.fsm.storage.redis import RedisStorage
+
+        logger.info("FSM хранится в Redis")
+        return RedisStorage.from_url(
+            settings.REDIS_URL,
+            state_ttl=settings.FSM_STATE_TTL,
+            data_ttl=settings.FSM_STATE_TTL,
+        )
+
+    if settings.FSM_STORAGE != "memory":
+        raise ValueError(f"Неизвестное FSM_STORAGE: {settings.FSM_STORAGE}")
+
+    return MemoryStorage()
@@ -1,4 +1,4 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 __all__ = [
     "get_start_message",
@@ -39,12 +39,11 @@ def get_help_message() -> str:
         "Для начала работы нажмите /start"
     )
 
-def get_history_results_message(history: List[Dict[str, Any]], page: int) -> str:
-    if not history:
+def get_history_results_message(record: Optional[Dict[str, Any]], page: int, total: int) -> str:
+    if not record:
         return "Ваша история просмотров пуста."
 
-    index = max(0, min(page, len(history) - 1))
-    record = history[index]
+    index = max(0, min(page, total - 1))
     content = record.get("content") or {}
 
     title = content.get("title") or record.get("content_title") or "Без названия"
@@ -86,15 +85,14 @@ def get_history_results_message(history: List[Dict[str, Any]], page: int) -> str
         f"Ваша оценка: {user_rating_text}\n"
         f"Дата просмотра: {watched_at}\n"
         f"Отзыв: {notes}\n\n"
-        f"Запись {index + 1} из {len(history)}"
+        f"Запись {index + 1} из {total}"
     )
 
-def get_watchlist_message(results: List[Dict[str, Any]], page: int) -> str:
-    if not results:
+def get_watchlist_message(item: Optional[Dict[str, Any]], page: int, total: int) -> str:
+    if not item:
         return "Ваш список желаемого пуст."
 
-    safe_page = max(0, min(page, len(results) - 1))
-    item = results[safe_page] or {}
+    safe_page = max(0, min(page, total - 1))
     content = item.get("content") or {}
 
     title = content.get("title") or item.get("content_title") or "Без названия"
@@ -119,7 +117,7 @@ def get_watchlist_message(results: List[Dict[str, Any]], page: int) -> str:
         f"Режиссер: {director}\n"
         f"В ролях: {cast}\n"
         f"Описание: {description}\n"
-        f"Запись {safe_page + 1} из {len(results)}"
+        f"Запись {safe_page + 1} из {total}"
     )
 
 def get_search_results_message(results: List[Dict[str, Any]], page: int) -> str:
@@ -128,6 +126,11 @@ def get_search_results_message(results: List[Dict[str, Any]], page: int) -> str:
 
     index = max(0, min(page, len(results) - 1))
     result = results[index]
+    if not result:
+        return (
+            "Карточка больше недоступна. Откройте другой результат или повторите поиск.\n\n"
+            f"Результат {index + 1} из {len(results)}"
+        )
 
     title = result.get("title") or "Без названия"
     year = result.get("release_year") or "неизвестно"
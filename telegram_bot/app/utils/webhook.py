@@ -0,0 +1,189 @@
+import asyncio
+import logging
+import secrets
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+def routing_key(update: Update) -> int:
+    """Чат (или пользователь для inline-запросов), к которому относится апдейт"""
+    event = update.event
+    chat = getattr(event, "chat", None) or getattr(getattr(event, "message", None), "chat", None)
+    if chat is not None:
+        return chat.id
+
+    user = getattr(event, "from_user", None)
+    if user is not None:
+        return user.id
+
+    return update.update_id
+
+
+class UpdatePipeline:
+    """Ограниченный пул обработчиков апдейтов.
+
+    У каждого чата своя очередь апдейтов, а workers обработчиков общие: чат
+    стоит в очереди готовых не больше одного раза и возвращается в ее конец
+    только после обработки своего апдейта. Поэтому апдейты одного чата идут
+    строго по порядку, а медленный обработчик в одном чате занимает один
+    обработчик и не задерживает остальные чаты. Всего принимается не больше
+    max_pending необработанных апдейтов; если место не освободилось за
+    queue_timeout секунд, submit возвращает False, вебхук отвечает 503 и
+    Telegram повторит доставку позже.
+    """
+
+    def __init__(self, dp: Dispatcher, bot: Bot, workers: int, max_pending: int, queue_timeout: float):
+        self.dp = dp
+        self.bot = bot
+        self.workers = workers
+        self.queue_timeout = queue_timeout
+        self._capacity = asyncio.Semaphore(max_pending)
+        self._chats: Dict[int, Deque[Update]] = {}
+        self._ready: asyncio.Queue = asyncio.Queue()
+        self._pending = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._tasks: List[asyncio.Task] = []
+        self._accepting = False
+
+    def start(self) -> None:
+        self._accepting = True
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        logger.info(f"Пул обработки апдейтов запущен: {self.workers} обработчиков")
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Перестает принимать апдейты и дообрабатывает уже принятые"""
+        self._accepting = False
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Не все апдейты обработаны за {timeout} с, осталось {self.pending}")
+
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    async def submit(self, update: Update) -> bool:
+        if not self._accepting:
+            return False
+
+        try:
+            await asyncio.wait_for(self._capacity.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Очередь апдейтов переполнена, апдейт {update.update_id} отклонен")
+            return False
+
+        key = routing_key(update)
+        chat_updates = self._chats.get(key)
+        if chat_updates is None:
+            self._chats[key] = deque([update])
+            self._ready.put_nowait(key)
+        else:
+            # Чат уже в очереди готовых или обрабатывается: апдейт дождется своей очереди
+            chat_updates.append(update)
+
+        self._pending += 1
+        self._idle.clear()
+        return True
+
+    async def _worker(self) -> None:
+        while True:
+            key = await self._ready.get()
+            chat_updates = self._chats[key]
+            update = chat_updates.popleft()
+            try:
+                await self.dp.feed_update(self.bot, update)
+            except Exception as e:
+                logger.error(f"Ошибка при обработке апдейта {update.update_id}: {e}")
+            finally:
+                if chat_updates:
+                    self._ready.put_nowait(key)
+                else:
+                    del self._chats[key]
+
+                self._capacity.release()
+                self._pending -= 1
+                if not self._pending:
+                    self._idle.set()
+
+
+def create_webhook_app(dp: Dispatcher, bot: Bot, pipeline: UpdatePipeline, secret: Optional[str]) -> web.Application:
+    async def handle_update(request: web.Request) -> web.Response:
+        if secret and not secrets.compare_digest(request.headers.get(SECRET_HEADER, ""), secret):
+            return web.Response(status=401)
+
+        try:
+            update = Update.model_validate(await request.json(), context={"bot": bot})
+        except Exception as e:
+            logger.warning(f"Некорректный апдейт: {e}")
+            return web.Response(status=400)
+
+        # Ответ Telegram сразу после постановки в очередь, обработка идет в пуле
+        if not await pipeline.submit(update):
+            return web.Response(status=503, headers={"Retry-After": "1"})
+        return web.Response(status=200)
+
+    async def health(request: web.Request) -> web.Response:
+        return web.json_response({"status": "ok", "pending_updates": pipeline.pending})
+
+    app = web.Application()
+    app.router.add_post(settings.WEBHOOK_PATH, handle_update)
+    app.router.add_get("/health", health)
+    return app
+
+
+async def run_webhook(dp: Dispatcher, bot: Bot) -> None:
+    """Прием апдейтов через вебхук; несколько реплик могут стоять за балансировщиком"""
+    if not settings.WEBHOOK_BASE_URL:
+        raise ValueError("Для BOT_MODE=webhook нужен WEBHOOK_BASE_URL")
+
+    pipeline = UpdatePipeline(
+        dp,
+        bot,
+        workers=settings.WEBHOOK_WORKERS,
+        max_pending=settings.WEBHOOK_WORKERS * settings.WEBHOOK_QUEUE_SIZE,
+        queue_timeout=settings.WEBHOOK_QUEUE_TIMEOUT,
+    )
+    secret = settings.WEBHOOK_SECRET or None
+    app = create_webhook_app(dp, bot, pipeline, secret)
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, settings.WEBHOOK_HOST, settings.WEBHOOK_PORT)
+
+    pipeline.start()
+    await dp.emit_startup(bot=bot)
+    await site.start()
+
+    # Все реплики регистрируют один и тот же адрес, повторный вызов безопасен
+    await bot.set_webhook(
+        settings.WEBHOOK_BASE_URL.rstrip("/") + settings.WEBHOOK_PATH,
+        secret_token=secret,
+        allowed_updates=dp.resolve_used_update_types(),
+        max_connections=settings.WEBHOOK_MAX_CONNECTIONS,
+    )
+    logger.info(f"Вебхук слушает {settings.WEBHOOK_HOST}:{settings.WEBHOOK_PORT}{settings.WEBHOOK_PATH}")
+
+    try:
+        await asyncio.Event().wait()
+    finally:
+        # Вебхук не удаляется: остальные реплики продолжают принимать апдейты
+        await runner.shutdown()
+        await pipeline.stop()
+        await runner.cleanup()
+        await dp.emit_shutdown(bot=bot)
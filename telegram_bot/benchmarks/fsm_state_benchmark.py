@@ -0,0 +1,112 @@
+"""Бенчмарк размера состояния FSM: полные карточки в состоянии против компактных ссылок.
+
+Запуск из каталога telegram_bot: python benchmarks/fsm_state_benchmark.py --sessions 100000
+
+Память считается через tracemalloc (так состояние лежит в MemoryStorage),
+байты JSON - так же, как данные сериализует RedisStorage. Для компактного
+варианта учитывается и общий кэш карточек, ограниченный CONTENT_CACHE_SIZE.
+"""
+import argparse
+import json
+import random
+import tracemalloc
+
+WORDS = ["dark", "night", "return", "king", "lost", "city", "star", "war", "love", "story", "ghost", "river"]
+
+
+def make_card(rng: random.Random, number: int) -> dict:
+    title = " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 4))).title()
+    return {
+        "id": None,
+        "imdb_id": f"tt{number:07d}",
+        "title": title,
+        "original_title": title,
+        "description": " ".join(rng.choice(WORDS) for _ in range(rng.randint(20, 60))).capitalize() + ".",
+        "content_type": rng.choice(("movie", "series")),
+        "release_year": rng.randint(1950, 2025),
+        "imdb_rating": round(rng.uniform(3, 9.5), 1),
+        "poster_url": f"https://m.media-amazon.com/images/M/{number:07d}._V1_SX300.jpg",
+        "genre": "Drama, Crime, Thriller",
+        "director": "Some Director",
+        "cast": "First Actor, Second Actor, Third Actor, Fourth Actor",
+        "source": "omdb",
+        "already_watched": False,
+    }
+
+
+def full_state(cards: list, query: str) -> dict:
+    """Состояние до изменения: результаты поиска и выбранная карточка целиком"""
+    return {
+        "search_results": cards,
+        "current_page": 0,
+        "search_query": query,
+        "total_results": len(cards),
+        "selected_content": cards[0],
+        "review": None,
+        "watched_at": "2024-05-01T00:00:00",
+    }
+
+
+def compact_state(cards: list, query: str) -> dict:
+    """Состояние после изменения: только ссылки, страница и запрос"""
+    refs = [f"imdb:{card['imdb_id']}" for card in cards]
+    return {
+        "search_refs": refs,
+        "current_page": 0,
+        "search_query": query,
+        "total_results": len(refs),
+        "selected_ref": refs[0],
+        "review": None,
+        "watched_at": "2024-05-01T00:00:00",
+    }
+
+
+def measure(build_state, sessions: int, catalog: list, rng: random.Random, cache_size: int = 0):
+    """Память под состояния всех сессий и суммарный размер JSON"""
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+
+    # Ответы API - новые объекты для каждой сессии, как после json.loads
+    storage = {}
+    for chat_id in range(sessions):
+        picks = rng.sample(catalog, 5)
+        cards = [json.loads(json.dumps(card)) for card in picks]
+        storage[chat_id] = build_state(cards, picks[0]["title"].lower())
+
+    # Общий LRU карточек ограничен по размеру и не растет с числом сессий
+    cache = {f"imdb:{card['imdb_id']}": json.loads(json.dumps(card)) for card in catalog[:cache_size]}
+
+    used = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+
+    json_bytes = sum(len(json.dumps(state, ensure_ascii=False).encode()) for state in storage.values())
+    return used, json_bytes, len(cache)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=100_000)
+    parser.add_argument("--catalog", type=int, default=20_000)
+    parser.add_argument("--cache-size", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    catalog = [make_card(rng, number) for number in range(args.catalog)]
+
+    full_memory, full_json, _ = measure(full_state, args.sessions, catalog, random.Random(args.seed))
+    compact_memory, compact_json, cached = measure(
+        compact_state, args.sessions, catalog, random.Random(args.seed), cache_size=args.cache_size
+    )
+
+    print(f"sessions:             {args.sessions}")
+    print(f"full state memory:    {full_memory / 2**20:.1f} MiB")
+    print(f"full state json:      {full_json / 2**20:.1f} MiB ({full_json / args.sessions:.0f} B/session)")
+    print(f"compact state memory: {compact_memory / 2**20:.1f} MiB (incl. {cached} cached cards)")
+    print(f"compact state json:   {compact_json / 2**20:.1f} MiB ({compact_json / args.sessions:.0f} B/session)")
+    print(f"memory reduction:     {full_memory / compact_memory:.1f}x")
+    print(f"json reduction:       {full_json / compact_json:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
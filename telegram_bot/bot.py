@@ -1,10 +1,11 @@
 import asyncio
 import logging
 from aiogram import Bot, Dispatcher, types
-from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.client.default import DefaultBotProperties
 
 from app.config import settings
+from app.utils.storage import create_fsm_storage
+from app.utils.webhook import run_webhook
 from app.handlers import (
     start, help, view_history, watchlist,
     search, analytics
@@ -15,7 +16,7 @@ logger = logging.getLogger(__name__)
 
 async def main():
     bot = Bot(token=settings.TELEGRAM_BOT_TOKEN, default=DefaultBotProperties(parse_mode='HTML'))
-    storage = MemoryStorage()
+    storage = create_fsm_storage()
     dp = Dispatcher(storage=storage)
 
     dp.include_router(start.router)
@@ -26,7 +27,11 @@ async def main():
     dp.include_router(analytics.router)
 
     try:
-        await dp.start_polling(bot)
+        if settings.BOT_MODE == "webhook":
+            await run_webhook(dp, bot)
+        else:
+            await bot.delete_webhook()
+            await dp.start_polling(bot)
     finally:
         await bot.session.close()
 
@@ -0,0 +1,4 @@
+import os
+
+# Настройки читаются при импорте app; токен нужен только для валидации, запросов к Telegram нет
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "123456:test")
@@ -0,0 +1,132 @@
+import asyncio
+import random
+from collections import defaultdict
+
+from aiogram.types import Update
+
+from app.utils.webhook import UpdatePipeline, routing_key
+
+USER = {"id": 500, "is_bot": False, "first_name": "Test"}
+
+
+def message_update(update_id: int, chat_id: int) -> Update:
+    return Update.model_validate({
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 0,
+            "chat": {"id": chat_id, "type": "private"},
+            "from": USER,
+            "text": str(update_id),
+        },
+    })
+
+
+class FakeDispatcher:
+    def __init__(self, handler):
+        self.handler = handler
+
+    async def feed_update(self, bot, update: Update) -> None:
+        await self.handler(update)
+
+
+def make_pipeline(handler, workers: int = 4, max_pending: int = 100, queue_timeout: float = 1.0) -> UpdatePipeline:
+    return UpdatePipeline(FakeDispatcher(handler), bot=None, workers=workers,
+                          max_pending=max_pending, queue_timeout=queue_timeout)
+
+
+def test_routing_key():
+    assert routing_key(message_update(1, chat_id=10)) == 10
+
+    callback = Update.model_validate({
+        "update_id": 2,
+        "callback_query": {
+            "id": "1", "from": USER, "chat_instance": "x", "data": "page",
+            "message": {"message_id": 1, "date": 0, "chat": {"id": 20, "type": "private"}},
+        },
+    })
+    assert routing_key(callback) == 20
+
+    inline = Update.model_validate({
+        "update_id": 3,
+        "inline_query": {"id": "1", "from": USER, "query": "matrix", "offset": ""},
+    })
+    assert routing_key(inline) == 500
+
+
+async def test_updates_of_one_chat_are_handled_in_order():
+    handled = defaultdict(list)
+
+    async def handler(update: Update):
+        await asyncio.sleep(random.uniform(0, 0.005))
+        handled[update.message.chat.id].append(update.update_id)
+
+    pipeline = make_pipeline(handler)
+    pipeline.start()
+    sent = defaultdict(list)
+    for update_id in range(60):
+        chat_id = update_id % 3
+        sent[chat_id].append(update_id)
+        assert await pipeline.submit(message_update(update_id, chat_id))
+
+    await pipeline.stop()
+    assert handled == sent
+    assert pipeline.pending == 0
+
+
+async def test_slow_chat_does_not_block_other_chats():
+    release = asyncio.Event()
+    handled = []
+
+    async def handler(update: Update):
+        if update.message.chat.id == 1:
+            await release.wait()
+        handled.append(update.update_id)
+
+    pipeline = make_pipeline(handler, workers=2)
+    pipeline.start()
+    await pipeline.submit(message_update(1, chat_id=1))
+    await pipeline.submit(message_update(2, chat_id=1))
+    for update_id in range(3, 8):
+        await pipeline.submit(message_update(update_id, chat_id=2))
+
+    await asyncio.sleep(0.05)
+    assert handled == [3, 4, 5, 6, 7]
+
+    release.set()
+    await pipeline.stop()
+    assert handled == [3, 4, 5, 6, 7, 1, 2]
+
+
+async def test_handler_error_does_not_stop_chat():
+    handled = []
+
+    async def handler(update: Update):
+        if update.update_id == 1:
+            raise RuntimeError("ошибка обработчика")
+        handled.append(update.update_id)
+
+    pipeline = make_pipeline(handler, workers=1)
+    pipeline.start()
+    await pipeline.submit(message_update(1, chat_id=1))
+    await pipeline.submit(message_update(2, chat_id=1))
+
+    await pipeline.stop()
+    assert handled == [2]
+
+
+async def test_submit_is_rejected_when_pipeline_is_full():
+    release = asyncio.Event()
+
+    async def handler(update: Update):
+        await release.wait()
+
+    pipeline = make_pipeline(handler, workers=1, max_pending=2, queue_timeout=0.01)
+    pipeline.start()
+    assert await pipeline.submit(message_update(1, chat_id=1))
+    assert await pipeline.submit(message_update(2, chat_id=2))
+    assert not await pipeline.submit(message_update(3, chat_id=3))
+
+    release.set()
+    await pipeline.stop()
+    assert not await pipeline.submit(message_update(4, chat_id=1))
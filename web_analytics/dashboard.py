@@ -1,13 +1,12 @@
 import os
-from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional
+from datetime import datetime
+from typing import Any, Dict, Optional
 import altair as alt
 import httpx
 import pandas as pd
 import streamlit as st
 
 DEFAULT_API_URL = os.getenv("API_URL", "http://localhost:8000").rstrip("/")
-DATA_LIMIT = 300
 
 st.set_page_config(
     page_title="Аналитика",
@@ -17,61 +16,17 @@ st.set_page_config(
 def _build_client(api_url: str) -> httpx.Client:
     return httpx.Client(base_url=api_url, timeout=10.0)
 
-def _time_range_to_days(label: str) -> int:
-    mapping = {
-        "Все время": 36500,
-    }
-    return mapping.get(label, 30)
-
-@st.cache_data(show_spinner=False, ttl=120)
-def fetch_user_analytics(api_url: str, user_id: int, days: int) -> Optional[Dict[str, Any]]:
+def fetch_user_dashboard(api_url: str, user_id: int, year: int) -> Optional[Dict[str, Any]]:
+    # Все считается и кэшируется на стороне API до следующего изменения истории,
+    # поэтому без st.cache_data: новые просмотры видны сразу
     try:
         with _build_client(api_url) as client:
-            response = client.get(f"/api/v1/analytics/user/{user_id}", params={"days": days})
+            response = client.get(f"/api/v1/analytics/user/{user_id}/dashboard", params={"year": year})
             response.raise_for_status()
             return response.json()
     except httpx.HTTPError as exc:
         st.error(f"Не удалось загрузить аналитику пользователя: {exc}")
         return None
-    
-@st.cache_data(show_spinner=False, ttl=120)
-def fetch_user_timeline(api_url: str, user_id: int, period: str = "monthly") -> List[Dict[str, Any]]:
-    try:
-        with _build_client(api_url) as client:
-            response = client.get(
-                f"/api/v1/analytics/user/{user_id}/timeline", params={"period": period}
-            )
-            response.raise_for_status()
-            data = response.json()
-            return data.get("data", []) if isinstance(data, dict) else []
-    except httpx.HTTPError as exc:
-        st.error(f"Не удалось загрузить временную аналитику: {exc}")
-        return []
-
-
-@st.cache_data(show_spinner=False, ttl=120)
-def fetch_view_history(api_url: str, user_id: int, limit: int = DATA_LIMIT) -> List[Dict[str, Any]]:
-    records: List[Dict[str, Any]] = []
-    page_size = min(limit, 100)
-    try:
-        with _build_client(api_url) as client:
-            skip = 0
-            while len(records) < limit:
-                response = client.get(
-                    f"/api/v1/view-history/user/{user_id}",
-                    params={"skip": skip, "limit": min(page_size, limit - len(records))},
-                )
-                response.raise_for_status()
-                chunk = response.json()
-                if not chunk:
-                    break
-                records.extend(chunk)
-                if len(chunk) < page_size:
-                    break
-                skip += page_size
-    except httpx.HTTPError as exc:
-        st.error(f"Не удалось загрузить историю просмотров: {exc}")
-    return records
 
 
 @st.cache_data(show_spinner=False, ttl=120)
@@ -88,69 +43,6 @@ def resolve_user_id(api_url: str, identifier: int) -> Optional[int]:
     return None
 
 
-def build_dataframe(
-    history: List[Dict[str, Any]], start_date: datetime, end_date: datetime
-) -> pd.DataFrame:
-    rows = []
-    for record in history:
-        watched_at = pd.to_datetime(record.get("watched_at"))
-        if not pd.isna(watched_at) and watched_at.tzinfo is not None:
-            watched_at = watched_at.tz_convert(None)
-        if pd.isna(watched_at) or watched_at < start_date or watched_at > end_date:
-            continue
-
-        content = record.get("content") or {}
-        content_type = content.get("content_type") or record.get("content_type")
-        rows.append(
-            {
-                "title": content.get("title")
-                or record.get("content_title")
-                or "Без названия",
-                "content_type": content_type,
-                   "duration_minutes": content.get("duration_minutes")
-                or record.get("duration_minutes"),
-                "user_rating": record.get("rating"),
-                "watch_date": watched_at,
-            }
-        )
-
-    df = pd.DataFrame(rows)
-    if df.empty:
-        return df
-
-    df["watch_day"] = df["watch_date"].dt.date.astype(str)
-    df["watch_month"] = df["watch_date"].dt.to_period("M").astype(str)
-    df["duration_minutes"] = df.get("duration_minutes")
-    df["content_type_display"] = (
-        df["content_type"].map({"movie": "Фильм", "series": "Сериал"}).fillna("Неизвестно")
-    )
-    return df
-
-
-
-def _filter_timeline(
-    data: List[Dict[str, Any]], start: datetime, end: datetime
-) -> pd.DataFrame:
-    timeline_rows = []
-    for row in data:
-        period_raw = row.get("period") or row.get("month")
-        if not period_raw:
-            continue
-        period_dt = pd.to_datetime(period_raw)
-        if not pd.isna(period_dt) and period_dt.tzinfo is not None:
-            period_dt = period_dt.tz_convert(None)
-        if pd.isna(period_dt) or period_dt < start or period_dt > end:
-            continue
-        timeline_rows.append(
-            {
-                "watch_period": period_dt.strftime("%Y-%m"),
-                "Количество": row.get("view_count", 0),
-            }
-        )
-    return pd.DataFrame(timeline_rows)
-
-
-
 st.title("🎬 Аналитика Просмотров")
 
 st.markdown(
@@ -170,48 +62,24 @@ selected_year = st.sidebar.selectbox(
     index=len(year_options) - 1,
 )
 
-days = _time_range_to_days("Все время")
-analytics_days = min(days,365)
-end_date = datetime.now()
-start_date = end_date - timedelta(days=days)
-
 resolved_user_id = resolve_user_id(api_url, user_identifier)
 if resolved_user_id is None:
     st.stop()
 
-analytics = fetch_user_analytics(api_url, resolved_user_id, analytics_days)
-use_analytics = days <= analytics_days
-timeline = fetch_user_timeline(api_url, resolved_user_id, period="monthly")
-history_records = fetch_view_history(api_url, resolved_user_id, limit=DATA_LIMIT)
-df = build_dataframe(history_records, start_date, end_date)
-
-if df.empty and not analytics:
+dashboard = fetch_user_dashboard(api_url, resolved_user_id, selected_year)
+if not dashboard or not dashboard["kpis"]["total_views"]:
     st.warning("Нет данных для отображения. Проверьте фильтры или наличие записей в базе.")
     st.stop()
 
+kpis = dashboard["kpis"]
+total_items = kpis.get("total_views", 0)
+total_movies = kpis.get("movies_views", 0)
+total_series_views = kpis.get("series_views", 0)
+avg_rating = kpis.get("average_rating", 0)
 
 
 st.header("📊 Ключевые Показатели")
 
-total_items = (
-    analytics.get("total_views") if analytics and use_analytics else len(df)
-)
-total_movies = (
-    analytics.get("movies_views")
-    if analytics and use_analytics
-    else int((df["content_type"] == "movie").sum())
-)
-total_series_views = (
-    analytics.get("series_views")
-    if analytics and use_analytics
-    else int((df["content_type"] == "series").sum())
-)
-avg_rating = (
-    analytics.get("average_rating")
-    if analytics and use_analytics
-    else round(df["user_rating"].dropna().mean(), 2)
-)
-
 col1, col2, col3, col4 = st.columns(4)
 
 with col1:
@@ -227,22 +95,14 @@ st.divider()
 st.header("📈 Визуализация Данных")
 
 st.subheader("Количество Просмотров по Месяцам")
-monthly_start = datetime(selected_year, 1, 1)
-monthly_end = datetime(selected_year, 12, 31, 23, 59, 59)
-monthly_counts = _filter_timeline(timeline, monthly_start, monthly_end)
-if monthly_counts.empty and not df.empty:
-    monthly_counts = (
-        df[df["watch_date"].dt.year == selected_year]
-        .groupby("watch_month")
-        .size()
-        .reset_index(name="Количество")
-    )
-    monthly_counts = monthly_counts.rename(columns={"watch_month": "watch_period"})
-
-if not monthly_counts.empty:
-    monthly_counts = monthly_counts.sort_values("watch_period")
+monthly_counts = pd.DataFrame(
+    [
+        {"watch_period": row["period"], "Количество": row["view_count"]}
+        for row in dashboard.get("monthly", [])
+    ]
+)
 
-if monthly_counts.empty:
+if monthly_counts.empty or not monthly_counts["Количество"].any():
     st.info("Недостаточно данных для построения графика по месяцам.")
 else:
     chart_monthly = alt.Chart(monthly_counts).mark_bar(color="#6366f1").encode(
@@ -253,7 +113,14 @@ else:
 
     st.altair_chart(chart_monthly.interactive(), use_container_width=True)
 
-type_counts = df.groupby("content_type_display").size().reset_index(name="Количество")
+type_labels = {"movie": "Фильм", "series": "Сериал"}
+type_counts = pd.DataFrame(
+    [
+        {"content_type_display": type_labels.get(content_type, "Неизвестно"), "Количество": count}
+        for content_type, count in dashboard.get("type_split", {}).items()
+        if count
+    ]
+)
 
 if type_counts.empty:
     st.info("Нет данных для построения диаграммы по типам контента.")
@@ -279,6 +146,18 @@ else:
             )
             st.altair_chart(rating_chart, use_container_width=True)
 
+            st.markdown("**Распределение оценок**")
+            histogram = pd.DataFrame(dashboard.get("rating_histogram", []))
+            if histogram.empty or not histogram["count"].any():
+                st.caption("Оценок пока нет.")
+            else:
+                histogram_chart = alt.Chart(histogram).mark_bar(color="#6366f1").encode(
+                    x=alt.X("rating:O", title="Оценка"),
+                    y=alt.Y("count:Q", title="Количество"),
+                    tooltip=["rating", "count"],
+                ).properties(height=200)
+                st.altair_chart(histogram_chart, use_container_width=True)
+
     with chart_column:
         st.markdown("**Соотношение фильмов и сериалов**")
         chart_type = alt.Chart(type_counts).mark_arc(outerRadius=120).encode(
@@ -295,14 +174,16 @@ st.markdown(
 
 st.header("📖 Последние Просмотры")
 
-if df.empty:
+recent = dashboard.get("recent", [])
+if not recent:
     st.info("Нет недавних просмотров в выбранном диапазоне.")
 else:
-    recent_views = df.sort_values(by="watch_date", ascending=False)[
-        ["title", "content_type_display", "user_rating", "watch_date"]
-    ].head(10)
-    recent_views["watch_date"] = pd.to_datetime(
-        recent_views["watch_date"]
+    recent_views = pd.DataFrame(recent)[["title", "content_type", "rating", "watched_at"]]
+    recent_views["content_type"] = (
+        recent_views["content_type"].map(type_labels).fillna("Неизвестно")
+    )
+    recent_views["watched_at"] = pd.to_datetime(
+        recent_views["watched_at"], utc=True
     ).dt.strftime("%Y-%m-%d")
     recent_views.columns = [
         "Название",
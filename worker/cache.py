@@ -0,0 +1,220 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CacheEntry:
+    value: Any
+    expires_at: float
+    stale_until: float
+
+    def is_fresh(self, now: float) -> bool:
+        return now < self.expires_at
+
+    def is_usable(self, now: float) -> bool:
+        return now < self.stale_until
+
+
+class MemoryLRU:
+    """Первый уровень: LRU в памяти процесса с ограничением по размеру"""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[str, CacheEntry]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        entry = self._data.get(key)
+        if entry is not None:
+            self._data.move_to_end(key)
+        return entry
+
+    def set(self, key: str, entry: CacheEntry) -> None:
+        self._data[key] = entry
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        self._data.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SQLiteStore:
+    """Второй уровень: SQLite на диске, переживает перезапуск worker.
+
+    Просроченные записи удаляются при старте и раз в purge_every записей,
+    чтобы файл не рос у долго работающего worker.
+    """
+
+    def __init__(self, path: str, purge_every: int = 1000):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.purge_every = purge_every
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS omdb_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                stale_until REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_omdb_cache_stale_until ON omdb_cache (stale_until)")
+        self._conn.commit()
+
+    def _get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at, stale_until FROM omdb_cache WHERE key = ?",
+                (key,),
+            ).fetchone()
+        if not row:
+            return None
+        return CacheEntry(value=json.loads(row[0]), expires_at=row[1], stale_until=row[2])
+
+    def _set(self, key: str, entry: CacheEntry) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO omdb_cache (key, value, expires_at, stale_until) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(entry.value, ensure_ascii=False), entry.expires_at, entry.stale_until),
+            )
+            self._writes += 1
+            if self._writes % self.purge_every == 0:
+                self._delete_expired(time.time())
+            self._conn.commit()
+
+    def _delete_expired(self, now: float) -> int:
+        cursor = self._conn.execute("DELETE FROM omdb_cache WHERE stale_until <= ?", (now,))
+        return cursor.rowcount
+
+    def _purge(self, now: float) -> int:
+        with self._lock:
+            removed = self._delete_expired(now)
+            self._conn.commit()
+            return removed
+
+    async def get(self, key: str) -> Optional[CacheEntry]:
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, entry: CacheEntry) -> None:
+        await asyncio.to_thread(self._set, key, entry)
+
+    async def purge_expired(self) -> int:
+        return await asyncio.to_thread(self._purge, time.time())
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class TieredCache:
+    """Двухуровневый кэш: LRU в памяти + общее хранилище на диске.
+
+    get возвращает (value, is_stale). Устаревшую запись можно отдать клиенту,
+    пока не истек stale_ttl, а обновление выполнить в фоне.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        memory_size: int,
+        ttl: float,
+        stale_ttl: float = 0,
+        store: Optional[SQLiteStore] = None,
+    ):
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.memory = MemoryLRU(memory_size)
+        self.store = store
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    def _key(self, key: str) -> str:
+        return f"{self.name}:{key}"
+
+    async def get(self, key: str, record_miss: bool = True) -> Optional[Tuple[Any, bool]]:
+        """record_miss=False - промах не учитывается в статистике (например, для пробной проверки)"""
+        full_key = self._key(key)
+        now = time.time()
+
+        entry = self.memory.get(full_key)
+        if entry is not None and not entry.is_usable(now):
+            self.memory.delete(full_key)
+            entry = None
+
+        if entry is not None:
+            self.memory_hits += 1
+        elif self.store is not None:
+            try:
+                entry = await self.store.get(full_key)
+            except Exception as e:
+                logger.error(f"Ошибка чтения кэша {self.name}: {e}")
+                entry = None
+
+            if entry is not None and entry.is_usable(now):
+                self.disk_hits += 1
+                self.memory.set(full_key, entry)
+            else:
+                entry = None
+
+        if entry is None:
+            if record_miss:
+                self.misses += 1
+            return None
+
+        stale = not entry.is_fresh(now)
+        if stale:
+            self.stale_hits += 1
+        return entry.value, stale
+
+    def record_miss(self) -> None:
+        self.misses += 1
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        full_key = self._key(key)
+        now = time.time()
+        ttl = self.ttl if ttl is None else ttl
+        entry = CacheEntry(value=value, expires_at=now + ttl, stale_until=now + ttl + self.stale_ttl)
+
+        self.memory.set(full_key, entry)
+        if self.store is not None:
+            try:
+                await self.store.set(full_key, entry)
+            except Exception as e:
+                logger.error(f"Ошибка записи кэша {self.name}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        hits = self.memory_hits + self.disk_hits
+        total = hits + self.misses
+        return {
+            "memory_size": len(self.memory),
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_ratio": round(hits / total, 3) if total else 0.0,
+        }
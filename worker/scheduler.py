@@ -0,0 +1,127 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 1
+
+
+class QuotaExceeded(Exception):
+    """Не удалось получить токен на запрос к OMDB"""
+
+
+class TokenBucketScheduler:
+    """Планировщик запросов к OMDB на основе token bucket.
+
+    Токены пополняются со скоростью rate в секунду до burst. Дополнительно
+    действует дневной бюджет, который сбрасывается в полночь UTC.
+    Интерактивные запросы бота обслуживаются первыми, фоновые получают
+    токен только если остается запас (background_reserve в ведре и
+    background_daily_reserve в дневном бюджете) и никто из интерактивных не ждет.
+    Интерактивные запросы ждут токен не дольше max_wait, фоновые - не дольше
+    background_max_wait (None - без ограничения: пакеты встают в очередь,
+    а не получают отказ).
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int,
+        daily_budget: int,
+        max_wait: float,
+        background_reserve: float = 0,
+        background_daily_reserve: int = 0,
+        background_max_wait: Optional[float] = None,
+    ):
+        if background_reserve > burst - 1:
+            # Фоновому запросу нужно 1 + background_reserve токенов, больше burst в ведре не бывает
+            raise ValueError(
+                f"background_reserve ({background_reserve}) должен быть не больше burst - 1 ({burst - 1})"
+            )
+
+        self.rate = rate
+        self.burst = burst
+        self.daily_budget = daily_budget
+        self.max_wait = max_wait
+        self.background_reserve = background_reserve
+        self.background_daily_reserve = background_daily_reserve
+        self.background_max_wait = background_max_wait
+
+        self.tokens = float(burst)
+        self._updated_at = time.monotonic()
+        self._day = self._today()
+        self.used_today = 0
+
+        self._waiting = {PRIORITY_INTERACTIVE: 0, PRIORITY_BACKGROUND: 0}
+        self.granted = 0
+        self.rejected = 0
+
+    @staticmethod
+    def _today():
+        return datetime.now(timezone.utc).date()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+        today = self._today()
+        if today != self._day:
+            self._day = today
+            self.used_today = 0
+
+    def daily_remaining(self) -> int:
+        return max(self.daily_budget - self.used_today, 0)
+
+    async def acquire(self, priority: int = PRIORITY_INTERACTIVE, timeout: Optional[float] = None) -> None:
+        """Ждет токен не дольше timeout (по умолчанию max_wait или background_max_wait), 0 - без ожидания"""
+        interactive = priority == PRIORITY_INTERACTIVE
+        if timeout is None:
+            timeout = self.max_wait if interactive else self.background_max_wait
+        deadline = float("inf") if timeout is None else time.monotonic() + timeout
+
+        token_threshold = 1 if interactive else 1 + self.background_reserve
+        daily_threshold = 0 if interactive else self.background_daily_reserve
+
+        self._waiting[priority] += 1
+        try:
+            while True:
+                self._refill()
+
+                if self.daily_remaining() <= daily_threshold:
+                    self.rejected += 1
+                    raise QuotaExceeded("Дневной лимит запросов к OMDB исчерпан")
+
+                blocked = not interactive and self._waiting[PRIORITY_INTERACTIVE] > 0
+                if not blocked and self.tokens >= token_threshold:
+                    self.tokens -= 1
+                    self.used_today += 1
+                    self.granted += 1
+                    return
+
+                wait = max((token_threshold - self.tokens) / self.rate, 0.01)
+                if time.monotonic() + wait > deadline:
+                    self.rejected += 1
+                    raise QuotaExceeded("Превышен лимит частоты запросов к OMDB")
+
+                await asyncio.sleep(wait)
+        finally:
+            self._waiting[priority] -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        self._refill()
+        return {
+            "tokens": round(self.tokens, 2),
+            "burst": self.burst,
+            "rate_per_second": self.rate,
+            "daily_budget": self.daily_budget,
+            "daily_remaining": self.daily_remaining(),
+            "waiting_interactive": self._waiting[PRIORITY_INTERACTIVE],
+            "waiting_background": self._waiting[PRIORITY_BACKGROUND],
+            "granted": self.granted,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,77 @@
+import time
+
+import cache
+from cache import CacheEntry, MemoryLRU, SQLiteStore, TieredCache
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_memory_lru_evicts_least_recently_used():
+    lru = MemoryLRU(maxsize=2)
+    lru.set("a", CacheEntry(1, 10, 10))
+    lru.set("b", CacheEntry(2, 10, 10))
+    lru.get("a")
+    lru.set("c", CacheEntry(3, 10, 10))
+
+    assert lru.get("b") is None
+    assert lru.get("a").value == 1
+    assert lru.get("c").value == 3
+
+
+async def test_tiered_cache_fresh_stale_and_expired(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(cache.time, "time", clock)
+    tiered = TieredCache("search", memory_size=10, ttl=10, stale_ttl=20)
+
+    await tiered.set("matrix", ["tt0133093"])
+    assert await tiered.get("matrix") == (["tt0133093"], False)
+
+    clock.now += 15
+    assert await tiered.get("matrix") == (["tt0133093"], True)
+
+    clock.now += 20
+    assert await tiered.get("matrix") is None
+    assert tiered.stats()["misses"] == 1
+
+
+async def test_tiered_cache_reads_through_disk(tmp_path):
+    store = SQLiteStore(str(tmp_path / "cache.sqlite3"))
+    first = TieredCache("detail", memory_size=10, ttl=60, store=store)
+    await first.set("tt0133093", {"title": "The Matrix"})
+
+    # Новый процесс с пустой памятью находит запись на диске
+    second = TieredCache("detail", memory_size=10, ttl=60, store=store)
+    assert await second.get("tt0133093") == ({"title": "The Matrix"}, False)
+    assert second.stats()["disk_hits"] == 1
+    assert await second.get("tt0133093") is not None
+    assert second.stats()["memory_hits"] == 1
+    store.close()
+
+
+async def test_probe_without_record_miss_is_not_counted():
+    tiered = TieredCache("search", memory_size=10, ttl=60)
+
+    assert await tiered.get("missing", record_miss=False) is None
+    assert tiered.stats()["misses"] == 0
+
+    tiered.record_miss()
+    assert tiered.stats()["misses"] == 1
+
+
+def test_sqlite_store_purges_expired_rows_every_n_writes(tmp_path):
+    store = SQLiteStore(str(tmp_path / "cache.sqlite3"), purge_every=3)
+    now = time.time()
+    store._set("old", CacheEntry("x", now - 20, now - 10))
+    store._set("fresh", CacheEntry("y", now + 10, now + 20))
+    assert store._get("old") is not None
+
+    store._set("another", CacheEntry("z", now + 10, now + 20))
+    assert store._get("old") is None
+    assert store._get("fresh").value == "y"
+    store.close()
@@ -0,0 +1,91 @@
+import asyncio
+from datetime import date
+
+import pytest
+
+from scheduler import PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, QuotaExceeded, TokenBucketScheduler
+
+
+def make_scheduler(**overrides) -> TokenBucketScheduler:
+    params = {"rate": 1000, "burst": 10, "daily_budget": 1000, "max_wait": 1}
+    params.update(overrides)
+    return TokenBucketScheduler(**params)
+
+
+async def test_interactive_request_is_served_before_waiting_background():
+    scheduler = make_scheduler(rate=20, burst=1)
+    await scheduler.acquire(PRIORITY_INTERACTIVE)
+    order = []
+
+    async def acquire(priority, name):
+        await scheduler.acquire(priority)
+        order.append(name)
+
+    background = asyncio.create_task(acquire(PRIORITY_BACKGROUND, "background"))
+    await asyncio.sleep(0.01)
+    interactive = asyncio.create_task(acquire(PRIORITY_INTERACTIVE, "interactive"))
+    await asyncio.gather(background, interactive)
+
+    assert order == ["interactive", "background"]
+
+
+async def test_background_keeps_token_reserve_for_interactive():
+    scheduler = make_scheduler(rate=0.001, burst=4, background_reserve=2)
+
+    await scheduler.acquire(PRIORITY_BACKGROUND, timeout=0)
+    await scheduler.acquire(PRIORITY_BACKGROUND, timeout=0)
+    with pytest.raises(QuotaExceeded):
+        await scheduler.acquire(PRIORITY_BACKGROUND, timeout=0)
+
+    await scheduler.acquire(PRIORITY_INTERACTIVE, timeout=0)
+    await scheduler.acquire(PRIORITY_INTERACTIVE, timeout=0)
+    assert scheduler.stats()["granted"] == 4
+
+
+async def test_interactive_wait_is_limited_by_max_wait():
+    scheduler = make_scheduler(rate=0.1, burst=1, max_wait=0.05)
+    await scheduler.acquire()
+
+    with pytest.raises(QuotaExceeded):
+        await scheduler.acquire()
+    assert scheduler.stats()["rejected"] == 1
+
+
+async def test_daily_budget_is_enforced():
+    scheduler = make_scheduler(daily_budget=3)
+    for _ in range(3):
+        await scheduler.acquire()
+
+    with pytest.raises(QuotaExceeded):
+        await scheduler.acquire()
+    assert scheduler.daily_remaining() == 0
+
+
+async def test_background_leaves_daily_reserve_for_interactive():
+    scheduler = make_scheduler(daily_budget=5, background_daily_reserve=2)
+    for _ in range(3):
+        await scheduler.acquire(PRIORITY_BACKGROUND)
+
+    with pytest.raises(QuotaExceeded):
+        await scheduler.acquire(PRIORITY_BACKGROUND)
+
+    await scheduler.acquire(PRIORITY_INTERACTIVE)
+    await scheduler.acquire(PRIORITY_INTERACTIVE)
+    assert scheduler.daily_remaining() == 0
+
+
+async def test_daily_budget_resets_at_midnight(monkeypatch):
+    scheduler = make_scheduler(daily_budget=1)
+    await scheduler.acquire()
+    with pytest.raises(QuotaExceeded):
+        await scheduler.acquire()
+
+    monkeypatch.setattr(TokenBucketScheduler, "_today", staticmethod(lambda: date(2100, 1, 1)))
+    await scheduler.acquire()
+    assert scheduler.used_today == 1
+
+
+def test_background_reserve_must_leave_room_for_a_token():
+    with pytest.raises(ValueError):
+        make_scheduler(burst=4, background_reserve=4)
+    make_scheduler(burst=4, background_reserve=3)
@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+
+from singleflight import SingleFlight
+
+
+async def test_concurrent_calls_share_one_task():
+    flight = SingleFlight()
+    calls = 0
+    release = asyncio.Event()
+
+    async def load():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return "result"
+
+    waiters = [asyncio.create_task(flight.do("matrix", load)) for _ in range(5)]
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await asyncio.gather(*waiters) == ["result"] * 5
+    assert calls == 1
+    assert flight.stats() == {"in_flight": 0, "started": 1, "shared": 4}
+
+
+async def test_different_keys_run_separately():
+    flight = SingleFlight()
+
+    async def load(value):
+        await asyncio.sleep(0)
+        return value
+
+    results = await asyncio.gather(flight.do("a", lambda: load(1)), flight.do("b", lambda: load(2)))
+
+    assert results == [1, 2]
+    assert flight.stats()["started"] == 2
+
+
+async def test_exception_propagates_to_every_waiter():
+    flight = SingleFlight()
+    release = asyncio.Event()
+
+    async def load():
+        await release.wait()
+        raise RuntimeError("OMDB недоступен")
+
+    waiters = [asyncio.create_task(flight.do("matrix", load)) for _ in range(3)]
+    await asyncio.sleep(0)
+    release.set()
+
+    results = await asyncio.gather(*waiters, return_exceptions=True)
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert flight.stats()["in_flight"] == 0
+
+
+async def test_finished_call_is_not_reused():
+    flight = SingleFlight()
+    calls = 0
+
+    async def load():
+        nonlocal calls
+        calls += 1
+        return calls
+
+    assert await flight.do("matrix", load) == 1
+    assert await flight.do("matrix", load) == 2
+
+
+async def test_cancelled_waiter_does_not_cancel_shared_call():
+    flight = SingleFlight()
+    release = asyncio.Event()
+
+    async def load():
+        await release.wait()
+        return "result"
+
+    first = asyncio.create_task(flight.do("matrix", load))
+    second = asyncio.create_task(flight.do("matrix", load))
+    await asyncio.sleep(0)
+
+    first.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await first
+
+    release.set()
+    assert await second == "result"
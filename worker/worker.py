@@ -1,9 +1,18 @@
 from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
 import httpx
+import asyncio
+import json
 import os
 import logging
-from typing import Optional, Dict, Any, List
-from pydantic import BaseModel
+from typing import Optional, Dict, Any, List, AsyncIterator, Tuple
+from pydantic import BaseModel, Field
+
+from cache import SQLiteStore, TieredCache
+from singleflight import SingleFlight
+from scheduler import (
+    PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, QuotaExceeded, TokenBucketScheduler
+)
 
 app = FastAPI(title="OMDB Worker")
 logger = logging.getLogger(__name__)
@@ -17,62 +26,293 @@ class SearchResponse(BaseModel):
     data: Optional[List[Dict[str, Any]]] = None
     error: Optional[str] = None
 
+class BatchSearchItem(BaseModel):
+    title: Optional[str] = None
+    content_type: Optional[str] = None
+    imdb_id: Optional[str] = None
+
+class BatchSearchRequest(BaseModel):
+    items: List[BatchSearchItem] = Field(..., min_length=1, max_length=1000)
+    priority: str = Field("background", pattern="^(interactive|background)$")
+
+# Ответы OMDB, которые имеет смысл запоминать как пустой результат
+NEGATIVE_CACHE_ERRORS = {"Movie not found!", "Series not found!", "Too many results."}
+
 class OMDBService:
     def __init__(self):
         self.api_key = os.getenv("OMDB_API_KEY")
         self.base_url = "http://www.omdbapi.com/"
+        self.max_results = int(os.getenv("OMDB_MAX_RESULTS", "5"))
+
+        # Один долгоживущий клиент с пулом соединений вместо нового на каждый поиск
+        limits = httpx.Limits(
+            max_connections=int(os.getenv("OMDB_MAX_CONNECTIONS", "20")),
+            max_keepalive_connections=int(os.getenv("OMDB_MAX_KEEPALIVE", "10")),
+            keepalive_expiry=float(os.getenv("OMDB_KEEPALIVE_EXPIRY", "30")),
+        )
+        self.client = httpx.AsyncClient(
+            timeout=float(os.getenv("OMDB_TIMEOUT", "30")),
+            limits=limits,
+        )
+        # Ограничение на количество одновременных запросов деталей
+        self.detail_semaphore = asyncio.Semaphore(int(os.getenv("OMDB_DETAIL_CONCURRENCY", "5")))
+
+        # Кэш: поиск хранит список imdbID, детали хранятся отдельно по imdbID
+        cache_path = os.getenv("OMDB_CACHE_PATH", "omdb_cache.sqlite3")
+        self.cache_store = (
+            SQLiteStore(cache_path, purge_every=int(os.getenv("OMDB_CACHE_PURGE_EVERY", "1000")))
+            if cache_path else None
+        )
+        self.search_cache = TieredCache(
+            "search",
+            memory_size=int(os.getenv("OMDB_SEARCH_CACHE_SIZE", "2000")),
+            ttl=float(os.getenv("OMDB_SEARCH_CACHE_TTL", "21600")),
+            stale_ttl=float(os.getenv("OMDB_SEARCH_CACHE_STALE_TTL", "86400")),
+            store=self.cache_store,
+        )
+        self.detail_cache = TieredCache(
+            "detail",
+            memory_size=int(os.getenv("OMDB_DETAIL_CACHE_SIZE", "5000")),
+            ttl=float(os.getenv("OMDB_DETAIL_CACHE_TTL", "604800")),
+            stale_ttl=float(os.getenv("OMDB_DETAIL_CACHE_STALE_TTL", "604800")),
+            store=self.cache_store,
+        )
+        # Отдельный короткий кэш для запросов, на которые OMDB ответил "не найдено"
+        self.negative_cache = TieredCache(
+            "negative",
+            memory_size=int(os.getenv("OMDB_NEGATIVE_CACHE_SIZE", "5000")),
+            ttl=float(os.getenv("OMDB_NEGATIVE_CACHE_TTL", "900")),
+        )
+        self._refresh_tasks: Dict[str, asyncio.Task] = {}
+
+        # Одинаковые одновременные запросы к OMDB выполняются один раз
+        self.search_flight = SingleFlight()
+        self.detail_flight = SingleFlight()
+
+        # Лимиты ключа OMDB: частота, размер всплеска и дневной бюджет
+        burst = int(os.getenv("OMDB_BURST", "10"))
+        daily_budget = int(os.getenv("OMDB_DAILY_BUDGET", "1000"))
+        background_wait = os.getenv("OMDB_BACKGROUND_QUEUE_TIMEOUT")
+        self.scheduler = TokenBucketScheduler(
+            rate=float(os.getenv("OMDB_RATE_PER_SECOND", "5")),
+            burst=burst,
+            daily_budget=daily_budget,
+            max_wait=float(os.getenv("OMDB_QUEUE_TIMEOUT", "5")),
+            background_reserve=float(os.getenv("OMDB_BACKGROUND_RESERVE", str(burst // 2))),
+            background_daily_reserve=int(os.getenv("OMDB_BACKGROUND_DAILY_RESERVE", str(daily_budget // 10))),
+            # Пусто - фоновые запросы (пакеты, обновление кэша) ждут токен без ограничения
+            background_max_wait=float(background_wait) if background_wait else None,
+        )
         
         if not self.api_key:
             logger.error("OMDB_API_KEY not configured in worker")
     
-    async def search(self, title: str, content_type: str = None) -> Optional[List[Dict[str, Any]]]:
+    async def search(
+        self, title: str, content_type: str = None, priority: int = PRIORITY_INTERACTIVE
+    ) -> Optional[List[Dict[str, Any]]]:
+        results, _ = await self.search_with_skipped(title, content_type, priority)
+        return results
 
+    async def search_with_skipped(
+        self, title: str, content_type: str = None, priority: int = PRIORITY_INTERACTIVE
+    ) -> Tuple[Optional[List[Dict[str, Any]]], List[str]]:
+        """Результаты поиска и imdbID, детали которых не получены из-за лимита OMDB"""
         if not self.api_key:
             logger.error("OMDB API key not configured")
-            return None
+            return None, []
 
         try:
-            search_params = {
-                "apikey": self.api_key,
-                "s": title,
-                "plot": "short"
-            }
+            imdb_ids = await self._search_ids(title, content_type, priority)
+            if imdb_ids is None:
+                return None, []
+
+            details = await asyncio.gather(
+                *(self.get_details(imdb_id, priority) for imdb_id in imdb_ids),
+                return_exceptions=True,
+            )
 
-            if content_type:
-                search_params["type"] = content_type
+            # gather сохраняет порядок, поэтому порядок выдачи OMDB не меняется
+            parsed_results: List[Dict[str, Any]] = [item for item in details if isinstance(item, dict)]
+            skipped = [
+                imdb_id for imdb_id, item in zip(imdb_ids, details) if isinstance(item, QuotaExceeded)
+            ]
+            if not parsed_results and skipped:
+                raise next(item for item in details if isinstance(item, QuotaExceeded))
+            if skipped:
+                logger.warning(f"Детали OMDB пропущены из-за лимита: {skipped}")
+            return (parsed_results if parsed_results else None), skipped
 
-            logger.info(f"Worker ищет в OMDB (list): {title}")
+        except QuotaExceeded:
+            raise
+        except Exception as e:
+            logger.error(f"Worker error: {e}")
+            return None, []
 
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                search_resp = await client.get(self.base_url, params=search_params)
+    async def search_stream(
+        self, title: str, content_type: str = None, priority: int = PRIORITY_INTERACTIVE
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Отдает детали по мере готовности вместо ожидания всех пяти"""
+        imdb_ids = await self._search_ids(title, content_type, priority)
+        if not imdb_ids:
+            return
 
-                if search_resp.status_code != 200:
-                    logger.error(f"OMDB API error: {search_resp.status_code}")
-                    return None
+        async def ranked(rank: int, imdb_id: str):
+            return rank, await self.get_details(imdb_id, priority)
 
-                search_data = search_resp.json()
-                if search_data.get("Response") != "True" or not search_data.get("Search"):
-                    logger.warning(f"Не найдено в OMDB: {search_data.get('Error')}")
-                    return None
+        tasks = [asyncio.create_task(ranked(rank, imdb_id)) for rank, imdb_id in enumerate(imdb_ids)]
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                try:
+                    rank, details = await next_result
+                except QuotaExceeded as e:
+                    logger.warning(f"Детали OMDB пропущены: {e}")
+                    continue
+                if details:
+                    yield {"rank": rank, "data": details}
+        finally:
+            for task in tasks:
+                task.cancel()
 
-                # Берем первые 5 результатов и запрашиваем подробности по imdbID
-                parsed_results: List[Dict[str, Any]] = []
-                for item in search_data.get("Search", [])[:5]:
-                    imdb_id = item.get("imdbID")
-                    if not imdb_id:
-                        continue
+    async def _search_ids(
+        self, title: str, content_type: str = None, priority: int = PRIORITY_INTERACTIVE
+    ) -> Optional[List[str]]:
+        key = self._search_key(title, content_type)
+        # Промах учитывается только после проверки негативного кэша: ответ "не найдено"
+        # из него считается попаданием негативного кэша, а не промахом поиска
+        cached = await self.search_cache.get(key, record_miss=False)
 
-                    details = await self._fetch_details(client, imdb_id)
-                    if details:
-                        parsed_results.append(details)
+        if cached is not None:
+            imdb_ids, stale = cached
+            if stale:
+                self._schedule_refresh(key, lambda: self._refresh_search(key, title, content_type))
+            return imdb_ids
 
-                return parsed_results if parsed_results else None
+        if await self.negative_cache.get(key, record_miss=False) is not None:
+            logger.info(f"Запрос '{title}' уже известен как ненайденный")
+            return None
 
-        except Exception as e:
-            logger.error(f"Worker error: {e}")
+        self.search_cache.record_miss()
+
+        return await self.search_flight.do(
+            self._flight_key(key, priority), lambda: self._load_search(key, title, content_type, priority)
+        )
+
+    async def get_details(self, imdb_id: str, priority: int = PRIORITY_INTERACTIVE) -> Optional[Dict[str, Any]]:
+        cached = await self.detail_cache.get(imdb_id)
+        if cached is not None:
+            details, stale = cached
+            if stale:
+                self._schedule_refresh(f"detail:{imdb_id}", lambda: self._refresh_details(imdb_id))
+            return details
+
+        return await self.detail_flight.do(
+            self._flight_key(imdb_id, priority), lambda: self._load_details(imdb_id, priority)
+        )
+
+    async def _load_search(
+        self, key: str, title: str, content_type: str = None, priority: int = PRIORITY_INTERACTIVE
+    ) -> Optional[List[str]]:
+        imdb_ids = await self._fetch_search(title, content_type, priority)
+        if imdb_ids is not None:
+            await self.search_cache.set(key, imdb_ids)
+        return imdb_ids
+
+    async def _load_details(self, imdb_id: str, priority: int = PRIORITY_INTERACTIVE) -> Optional[Dict[str, Any]]:
+        details = await self._fetch_details(imdb_id, priority)
+        if details:
+            await self.detail_cache.set(imdb_id, details)
+        return details
+
+    async def _fetch_search(
+        self, title: str, content_type: str = None, priority: int = PRIORITY_INTERACTIVE
+    ) -> Optional[List[str]]:
+        search_params = {
+            "apikey": self.api_key,
+            "s": title,
+            "plot": "short"
+        }
+
+        if content_type:
+            search_params["type"] = content_type
+
+        logger.info(f"Worker ищет в OMDB (list): {title}")
+
+        await self.scheduler.acquire(priority)
+        search_resp = await self.client.get(self.base_url, params=search_params)
+
+        if search_resp.status_code != 200:
+            logger.error(f"OMDB API error: {search_resp.status_code}")
+            return None
+
+        search_data = search_resp.json()
+        if search_data.get("Response") != "True" or not search_data.get("Search"):
+            error = search_data.get("Error")
+            logger.warning(f"Не найдено в OMDB: {error}")
+            if error in NEGATIVE_CACHE_ERRORS:
+                await self.negative_cache.set(self._search_key(title, content_type), error)
             return None
 
-    async def _fetch_details(self, client: httpx.AsyncClient, imdb_id: str) -> Optional[Dict[str, Any]]: #Детльная инфа по imbID
+        # Берем первые 5 результатов, подробности запрашиваются по imdbID
+        return [
+            item.get("imdbID")
+            for item in search_data.get("Search", [])[:self.max_results]
+            if item.get("imdbID")
+        ]
+
+    async def _refresh_search(self, key: str, title: str, content_type: str = None) -> None:
+        await self.search_flight.do(
+            self._flight_key(key, PRIORITY_BACKGROUND),
+            lambda: self._load_search(key, title, content_type, PRIORITY_BACKGROUND),
+        )
+
+    async def _refresh_details(self, imdb_id: str) -> None:
+        await self.detail_flight.do(
+            self._flight_key(imdb_id, PRIORITY_BACKGROUND),
+            lambda: self._load_details(imdb_id, PRIORITY_BACKGROUND),
+        )
+
+    def _schedule_refresh(self, key: str, factory) -> None:
+        """stale-while-revalidate: отдаем устаревшее значение и обновляем в фоне"""
+        if key in self._refresh_tasks:
+            return
+
+        async def runner():
+            try:
+                await factory()
+            except Exception as e:
+                logger.error(f"Ошибка фонового обновления кэша {key}: {e}")
+            finally:
+                self._refresh_tasks.pop(key, None)
+
+        self._refresh_tasks[key] = asyncio.create_task(runner())
+
+    @staticmethod
+    def _flight_key(key: str, priority: int) -> str:
+        # Приоритет входит в ключ: интерактивный запрос не должен ждать фоновый
+        # запрос, стоящий в очереди планировщика без ограничения по времени
+        return f"{priority}:{key}"
+
+    @staticmethod
+    def _search_key(title: str, content_type: str = None) -> str:
+        normalized = " ".join(title.lower().split())
+        return f"{normalized}|{content_type or ''}"
+
+    def cache_stats(self) -> Dict[str, Any]:
+        return {
+            "search": self.search_cache.stats(),
+            "detail": self.detail_cache.stats(),
+            "negative": self.negative_cache.stats(),
+        }
+
+    def flight_stats(self) -> Dict[str, Any]:
+        return {
+            "search": self.search_flight.stats(),
+            "detail": self.detail_flight.stats(),
+        }
+
+    async def _fetch_details(
+        self, imdb_id: str, priority: int = PRIORITY_INTERACTIVE
+    ) -> Optional[Dict[str, Any]]: #Детльная инфа по imbID
 
         try:
             params = {
@@ -80,7 +320,9 @@ class OMDBService:
                 "i": imdb_id,
                 "plot": "short"
             }
-            detail_resp = await client.get(self.base_url, params=params)
+            await self.scheduler.acquire(priority)
+            async with self.detail_semaphore:
+                detail_resp = await self.client.get(self.base_url, params=params)
             if detail_resp.status_code != 200:
                 logger.error(f"OMDB detail error for {imdb_id}: {detail_resp.status_code}")
                 return None
@@ -92,10 +334,17 @@ class OMDBService:
 
             logger.info(f"Детали OMDB: {detail_data.get('Title')}")
             return self._parse_response(detail_data)
+        except QuotaExceeded:
+            raise
         except Exception as e:
             logger.error(f"Ошибка при получении деталей OMDB {imdb_id}: {e}")
             return None
         
+    async def close(self):
+        await self.client.aclose()
+        if self.cache_store is not None:
+            self.cache_store.close()
+
     def _parse_response(self, data: Dict[str, Any]) -> Dict[str, Any]:         #Парсинг ответов
         content_type = "movie"
         if data.get("Type") == "series":
@@ -144,7 +393,10 @@ async def search_omdb(request: SearchRequest):
             error="OMDB API key not configured in worker"
         )
     
-    result = await omdb_service.search(request.title, request.content_type)
+    try:
+        result = await omdb_service.search(request.title, request.content_type)
+    except QuotaExceeded as e:
+        return SearchResponse(success=False, error=str(e))
     
     if result:
         return SearchResponse(success=True, data=result)
@@ -154,6 +406,126 @@ async def search_omdb(request: SearchRequest):
             error=f"Фильм '{request.title}' не найден в OMDB"
         )
 
+async def _resolve_batch_item(
+    index: int, item: BatchSearchItem, priority: int, semaphore: asyncio.Semaphore
+) -> Dict[str, Any]:
+    skipped: List[str] = []
+    async with semaphore:
+        try:
+            if item.imdb_id:
+                details = await omdb_service.get_details(item.imdb_id, priority)
+                data = [details] if details else None
+            elif item.title:
+                data, skipped = await omdb_service.search_with_skipped(item.title, item.content_type, priority)
+            else:
+                return {"index": index, "success": False, "error": "Нужно указать title или imdb_id"}
+        except QuotaExceeded as e:
+            return {"index": index, "success": False, "error": str(e)}
+
+    if data:
+        result = {"index": index, "success": True, "data": data}
+        if skipped:
+            # Часть деталей не получена из-за лимита: элемент можно повторить позже
+            result.update(partial=True, skipped=skipped)
+        return result
+    return {
+        "index": index,
+        "success": False,
+        "error": f"'{item.imdb_id or item.title}' не найден в OMDB",
+    }
+
+async def _stream_batch(request: BatchSearchRequest) -> AsyncIterator[str]:
+    priority = PRIORITY_INTERACTIVE if request.priority == "interactive" else PRIORITY_BACKGROUND
+    semaphore = asyncio.Semaphore(int(os.getenv("OMDB_BATCH_CONCURRENCY", "10")))
+    tasks = [
+        asyncio.create_task(_resolve_batch_item(index, item, priority, semaphore))
+        for index, item in enumerate(request.items)
+    ]
+    try:
+        # Результаты отдаются по мере готовности, index указывает на позицию в запросе
+        for next_result in asyncio.as_completed(tasks):
+            result = await next_result
+            yield json.dumps(result, ensure_ascii=False) + "\n"
+    finally:
+        for task in tasks:
+            task.cancel()
+
+async def _stream_search(request: SearchRequest) -> AsyncIterator[str]:
+    count = 0
+    try:
+        async for result in omdb_service.search_stream(request.title, request.content_type):
+            count += 1
+            yield json.dumps({"type": "result", **result}, ensure_ascii=False) + "\n"
+    except QuotaExceeded as e:
+        yield json.dumps({"type": "error", "error": str(e)}, ensure_ascii=False) + "\n"
+        return
+    except Exception as e:
+        logger.error(f"Worker stream error: {e}")
+        yield json.dumps({"type": "error", "error": "Ошибка поиска в OMDB"}, ensure_ascii=False) + "\n"
+        return
+
+    done: Dict[str, Any] = {"type": "done", "count": count}
+    if not count:
+        done["error"] = f"Фильм '{request.title}' не найден в OMDB"
+    yield json.dumps(done, ensure_ascii=False) + "\n"
+
+@app.post("/search/stream")
+async def search_omdb_stream(request: SearchRequest):
+    """Поиск в OMDB с отдачей результатов по одному (NDJSON)"""
+    if not omdb_service.api_key:
+        error = json.dumps({"type": "error", "error": "OMDB API key not configured in worker"})
+        return StreamingResponse(iter([error + "\n"]), media_type="application/x-ndjson")
+
+    return StreamingResponse(_stream_search(request), media_type="application/x-ndjson")
+
+@app.post("/search/batch")
+async def search_omdb_batch(request: BatchSearchRequest):
+    """Пакетный поиск в OMDB, ответ в формате NDJSON"""
+    if not omdb_service.api_key:
+        error = json.dumps({"success": False, "error": "OMDB API key not configured in worker"})
+        return StreamingResponse(iter([error + "\n"]), media_type="application/x-ndjson")
+
+    return StreamingResponse(_stream_batch(request), media_type="application/x-ndjson")
+
+@app.get("/details/{imdb_id}", response_model=SearchResponse)
+async def omdb_details(imdb_id: str):
+    """Детали одного фильма по imdb_id, из кэша worker если есть"""
+    if not omdb_service.api_key:
+        return SearchResponse(
+            success=False,
+            error="OMDB API key not configured in worker"
+        )
+
+    try:
+        details = await omdb_service.get_details(imdb_id)
+    except QuotaExceeded as e:
+        return SearchResponse(success=False, error=str(e))
+
+    if details:
+        return SearchResponse(success=True, data=[details])
+    return SearchResponse(success=False, error=f"'{imdb_id}' не найден в OMDB")
+
+@app.on_event("startup")
+async def startup_event():
+    """Очистка просроченных записей дискового кэша"""
+    if omdb_service.cache_store is not None:
+        removed = await omdb_service.cache_store.purge_expired()
+        logger.info(f"Удалено просроченных записей кэша: {removed}")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Закрытие пула соединений с OMDB"""
+    await omdb_service.close()
+
+@app.get("/metrics")
+async def metrics():
+    """Счетчики кэша worker"""
+    return {
+        "cache": omdb_service.cache_stats(),
+        "single_flight": omdb_service.flight_stats(),
+        "quota": omdb_service.scheduler.stats(),
+    }
+
 @app.get("/health")
 async def health_check():
     """Проверка здоровья worker"""